@@ -1,6 +1,11 @@
 # Runs the Mercer program
+# Run without arguments for the interactive menus, or with a command to run a batch job. Run with '--help' for the commands
 
 # Imports
+import os
+import sys
+import json
+import argparse
 import mercer as mercerControl
 import generalUtilities as utils
 
@@ -34,7 +39,7 @@ def mainMenuFunctions(answer):
     # Because Python Switch statements don't exist
     if answer == "0":
         # Open Learning Menu
-        options = ["Learn from File","Learn from Subreddit"]
+        options = ["Learn from File","Learn from Subreddit","Learn from RSS Feed","Learn from BBC News","Learn New Text from Directory"]
         utils.textMenu("Learning Menu",options,"Back to Main Menu",learningMenuFunctions)
     elif answer == "1":
         # Open Generation Menu
@@ -42,7 +47,7 @@ def mainMenuFunctions(answer):
         utils.textMenu("Generation Menu",options,"Back to Main Menu",generationMenuFunctions)
     elif answer == "2":
         # Open Admin Menu
-        options = ["Log Dictionary","Show Dictionary Statistics","Toggle Debug Mode","Set Max Generation Attempts","Set Max Commonality Difference"]
+        options = ["Log Dictionary","Show Dictionary Statistics","Toggle Debug Mode","Set Max Generation Attempts","Set Max Commonality Difference","Toggle Sentence Start Seeding","Show Metrics","Set Brain Budget","Show Most Frequent Words","Show Most Common Followers"]
         utils.textMenu("Administration Menu",options,"Back to Main Menu",adminMenuFunctions)
 
 # Functions for the learning menu
@@ -67,22 +72,66 @@ def learningMenuFunctions(answer):
                 print("'"+fileName+"' could not be read.")
     elif answer == "1":
         # Learn from Subreddit process
-        # Get subreddit
-        subreddit = utils.managedInput("Enter the subreddit to skim","Cancel")
+        # Get subreddits
+        subreddit = utils.managedInput("Enter the subreddits to skim, separated by commas","Cancel")
 
         # Check if valid
         if subreddit != None:
+            # Split the subreddits
+            subreddits = [name.strip() for name in subreddit.split(",") if name.strip() != ""]
+
             # Get the post limit
-            postLimit = utils.managedInputNumber("Max number of posts to read in /r/"+subreddit,"Cancel")
+            postLimit = utils.managedInputNumber("Max number of posts to read in each subreddit","Cancel")
 
             # Check if valid
             if postLimit != None:
-                # Learn from the subreddit
-                learned = MERCER.learnFromSubReddit(postLimit,subreddit)
+                # Ask about comments
+                includeComments = utils.askUserYesNo("Learn from comments too?",True)
+
+                # Learn from the subreddits
+                learned = MERCER.learnFromSubReddits(postLimit,subreddits,includeComments)
 
                 # Check if success
                 if not learned:
-                    print("/r/"+subreddit+" could not be read. Check the log for details.")
+                    print("Not every subreddit could be read. Check the log for details.")
+    elif answer == "2":
+        # Learn from RSS Feed process
+        # Get the feed
+        link = utils.managedInput("Enter the RSS feed's URL","Cancel")
+
+        # Check if valid
+        if link != None:
+            # Learn from the feed
+            learned = MERCER.learnFromFeed(link)
+
+            # Check if success
+            if not learned:
+                print("'"+link+"' could not be read. Check the log for details.")
+    elif answer == "3":
+        # Learn from BBC News process
+        # Learn from the feed
+        learned = MERCER.learnFromBBCNews()
+
+        # Check if success
+        if not learned:
+            print("BBC News could not be read. Check the log for details.")
+    elif answer == "4":
+        # Learn New Text from Directory process
+        # Get directory from user
+        directory = utils.managedInput("Enter the path to the directory of .txt files","Cancel")
+
+        # Check if response valid
+        if directory != None:
+            # Ask about deduping
+            dedupe = utils.askUserYesNo("Skip paragraphs that were already learned from other files?",True)
+
+            # Learn the new and changed files
+            print("")
+            learned = MERCER.learnTextDirectory(directory,dedupe)
+
+            # Check if success
+            if not learned:
+                print("'"+directory+"' could not be read.")
 
 # Functions for the generation menu
 def generationMenuFunctions(answer):
@@ -107,7 +156,7 @@ def generationMenuFunctions(answer):
             # Check if valid
             if length != None:
                 # Generate the file
-                MERCER.writeTextToFile(length,7,path)
+                MERCER.writeTextToFile(length,7,path,reportWriteProgress)
 
                 # Report done
                 print("File at '"+path+"' has been generated.")
@@ -158,6 +207,10 @@ def generationMenuFunctions(answer):
                 else:
                     print("Word type could not be changed. Check the log for details.")
 
+# Reports progress while writing to a file
+def reportWriteProgress(written,total):
+    print("Wrote "+str(written)+"/"+str(total)+" lines.")
+
 # Functions for the admin menu
 def adminMenuFunctions(answer):
     # Indicate global
@@ -221,7 +274,220 @@ def adminMenuFunctions(answer):
 
             # Report
             print("Set max commonality difference to top "+str(amount)+"%.")
+    elif answer == "5":
+        # Toggle sentence start seeding process
+        # Notes
+        print("When enabled, sentences only begin with words that have been seen starting a sentence.")
 
+        # Ask for mode to switch
+        mode = utils.askUserYesNo("Enable Sentence Start Seeding?",True)
+
+        # Set the mode
+        MERCER.setSeedFromSentenceStarts(mode)
+
+        # Choose print
+        if mode:
+            print("Sentence Start Seeding has been enabled.")
+        else:
+            print("Sentence Start Seeding has been disabled.")
+    elif answer == "6":
+        # Show metrics process
+        MERCER.getMetrics()
+    elif answer == "7":
+        # Set brain budget process
+        # Notes
+        print("When the brain grows past its budget, its least seen words and word pairs are pruned. 0 is unlimited.")
+        print("The budget is currently "+str(MERCER.maxWords)+" words and "+str(MERCER.maxEdges)+" word pairs.")
+
+        # Get the numbers
+        maxWords = utils.managedInputNumber("Set max words to","Cancel")
+        if maxWords != None:
+            maxEdges = utils.managedInputNumber("Set max word pairs to","Cancel")
+            if maxEdges != None:
+                # Set the budget
+                MERCER.setBrainBudget(max(maxWords,0),max(maxEdges,0))
+
+                # Report
+                print("Set the brain budget to "+str(MERCER.maxWords)+" words and "+str(MERCER.maxEdges)+" word pairs.")
+    elif answer == "8":
+        # Show most frequent words process
+        # Get number
+        count = utils.managedInputNumberRange("Number of words to show",1000,1,"Cancel")
+
+        # Check
+        if count != None:
+            MERCER.getMostFrequentWords(count)
+    elif answer == "9":
+        # Show most common followers process
+        # Get the word
+        word = utils.managedInput("Show the followers of","Cancel")
+
+        # Check
+        if word != None:
+            MERCER.getMostCommonFollowers(word.lower())
+
+
+# Batch Mode
+# Reads a max sentence length argument, rejecting lengths too short to make a sentence
+# Returns the length
+# value -> The argument's text
+def readSentenceLength(value):
+    # Read the number
+    length = int(value)
+
+    # Check it can fit a sentence
+    if length < mercerControl.MIN_WORDS_IN_SENTENCE:
+        raise argparse.ArgumentTypeError("must be at least "+str(mercerControl.MIN_WORDS_IN_SENTENCE)+", the fewest words in a sentence")
+
+    # Return the length
+    return length
+
+# Builds the parser for batch mode's command line arguments
+def buildArgumentParser():
+    # Prep the parser
+    parser = argparse.ArgumentParser(description = "Run a Mercer job without the interactive menus. The brain is loaded once, the job is run, and the brain is saved once.")
+    parser.add_argument("--brain-file",default = None,help = "Path to the brain file. Defaults to the dictionary file for the brain format")
+    parser.add_argument("--brain-format",default = mercerControl.BRAIN_FORMAT_JSON,choices = [mercerControl.BRAIN_FORMAT_JSON,mercerControl.BRAIN_FORMAT_BINARY,mercerControl.BRAIN_FORMAT_SQLITE],help = "Format the brain is saved in")
+    parser.add_argument("--order",type = int,default = mercerControl.NGRAM_ORDER,help = "Number of previous words generation is conditioned on")
+    parser.add_argument("--journal",action = "store_true",help = "Journal learning as it happens")
+    parser.add_argument("--max-words",type = int,default = mercerControl.MAX_BRAIN_WORDS,help = "Max number of words the brain can hold before its least seen words are pruned. 0 is unlimited")
+    parser.add_argument("--max-edges",type = int,default = mercerControl.MAX_BRAIN_EDGES,help = "Max number of word pairs the brain can hold before its least seen pairs are pruned. 0 is unlimited")
+    parser.add_argument("--debug",action = "store_true",help = "Start in Debug Mode")
+    commands = parser.add_subparsers(dest = "command",required = True)
+
+    # Learn command
+    learnParser = commands.add_parser("learn",help = "Learn text files and directories of .txt files")
+    learnParser.add_argument("paths",nargs = "+",help = "Files and directories to learn")
+    learnParser.add_argument("--new-only",action = "store_true",help = "Only learn files, or parts of files, that changed since they were last learned. Always on for directories")
+    learnParser.add_argument("--dedupe",action = "store_true",help = "Skip paragraphs already learned from any file. Implies --new-only")
+    learnParser.add_argument("--workers",type = int,default = 1,help = "Number of processes to count each file with")
+    learnParser.add_argument("--encoding",default = None,help = "Text encoding of the files, like utf-8 or cp1252. Defaults to the locale's encoding")
+    learnParser.add_argument("--approximate",action = "store_true",help = "Count word pairs in a fixed size sketch and only add each word's most common followers to the brain")
+    learnParser.add_argument("--sketch-width",type = int,default = mercerControl.SKETCH_WIDTH,help = "Number of counters in each row of the --approximate sketch")
+    learnParser.add_argument("--sketch-depth",type = int,default = mercerControl.SKETCH_DEPTH,help = "Number of rows in the --approximate sketch")
+
+    # Generate command
+    generateParser = commands.add_parser("generate",help = "Generate lines of text")
+    generateParser.add_argument("lines",type = int,help = "Number of lines to generate")
+    generateParser.add_argument("--max-length",type = readSentenceLength,default = 7,help = "Max number of words in each line. At least "+str(mercerControl.MIN_WORDS_IN_SENTENCE))
+    generateParser.add_argument("--output",default = None,help = "File to write the lines to. Defaults to the console")
+    generateParser.add_argument("--seed",default = None,help = "Seed that makes the lines the same every time")
+    generateParser.add_argument("--workers",type = int,default = 1,help = "Number of processes to generate with")
+
+    # Stats command
+    statsParser = commands.add_parser("stats",help = "Show dictionary statistics")
+    statsParser.add_argument("--json",action = "store_true",help = "Print the statistics as JSON")
+    statsParser.add_argument("--top",type = int,default = 0,help = "Also show this many of the most frequent words")
+
+    # Convert command
+    convertParser = commands.add_parser("convert",help = "Convert the brain file to another brain format, along with its journal, n-gram model, and corpus manifest")
+    convertParser.add_argument("output",help = "Path to write the converted brain file to")
+    convertParser.add_argument("--to",required = True,choices = [mercerControl.BRAIN_FORMAT_JSON,mercerControl.BRAIN_FORMAT_BINARY,mercerControl.BRAIN_FORMAT_SQLITE],help = "Brain format to convert to")
+
+    # Return the parser
+    return parser
+
+# Runs a batch job from command line arguments
+# Returns the exit code
+# argv -> List of command line arguments, without the program name
+def runBatch(argv):
+    # Indicate global
+    global MERCER
+
+    # Read the arguments
+    arguments = buildArgumentParser().parse_args(argv)
+
+    # Check for conversion, which does not need Mercer started
+    if arguments.command == "convert":
+        # Find the brain file
+        brainFile = arguments.brain_file
+        if brainFile == None:
+            brainFile = {mercerControl.BRAIN_FORMAT_BINARY: mercerControl.BINARY_DICTIONARY_FILE, mercerControl.BRAIN_FORMAT_SQLITE: mercerControl.SQLITE_DICTIONARY_FILE}.get(arguments.brain_format,mercerControl.DICTIONARY_FILE)
+
+        # Check it exists
+        if not os.path.isfile(brainFile):
+            print("'"+brainFile+"' does not exist.",file = sys.stderr)
+            return 1
+
+        # Convert
+        mercerControl.convertBrainFile(brainFile,arguments.output,arguments.to)
+        return 0
+
+    # Startup Mercer
+    MERCER = mercerControl.MERCER(arguments.debug,arguments.brain_format,arguments.brain_file,arguments.journal,arguments.order,arguments.max_words,arguments.max_edges)
+
+    # Run the command
+    exitCode = 0
+    shouldSave = False
+    try:
+        if arguments.command == "learn":
+            # Check if learning approximately
+            if arguments.approximate:
+                MERCER.startApproximateLearning(arguments.sketch_width,arguments.sketch_depth)
+
+            # Learn each path
+            shouldSave = True
+            for path in arguments.paths:
+                # Check the kind of path
+                try:
+                    if os.path.isdir(path):
+                        learned = MERCER.learnTextDirectory(path,arguments.dedupe,encoding = arguments.encoding)
+                    elif arguments.new_only or arguments.dedupe:
+                        learned = MERCER.learnCorpusFile(path,arguments.dedupe,encoding = arguments.encoding)
+                    else:
+                        learned = MERCER.learnTextFile(path,workers = arguments.workers,encoding = arguments.encoding)
+                except UnicodeDecodeError as err:
+                    # Fail only this path, keeping anything learned before the bad text
+                    print("'"+path+"' could not be read as "+err.encoding+" text ("+err.reason+"). Pick its encoding with --encoding.",file = sys.stderr)
+                    exitCode = 1
+                    continue
+
+                # Check if success
+                if not learned:
+                    print("'"+path+"' could not be read.",file = sys.stderr)
+                    exitCode = 1
+        elif arguments.command == "generate":
+            # Check where to write
+            if arguments.output != None:
+                # Write to the file
+                MERCER.writeTextToFile(arguments.lines,arguments.max_length,arguments.output,seed = arguments.seed,workers = arguments.workers)
+            else:
+                # Write each line to the console as it is made
+                for sentence in MERCER.chooseGenerator(arguments.lines,arguments.max_length,arguments.seed,arguments.workers):
+                    sys.stdout.write(sentence+"\n")
+                sys.stdout.flush()
+        elif arguments.command == "stats":
+            # Check the format
+            if arguments.json:
+                # Build the statistics
+                stats = {"dictionary": MERCER.getDictionaryStats(False), "metrics": MERCER.getMetrics(False)}
+                if arguments.top > 0:
+                    stats["mostFrequentWords"] = MERCER.getMostFrequentWords(arguments.top,False)
+
+                # Print them
+                print(json.dumps(stats,indent = 4))
+            else:
+                # Print the statistics
+                MERCER.getDictionaryStats()
+                if arguments.top > 0:
+                    MERCER.getMostFrequentWords(arguments.top)
+    except BaseException:
+        # Exit Mercer without saving a job that did not finish, then report the failure
+        MERCER.exitMercer(False)
+        print("The '"+arguments.command+"' job did not finish. The brain file was not saved.",file = sys.stderr)
+        raise
+
+    # Exit Mercer safely, only saving if something was learned
+    MERCER.exitMercer(shouldSave)
+
+    # Return the exit code
+    return exitCode
 
 # Execute Main Thread
-main()
+# Guarded so worker processes that import this file do not start the menus
+if __name__ == "__main__":
+    # Check for a batch job
+    if len(sys.argv) > 1:
+        sys.exit(runBatch(sys.argv[1:]))
+    else:
+        main()
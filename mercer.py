@@ -3,23 +3,58 @@
 
 # Imports
 import os
+import io
 import json
 import random
 import importlib
 from importlib import util as importlibutil
 import datetime
+import time
+import logging
+import queue
+import atexit
 import math
 import re
+import functools
+from collections import Counter
+import threading
+from mercerBrain import MemoryBrain, LEADING, TRAILING, TEMP_FILE_SUFFIX, isBinaryBrainFile, isSQLiteBrainFile
+from mercerJournal import LearningJournal, recoverCompaction, replayJournal, JOURNAL_SUFFIX, COMPACTING_SUFFIX, ENTRY_WORD, ENTRY_EDGE, ENTRY_START, ENTRY_TYPE, ENTRY_NGRAM, ENTRY_FILE, ENTRY_PAGE
+from mercerNGram import NGramModel, countNGrams, readNGramFile, writeNGramFile, NGRAM_SUFFIX
+from mercerCorpus import CorpusManifest, hashFile, hashParagraph, readParagraphs, endsWithNewline, readManifestFile, writeManifestFile, MANIFEST_SUFFIX
+from mercerMetrics import MercerMetrics, profileCall, PROFILER_CPROFILE, PROFILER_TRACEMALLOC
+from mercerSketch import SketchCounts, SKETCH_WIDTH, SKETCH_DEPTH, HEAVY_HITTERS_PER_WORD
 
 # Optional Imports Setup
+# Each is imported by 'loadOptionalImport()' the first time a feature needs it
 praw = None # For Reddit connections (pip install praw)
 requests = None # For general internet requests (pip install requests [or] pipenv install requests)
 elementTree = None # For parsing XML data (Installed by default in Python 3)
+mercerFeeds = None # For fetching and caching RSS feeds and articles (Needs requests)
+mercerSQLiteBrain = None # For brains kept in an SQLite database (Installed by default in Python 3). Only imported once an SQLite brain is used, since 'sqlite3' is slow to import
+OPTIONAL_IMPORTS = { # Module imported for each optional import. Format: [Global Name : Module Name]
+    "praw": "praw",
+    "requests": "requests",
+    "elementTree": "xml.etree.ElementTree",
+    "mercerFeeds": "mercerFeeds",
+    "mercerSQLiteBrain": "mercerSQLiteBrain"
+}
 
 # Constants
 DICTIONARY_FILE = "dictionary.mercer" # Name of the dictionary file
+BINARY_DICTIONARY_FILE = "dictionary.mercerb" # Name of the dictionary file when using the binary brain format
+BRAIN_FORMAT_JSON = "json" # Brain format that stores the dictionary as JSON
+BRAIN_FORMAT_BINARY = "binary" # Brain format that stores the dictionary as memory mappable binary data that is decoded as it is used
+BRAIN_FORMAT_SQLITE = "sqlite" # Brain format that keeps the dictionary in an SQLite database instead of in memory
+SQLITE_DICTIONARY_FILE = "dictionary.sqlite" # Name of the dictionary file when using the SQLite brain format
+SAMPLING_TABLE_CACHE_SIZE = 4096 # Number of sampling tables kept in memory when using the SQLite brain format
+JOURNAL_COMPACT_RATIO = 0.5 # How large the learning journal can grow, as a fraction of the brain file's size, before it is folded into the brain file on exit
 LOG_FILE = "mercerDebugLog.txt" # Name of the Debug log file
 LOG_TAG = "Mercer" # Tag to put before Mercer system messages
+LOG_MAX_BYTES = 5242880 # Size in bytes the debug log file can reach before it is rotated
+LOG_BACKUP_COUNT = 3 # Number of rotated debug log files to keep
+LOG_DEBUG = logging.DEBUG # Log level for detailed messages sent for every sentence or word. Only recorded in debug mode
+LOG_INFO = logging.INFO # Log level for general messages. Always recorded
 NONE_TAG = "<NONE>" # Tag to denote when a string does not exist
 WORD_TYPE_TAGS = { # Tags to denote when a word is appropritate type. Format: [Type Name : Tag]
     "adjective":"Adj",
@@ -29,13 +64,428 @@ WORD_TYPE_TAGS = { # Tags to denote when a word is appropritate type. Format: [T
 MAX_ATTEMPTS = 10 # The maximum amount of attempts for various generations
 MAX_COMMONALITY_DIFFERENCE = 75 # What percentage (1 to 100) from the top of a word's commonality list should be considered when generating sentences
 MIN_WORDS_IN_SENTENCE = 4 # The minimum number of words to be used in a sentence
+SEED_FROM_SENTENCE_STARTS = False # If sentences should only be seeded with words that have been seen starting a sentence
+MAX_BRAIN_WORDS = 0 # Default max number of words the brain can hold before its least seen words are pruned. 0 is unlimited
+MAX_BRAIN_EDGES = 0 # Default max number of word pairs the brain can hold before its least seen pairs are pruned. 0 is unlimited. Each pair takes about 16 bytes in a brain held in memory
+BUDGET_CHECK_INTERVAL = 100000 # Number of words learned between checks of the brain's size against its budget
+PRUNE_TARGET_RATIO = 0.9 # Fraction of its budget the brain is pruned down to, so it is not pruned again right after
+NGRAM_ORDER = 1 # Default number of previous words that generation is conditioned on. Above 1, contexts are learned into an n-gram model saved beside the brain file. 1 only uses the previous word's neighbours
+STREAM_CHUNK_SIZE = 1048576 # Approximate number of characters read at a time when streaming a text file
+SHARD_SIZE = 8388608 # Approximate number of bytes in each shard when learning a text file with multiple workers
+WRITE_BUFFER_SIZE = 1048576 # Number of bytes buffered before generated text is written to a file
+WRITE_FLUSH_INTERVAL = 1000 # Number of sentences written to a file between each flush and progress report
+INGEST_WORKERS = 4 # Max number of threads fetching from the web at once
+INGEST_QUEUE_SIZE = 64 # Max number of fetched text blocks waiting to be learned. Fetching threads wait while the queue is full
+INGEST_PUT_TIMEOUT = 1 # Seconds a fetching thread waits on a full queue before checking if ingestion was stopped
+BBC_NEWS_FEED = "http://feeds.bbci.co.uk/news/rss.xml" # RSS feed read by 'MERCER.learnFromBBCNews()'
+GENERATION_CHUNK_SIZE = 256 # Number of sentences each worker generates at a time when generating with multiple workers
+TOP_WORDS_COUNT = 10 # Default number of words given by 'MERCER.getMostFrequentWords()' and 'MERCER.getMostCommonFollowers()'. At least this many of the most frequent words are cached
+CLEAN_WORD_CACHE_SIZE = 65536 # Number of cleaned words remembered by 'cleanText()'
+TOKEN_CACHE_SIZE = 65536 # Number of tokenized words remembered by 'tokenizeLine()' before the memory is cleared
+TOKEN_PATTERN = re.compile("[.,;\\-!?'\"]*\u201c*\u201d*\u201c*-*(.*?)-*\u201c*\u201d*\u201c*[.,;\\-!?'\"]*",re.DOTALL) # Matches a whole word, capturing it with '.,;-!?'"' stripped, then opening quotes, closing quotes, opening quotes, and dashes
+CLEAN_PATTERN = re.compile("[^\x00-\x7f]|[\n\t()\\[\\]{}\"'*<>]") # Finds the characters removed from words before they are printed
+
+# Logging Functions
+# Background listener that writes queued log records to the debug log file
+logListener = None
+
+# Gets the Mercer logger, starting the background log writer the first time
+# Records are queued by the caller and written to the rotating debug log file by the listener's thread
+def getLogger():
+    # Indicate global
+    global logListener
+
+    # Get the logger
+    logger = logging.getLogger(LOG_TAG)
+
+    # Check if the writer needs to be started
+    if logListener == None:
+        # Import the handlers here, so importing Mercer without starting it stays fast
+        from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+        # Build the rotating file handler
+        fileHandler = RotatingFileHandler(LOG_FILE,maxBytes = LOG_MAX_BYTES,backupCount = LOG_BACKUP_COUNT,delay = True)
+        fileHandler.setFormatter(logging.Formatter("(%(asctime)s) "+LOG_TAG+": %(message)s","%Y-%m-%d %H:%M:%S"))
+
+        # Queue records instead of writing them on the caller's thread
+        logQueue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(logQueue))
+        logger.setLevel(LOG_DEBUG)
+        logger.propagate = False
+
+        # Start the writer and make sure it finishes on exit
+        logListener = QueueListener(logQueue,fileHandler)
+        logListener.start()
+        atexit.register(stopLogging)
+
+    # Return the logger
+    return logger
+
+# Writes any queued log records and stops the background log writer
+def stopLogging():
+    # Indicate global
+    global logListener
+
+    # Stop the writer
+    if logListener != None:
+        logListener.stop()
+        logListener = None
+
+# Text Functions
+# The Token Cache class structure
+# Remembers how each raw word is tokenized. Missing words are tokenized with TOKEN_PATTERN. Cleared once TOKEN_CACHE_SIZE words are held
+class TokenCache(dict):
+    # Tokenizes and remembers a raw word that has not been seen
+    def __missing__(self,rawWord):
+        # Keep the memory bounded
+        if len(self) >= TOKEN_CACHE_SIZE:
+            self.clear()
+
+        # Strip the word and remember it
+        word = TOKEN_PATTERN.fullmatch(rawWord).group(1)
+        self[rawWord] = word
+        return word
+
+# Shared memory of tokenized words
+tokenCache = TokenCache()
+
+# Splits a sentence into its cleaned, lowercase words
+# The whole line is lowercased at once, then each space separated word is looked up in the token cache
+# line -> The sentence to split
+def tokenizeLine(line):
+    return list(map(tokenCache.__getitem__,filter(None,line.strip().lower().split(" "))))
+
+# Ensures that a word fits the print standard and corrects capitolization on personal Is
+# Remembers the most recent CLEAN_WORD_CACHE_SIZE words since the same words are printed again and again
+# word -> The dictionary word to clean
+@functools.lru_cache(maxsize = CLEAN_WORD_CACHE_SIZE)
+def cleanText(word):
+    # Remove Unicode characters, bad tags, and bad characters
+    cleanWord = CLEAN_PATTERN.sub("",word).replace("."," ")
+
+    # Check for personal I
+    if cleanWord == "i":
+        return "I"
+
+    # Check if word got compounded
+    if " " in cleanWord:
+        # Clean each part of the compounded word
+        return "".join([" "+("I" if part == "i" else part) for part in cleanWord.split(" ")])
+
+    # Send the cleaned one
+    return cleanWord
+
+# Counts the words, word pairs, sentence starts, and word sequences of a chunk of text lines in the same way 'MERCER.learnTextBlock()' learns them
+# Returns a tuple of (Counter of words, Counter of (Leading Word, Trailing Word) pairs, List of sentence starting words, Counter of word sequence tuples) for 'MERCER.learnCounts()'
+# lines -> List of text lines
+# order -> The n-gram order being learned. Word sequences are only counted above 1
+def countLines(lines,order = 1):
+    # Prep the counts
+    wordCounts = Counter()
+    pairCounts = Counter()
+    sentenceStarts = []
+    ngramCounts = Counter()
+
+    # Loop through the lines
+    for line in lines:
+        # Split the sentences apart
+        for sentence in line.strip("\n").split(".?!"):
+            # Clean the words
+            words = tokenizeLine(sentence)
+
+            # Make sure it's not empty
+            if len(words) > 0:
+                # Count the words and the pairs they form
+                wordCounts.update(words)
+                pairCounts.update(zip(words,words[1:]))
+
+                # Record the word that started the sentence
+                sentenceStarts.append(words[0])
+
+                # Count the word sequences
+                if order > 1:
+                    countNGrams(words,order,ngramCounts)
+
+    # Return the counts
+    return (wordCounts,pairCounts,sentenceStarts,ngramCounts)
+
+# Finds the fewest occurances something needs to be kept so that no more than 'target' things are kept
+# Things with the same occurances are kept or removed together. If the most seen things alone are over the target, they are all kept
+# histogram -> Counter of [Occurances : Number of Things], like from 'MemoryBrain.getEdgeHistogram()'
+# target -> Max number of things to keep
+def findMinOccurances(histogram,target):
+    # Keep from the most seen down until the target would be passed
+    kept = 0
+    minOccurances = None
+    for occurances in sorted(histogram,reverse = True):
+        # Check if these would pass the target
+        kept += histogram[occurances]
+        if kept > target:
+            break
+
+        # Keep them
+        minOccurances = occurances
+
+    # Keep at least the most seen
+    if minOccurances == None:
+        minOccurances = max(histogram,default = 1)
+
+    # Return the minimum
+    return minOccurances
+
+# Splits a file into line aligned shards of about 'shardSize' bytes
+# Returns a list of (Start Byte, End Byte) tuples
+# file -> Path to the file to split
+# shardSize -> Approximate number of bytes in each shard
+def findFileShards(file,shardSize):
+    # Prep the shards
+    shards = []
+
+    # Open the file as bytes
+    with open(file,"rb") as fileRead:
+        # Get the file size
+        fileSize = os.fstat(fileRead.fileno()).st_size
+
+        # Walk through the file
+        start = 0
+        while start < fileSize:
+            # Jump ahead and finish the line that lands on
+            fileRead.seek(min(start+shardSize,fileSize))
+            fileRead.readline()
+            end = fileRead.tell()
+
+            # Add the shard
+            shards.append((start,end))
+
+            # Iterate
+            start = end
+
+    # Return the shards
+    return shards
+
+# Counts a shard of a text file with 'countLines()'. Used by process pool workers in 'MERCER.learnTextFile()'
+# shard -> Tuple of (File Path, Start Byte, End Byte, N-Gram Order, Encoding)
+def countFileShard(shard):
+    # Unpack the shard
+    file, start, end, order, encoding = shard
+
+    # Read the shard's bytes
+    with open(file,"rb") as fileRead:
+        fileRead.seek(start)
+        data = fileRead.read(end-start)
+
+    # Decode the same way 'open()' would and count the lines
+    return countLines(io.TextIOWrapper(io.BytesIO(data),encoding = encoding).readlines(),order)
+
+# Optional Import Functions
+# Checks if an optional import can be imported without importing anything
+# Only the top level package is looked for, since finding a submodule imports its parents
+# name -> Global name of the optional import from OPTIONAL_IMPORTS
+def isOptionalImportAvailable(name):
+    return importlibutil.find_spec(OPTIONAL_IMPORTS[name].split(".")[0]) != None
+
+# Imports an optional import into its global if it is not already
+# Returns True if the import is ready to use
+# name -> Global name of the optional import from OPTIONAL_IMPORTS
+def loadOptionalImport(name):
+    # Check if already imported
+    if globals()[name] != None:
+        return True
+
+    # Check if it can be imported
+    if not isOptionalImportAvailable(name):
+        return False
+
+    # Import the module
+    globals()[name] = importlib.import_module(OPTIONAL_IMPORTS[name])
+    return True
+
+# Checks if a brain is an SQLiteBrain
+# Nothing can be one before the SQLite brain module is imported, so it is not imported to check
+def isSQLiteBrain(brain):
+    return mercerSQLiteBrain != None and isinstance(brain,mercerSQLiteBrain.SQLiteBrain)
+
+# Generation Functions
+# The MERCER whose brain forked generation workers share
+batchMercer = None
+
+# Prepares a forked worker process. Used as the initializer of process pools that share a brain
+# Forked workers have no log writer thread, so their log records are dropped instead of queued forever. 'random' is reseeded so workers do not repeat each other
+def startForkedWorker():
+    logging.getLogger(LOG_TAG).disabled = True
+    random.seed()
+
+# Generates a span of seeded sentences. Used by process pool workers in 'MERCER.generateBatch()'
+# span -> Tuple of (First Sentence Index, End Sentence Index, Max Sentence Length, Seed)
+def createBatchSentences(span):
+    # Unpack the span
+    start, end, sentenceMaxLength, seed = span
+
+    # Generate each sentence
+    return [batchMercer.createSeededSentence(index,sentenceMaxLength,seed) for index in range(start,end)]
+
+# Brain File Functions
+# Reads a brain file of any format
+# Returns a MemoryBrain, or an SQLiteBrain for SQLite databases
+# file -> Path to the brain file
+def readBrainFile(file):
+    # Check for a database
+    if isSQLiteBrainFile(file):
+        loadOptionalImport("mercerSQLiteBrain")
+        return mercerSQLiteBrain.SQLiteBrain(file,NONE_TAG)
+
+    # Prep the brain
+    brain = MemoryBrain(NONE_TAG)
+
+    # Check the format
+    if isBinaryBrainFile(file):
+        # Map the binary data
+        brain.loadBinary(file)
+    else:
+        # Read the JSON data
+        with open(file,"r") as brainFile:
+            brain.loadStored(json.loads(brainFile.read()))
+
+    # Return the brain
+    return brain
+
+# Writes a brain to a file in the specified format
+# brain -> The MemoryBrain or SQLiteBrain to write
+# file -> Path to the brain file
+# brainFormat -> BRAIN_FORMAT_JSON, BRAIN_FORMAT_BINARY, or BRAIN_FORMAT_SQLITE
+# pretty -> If JSON should be indented to be human readable
+def writeBrainFile(brain,file,brainFormat,pretty = False):
+    # Check the format
+    if brainFormat == BRAIN_FORMAT_SQLITE:
+        # Check if the brain is already that database
+        if isSQLiteBrain(brain) and os.path.abspath(brain.file) == os.path.abspath(file):
+            # Write pending changes
+            brain.commit()
+        else:
+            # Fill a new database first so a failed save leaves the old file intact
+            if os.path.isfile(file+TEMP_FILE_SUFFIX):
+                os.remove(file+TEMP_FILE_SUFFIX)
+            loadOptionalImport("mercerSQLiteBrain")
+            database = mercerSQLiteBrain.SQLiteBrain(file+TEMP_FILE_SUFFIX,NONE_TAG)
+            database.loadStored(brain.toStored())
+            database.close()
+
+            # Replace the file
+            os.replace(file+TEMP_FILE_SUFFIX,file)
+    elif brainFormat == BRAIN_FORMAT_BINARY:
+        # Write the binary data
+        if isSQLiteBrain(brain):
+            # Copy into memory first
+            memoryBrain = MemoryBrain(NONE_TAG)
+            memoryBrain.loadStored(brain.toStored())
+            brain = memoryBrain
+        brain.saveBinary(file)
+    else:
+        # Write the JSON data to a temporary file first so a failed save leaves the old file intact
+        with open(file+TEMP_FILE_SUFFIX,"w") as brainFile:
+            # Convert the brain to the stored list format
+            storedDictionary = brain.toStored()
+
+            # Check if pretty
+            if pretty:
+                # Print dictionary fancy
+                brainFile.write(json.dumps(storedDictionary, indent = 4))
+            else:
+                # Print dictionary smaller
+                brainFile.write(json.dumps(storedDictionary))
+
+        # Release any binary file the brain was loaded from so it can be replaced
+        if isinstance(brain,MemoryBrain):
+            brain.releaseBinarySource()
+
+        # Replace the file
+        os.replace(file+TEMP_FILE_SUFFIX,file)
+
+# Converts a brain file of any format to the specified format
+# inFile -> Path to the brain file to convert
+# outFile -> Path to write the converted brain file to
+# The n-gram model and corpus manifest saved beside the brain file are carried over, and anything journaled since the brain file was written is folded in
+# brainFormat -> BRAIN_FORMAT_JSON, BRAIN_FORMAT_BINARY, or BRAIN_FORMAT_SQLITE
+def convertBrainFile(inFile,outFile,brainFormat):
+    # Finish any save that was interrupted, before any of the brain's files are read
+    if not isSQLiteBrainFile(inFile):
+        recoverCompaction(inFile,[inFile+NGRAM_SUFFIX, inFile+MANIFEST_SUFFIX])
+
+    # Read the brain
+    brain = readBrainFile(inFile)
+
+    # Read the n-gram model and corpus manifest
+    model = readNGramFile(inFile+NGRAM_SUFFIX) if os.path.isfile(inFile+NGRAM_SUFFIX) else NGramModel(NGRAM_ORDER)
+    manifest = readManifestFile(inFile+MANIFEST_SUFFIX) if os.path.isfile(inFile+MANIFEST_SUFFIX) else CorpusManifest()
+
+    # Replay anything learned since the brain file was written. SQLite brains save as they learn and do not use a journal
+    journalFile = inFile+JOURNAL_SUFFIX
+    if not isSQLiteBrain(brain) and os.path.isfile(journalFile):
+        replayJournal(journalFile,brain,model,manifest)
+
+    # Write the n-gram model and corpus manifest beside the converted brain, if there is anything in them
+    if len(model.root) > 0:
+        writeNGramFile(model,outFile+NGRAM_SUFFIX)
+    if not manifest.isEmpty():
+        writeManifestFile(manifest,outFile+MANIFEST_SUFFIX)
+
+    # Write it in the new format
+    writeBrainFile(brain,outFile,brainFormat)
+
+    # Remove any journal of a brain that was at the converted brain's path, since it would be replayed onto the converted brain
+    if os.path.isfile(outFile+JOURNAL_SUFFIX):
+        os.remove(outFile+JOURNAL_SUFFIX)
+
+    # Close a database
+    if isSQLiteBrain(brain):
+        brain.close()
 
 # The MERCER Class structure
 class MERCER:
     ## Constructor
-    def __init__(self, debug = False):
+    # debug -> If debug mode should start enabled
+    # brainFormat -> BRAIN_FORMAT_JSON, BRAIN_FORMAT_BINARY, or BRAIN_FORMAT_SQLITE. The format the brain is saved in. SQLite brains are read from disk as they are used instead of held in memory
+    # brainFile -> Path to the brain file. Defaults to the dictionary file for the brain format
+    # journal -> If learning should be recorded to a journal as it happens instead of only being saved on exit. SQLite brains write as they learn and do not use a journal
+    # order -> Number of previous words that generation is conditioned on. Above 1, contexts of up to that many words are learned into an n-gram model saved beside the brain file, and unseen contexts back off to shorter ones
+    # maxWords -> Max number of words the brain can hold. Checked every BUDGET_CHECK_INTERVAL learned words. 0 is unlimited
+    # maxEdges -> Max number of word pairs the brain can hold. Checked every BUDGET_CHECK_INTERVAL learned words. 0 is unlimited
+    def __init__(self, debug = False, brainFormat = BRAIN_FORMAT_JSON, brainFile = None, journal = False, order = NGRAM_ORDER, maxWords = MAX_BRAIN_WORDS, maxEdges = MAX_BRAIN_EDGES):
         # Set debug mode
         self.debugMode = debug
+        self.logger = getLogger()
+        self.logLevel = LOG_DEBUG if debug else LOG_INFO
+
+        # Set journal mode
+        self.useJournal = journal
+
+        # Set the n-gram order
+        self.order = max(order,1)
+
+        # Set the brain budget
+        self.maxWords = maxWords
+        self.maxEdges = maxEdges
+        self.wordsSinceBudgetCheck = 0
+
+        # Prep approximate learning, which is off until started
+        self.sketch = None
+
+        # Prep the metrics
+        self.metrics = MercerMetrics()
+
+        # Prep the web client, which is made when first needed
+        self.feedClient = None
+
+        # Set the brain file
+        self.brainFormat = brainFormat
+        if brainFile != None:
+            self.brainFile = brainFile
+        elif brainFormat == BRAIN_FORMAT_BINARY:
+            self.brainFile = BINARY_DICTIONARY_FILE
+        elif brainFormat == BRAIN_FORMAT_SQLITE:
+            self.brainFile = SQLITE_DICTIONARY_FILE
+        else:
+            self.brainFile = DICTIONARY_FILE
 
         # Alert startup
         self.log("Initializing.")
@@ -50,47 +500,239 @@ class MERCER:
         self.log("System Loaded.")
 
     ## Exit Protocol
-    def exitMercer(self):
-        # Save dictionary to file
-        with open(DICTIONARY_FILE,"w") as brainFile:
-            # Check debug mode
-            if self.debugMode:
-                # Debug mode, print dictionary fancy
-                brainFile.write(json.dumps(self.dictionary, indent = 4))
-            else:
-                # Not debug mode, print dictionary smaller
-                brainFile.write(json.dumps(self.dictionary))
+    # save -> If the brain should be saved. Jobs that only read the brain can skip writing it
+    def exitMercer(self,save = True):
+        # Check if saving
+        if save:
+            # Add anything learned approximately
+            if self.sketch != None:
+                self.promoteSketch()
+
+            # Make sure the saved brain is within its budget
+            self.enforceBrainBudget()
+
+        # Check journal mode
+        if self.journal != None:
+            # Fold the journal into the brain file once it has grown large compared to it
+            if save and self.journal.getSize() > (os.path.getsize(self.brainFile)*JOURNAL_COMPACT_RATIO):
+                self.compactBrain()
+
+            # Close the journal, which flushes it
+            self.journal.close()
+            self.journal = None
+        elif save:
+            # Save dictionary to file
+            self.compactBrain()
+
+        # Close a database, writing its pending changes only if saving
+        if isSQLiteBrain(self.dictionary):
+            self.dictionary.close(save)
+
+        # Close the web client
+        if self.feedClient != None:
+            self.feedClient.close()
+            self.feedClient = None
 
         # Report exit
         self.log("Mercer ready to close.")
 
     ## Functional Methods
-    # Establish the JSON formatted brain data
+    # Establish the brain data from the brain file
     def establishBrain(self):
+        # Reset the cached most frequent words. Format: ((Word Count, Token Count), List of (Word, Occurances))
+        self.topWordsCache = None
+
+        # Finish any save that was interrupted, before any of the brain's files are read
+        if self.brainFormat != BRAIN_FORMAT_SQLITE:
+            recoverCompaction(self.brainFile,self.getSideFiles())
+
+        # Load the corpus manifest
+        manifestFile = self.brainFile+MANIFEST_SUFFIX
+        if os.path.isfile(manifestFile):
+            self.manifest = readManifestFile(manifestFile)
+        else:
+            self.manifest = CorpusManifest()
+
+        # Load the n-gram model if one was saved, whatever order was asked for, so the word sequences it holds are kept while they are not used
+        # It is only learned from and followed when the order is above 1
+        self.ngramModel = None
+        ngramFile = self.brainFile+NGRAM_SUFFIX
+        if os.path.isfile(ngramFile):
+            # Keep the longest order it has learned or will learn
+            self.ngramModel = readNGramFile(ngramFile)
+            self.ngramModel.order = max(self.ngramModel.order,self.order)
+        elif self.order > 1:
+            # Start a new one
+            self.ngramModel = NGramModel(self.order)
+
+        # Check for the SQLite brain
+        if self.brainFormat == BRAIN_FORMAT_SQLITE:
+            # Connect to the database, creating it if needed
+            loadOptionalImport("mercerSQLiteBrain")
+            self.dictionary = mercerSQLiteBrain.SQLiteBrain(self.brainFile,NONE_TAG)
+
+            # Database changes are saved as they are learned
+            self.journal = None
+            if self.useJournal:
+                self.log("SQLite brains save as they learn. The journal is not used.")
+
+            # Reset the cached sampling tables used by 'chooseWordToFollow()', keeping only the most recently used
+            self.samplingTables = mercerSQLiteBrain.LRUCache(SAMPLING_TABLE_CACHE_SIZE)
+
+            # Done
+            return
+
         # Check if dictionary exists
-        if not os.path.isfile(DICTIONARY_FILE):
+        if not os.path.isfile(self.brainFile):
             # Create it
-            with open(DICTIONARY_FILE,"w") as brainFile:
-                brainFile.write("{\n}")
+            writeBrainFile(MemoryBrain(NONE_TAG),self.brainFile,self.brainFormat)
 
         # Establish dictionary
-        with open(DICTIONARY_FILE,"r") as brainFile:
-            # Convert data to JSON
-            self.dictionary = json.loads(brainFile.read())
+        self.dictionary = readBrainFile(self.brainFile)
+
+        # Replay anything learned since the brain file was written
+        journalFile = self.brainFile+JOURNAL_SUFFIX
+        validBytes = None
+        if os.path.isfile(journalFile):
+            # Replay into a model even if none is used, so word sequences journaled at a higher order are not lost
+            if self.ngramModel == None:
+                self.ngramModel = NGramModel(self.order)
+            validBytes = replayJournal(journalFile,self.dictionary,self.ngramModel,self.manifest)
+            self.log("Replayed "+str(validBytes)+" bytes of journaled learning.")
+
+            # Drop the model again if none is used and nothing was replayed into it
+            if self.order == 1 and self.ngramModel.getNodeCount() == 0:
+                self.ngramModel = None
+
+        # Only count pairs learned from here on as new
+        self.dictionary.takeNewEdgeCount()
+
+        # Open the journal
+        self.journal = None
+        if self.useJournal:
+            self.journal = LearningJournal(journalFile,validBytes)
+
+        # Reset the cached sampling tables used by 'chooseWordToFollow()'
+        self.samplingTables = {}
+
+    # Gets the paths of the files saved beside the brain file
+    def getSideFiles(self):
+        return [self.brainFile+NGRAM_SUFFIX, self.brainFile+MANIFEST_SUFFIX]
+
+    # Writes the whole brain to the brain file and folds in the journal
+    # The journal is renamed before any file is written and removed after. The n-gram model and corpus manifest are written to temporary files,
+    # then the brain file is replaced, then the temporary files replace theirs. Replacing the brain file is the single step 'recoverCompaction()'
+    # takes as done: before it, the journal is replayed again and the temporary files are dropped; after it, the temporary files are moved into place
+    def compactBrain(self):
+        # Start timing
+        start = time.perf_counter()
+
+        # Get the journal paths
+        journalFile = self.brainFile+JOURNAL_SUFFIX
+        compactingFile = journalFile+COMPACTING_SUFFIX
+
+        # Close the journal
+        if self.journal != None:
+            self.journal.close()
+
+        # Set aside the journal being folded in
+        if os.path.isfile(journalFile):
+            # Mark the brain file as not yet replaced
+            open(self.brainFile+TEMP_FILE_SUFFIX,"w").close()
+
+            # Rename the journal
+            os.replace(journalFile,compactingFile)
+
+        # Write the n-gram model and corpus manifest to their temporary files
+        ngramFile, manifestFile = self.getSideFiles()
+        sideFiles = []
+        if self.ngramModel != None:
+            writeNGramFile(self.ngramModel,ngramFile+TEMP_FILE_SUFFIX)
+            sideFiles.append(ngramFile)
+        if not self.manifest.isEmpty():
+            writeManifestFile(self.manifest,manifestFile+TEMP_FILE_SUFFIX)
+            sideFiles.append(manifestFile)
+
+        # Write the brain file
+        writeBrainFile(self.dictionary,self.brainFile,self.brainFormat,self.debugMode)
+
+        # Move the n-gram model and corpus manifest into place
+        for sideFile in sideFiles:
+            os.replace(sideFile+TEMP_FILE_SUFFIX,sideFile)
+
+        # Remove the folded journal
+        if os.path.isfile(compactingFile):
+            os.remove(compactingFile)
+
+        # Start a new journal
+        if self.journal != None:
+            self.journal = LearningJournal(journalFile)
+
+        # Record the time
+        self.metrics.addTime("persist",start)
+
+        # Log
+        self.log("Saved the brain to '"+self.brainFile+"'.")
 
     # Learn a plain text file like .txt or similar
-    def learnTextFile(self, file):
+    # file -> Path to the file to learn
+    # streaming -> If the file should be read in large chunks that are counted and learned in one batch each instead of line by line
+    # workers -> Number of processes to count the file with. Above 1, the file is split into shards that are counted in parallel and then learned in order
+    # encoding -> Text encoding of the file. None uses the locale's default
+    def learnTextFile(self, file, streaming = True, workers = 1, encoding = None):
         # Log
         self.log("Learning '"+file+"'.")
 
         # Check if file exists
         if os.path.isfile(file):
+            # Check if multiple workers should be used
+            if workers > 1:
+                # Import the process pools, which are only needed with workers
+                import multiprocessing
+
+                # Split the file into shards
+                shards = [(file,start,end,self.order,encoding) for start, end in findFileShards(file,SHARD_SIZE)]
+
+                # Log
+                self.log("Counting "+str(len(shards))+" shards with "+str(workers)+" workers.")
+
+                # Count the shards in parallel
+                with multiprocessing.Pool(min(workers,max(len(shards),1))) as pool:
+                    # Learn each shard's counts in file order, timing the wait for each as tokenizing
+                    start = time.perf_counter()
+                    for counts in pool.imap(countFileShard,shards):
+                        self.metrics.addTime("tokenize",start)
+                        self.learnCounts(*counts)
+                        start = time.perf_counter()
+
+                # Flush the journal
+                if self.journal != None:
+                    self.journal.flush()
+
+                # Return success
+                return True
+
             # Open and read file
-            with open(file,"r") as fileRead:
-                # Read line by line
-                for line in fileRead:
-                    # Learn the line
-                    self.learnTextBlock(line.strip("\n"))
+            with open(file,"r",encoding = encoding) as fileRead:
+                # Check mode
+                if streaming:
+                    # Read chunk by chunk
+                    lines = fileRead.readlines(STREAM_CHUNK_SIZE)
+                    while len(lines) > 0:
+                        # Count and learn the chunk
+                        self.learnLines(lines)
+
+                        # Read the next chunk
+                        lines = fileRead.readlines(STREAM_CHUNK_SIZE)
+                else:
+                    # Read line by line
+                    for line in fileRead:
+                        # Learn the line
+                        self.learnTextBlock(line.strip("\n"))
+
+            # Flush the journal
+            if self.journal != None:
+                self.journal.flush()
 
             # Return success
             return True
@@ -101,6 +743,139 @@ class MERCER:
             # Return failure
             return False
 
+    # Learns a text file only if it is new or has changed since it was last learned with this method
+    # Each file's size, hash, and paragraph hashes are kept in a corpus manifest saved beside the brain file.
+    # If the file only had text added to its end, only the added text is learned. If it changed otherwise, only paragraphs it did not have before are learned
+    # Returns True if the file was read
+    # file -> Path to the file to learn
+    # dedupe -> If paragraphs already learned from any file should be skipped
+    # knownParagraphs -> Optional set of every learned paragraph hash to dedupe with. Shared when learning many files. Built from the manifest if not given
+    # encoding -> Text encoding of the file. None uses the locale's default
+    def learnCorpusFile(self,file,dedupe = False,knownParagraphs = None,encoding = None):
+        # Check if file exists
+        if not os.path.isfile(file):
+            # Report file not found
+            self.log("'"+file+"' does not exist.")
+
+            # Return failure
+            return False
+
+        # Hash the file, and the part learned before if it could have been added to
+        record = self.manifest.getRecord(file)
+        learnedSize = None
+        if record != None and record["endsWithNewline"]:
+            learnedSize = record["size"]
+        size, fileHash, prefixHash = hashFile(file,learnedSize)
+
+        # Check if unchanged
+        if record != None and record["hash"] == fileHash:
+            # Log
+            self.log("'"+file+"' has not changed since it was learned.")
+
+            # Return success
+            return True
+
+        # Check how the file changed
+        start = 0
+        paragraphs = []
+        oldParagraphs = set()
+        if record != None and prefixHash == record["hash"]:
+            # Only learn what was added
+            self.log("Learning what was added to '"+file+"'.")
+            start = record["size"]
+            paragraphs = list(record["paragraphs"])
+        elif record != None:
+            # Only learn new paragraphs
+            self.log("Learning what changed in '"+file+"'.")
+            oldParagraphs = set(record["paragraphs"])
+        else:
+            # Learn it all
+            self.log("Learning '"+file+"'.")
+
+        # Get the paragraphs to dedupe with
+        if dedupe and knownParagraphs == None:
+            knownParagraphs = self.manifest.getAllParagraphs()
+
+        # Learn the paragraphs in chunks
+        lines = []
+        chunkSize = 0
+        for paragraph in readParagraphs(file,start,encoding):
+            # Record the paragraph
+            paragraphHash = hashParagraph(paragraph)
+            paragraphs.append(paragraphHash)
+
+            # Check if it was learned before
+            if paragraphHash in oldParagraphs or (dedupe and paragraphHash in knownParagraphs):
+                continue
+            if dedupe:
+                knownParagraphs.add(paragraphHash)
+
+            # Add the paragraph to the chunk
+            lines.extend(paragraph)
+            chunkSize += sum([len(line) for line in paragraph])
+
+            # Learn the chunk once full
+            if chunkSize >= STREAM_CHUNK_SIZE:
+                self.learnLines(lines)
+                lines = []
+                chunkSize = 0
+
+        # Learn the last chunk
+        if len(lines) > 0:
+            self.learnLines(lines)
+
+        # Record the file
+        record = {"size": size, "hash": fileHash, "endsWithNewline": endsWithNewline(file), "paragraphs": paragraphs}
+        self.manifest.setRecord(file,record)
+
+        # Journal the record
+        if self.journal != None:
+            self.journal.record(ENTRY_FILE,os.path.abspath(file),record)
+            self.journal.flush()
+
+        # Return success
+        return True
+
+    # Learns every new or changed text file in a directory with 'learnCorpusFile()'
+    # Returns True if the directory was read
+    # directory -> Path to the directory to learn
+    # dedupe -> If paragraphs already learned from any file should be skipped
+    # extension -> Extension of the files to learn
+    # encoding -> Text encoding of the files. None uses the locale's default
+    def learnTextDirectory(self,directory,dedupe = False,extension = ".txt",encoding = None):
+        # Check if directory exists
+        if not os.path.isdir(directory):
+            # Report directory not found
+            self.log("'"+directory+"' does not exist.")
+
+            # Return failure
+            return False
+
+        # Get the paragraphs to dedupe with once for every file
+        knownParagraphs = None
+        if dedupe:
+            knownParagraphs = self.manifest.getAllParagraphs()
+
+        # Learn each file in order
+        for fileName in sorted(os.listdir(directory)):
+            file = os.path.join(directory,fileName)
+            if fileName.endswith(extension) and os.path.isfile(file):
+                self.learnCorpusFile(file,dedupe,knownParagraphs,encoding)
+
+        # Return success
+        return True
+
+    # Counts and learns a chunk of text lines in one batch
+    # lines -> List of text lines
+    def learnLines(self,lines):
+        # Count the lines
+        start = time.perf_counter()
+        counts = countLines(lines,self.order)
+        self.metrics.addTime("tokenize",start)
+
+        # Learn the counts
+        self.learnCounts(*counts)
+
     # Splits and learns each sentence from a block of sentences.
     # *This is generally the function you want to start with when learning text.*
     def learnTextBlock(self,textBlock):
@@ -115,14 +890,26 @@ class MERCER:
 
     # Splits and learns the sentence that is fed to the function.
     def learnLine(self,line):
-        # Loop through words to clean them
-        words = []
-        for wordPunc in line.strip().split(" "):
-            if wordPunc != "":
-                words.append(wordPunc.strip(".,;-!?'\"").strip(u'\u201c').strip(u'\u201d').strip(u'\u201c').strip(u'--').lower()) # Add more characters as applicable
+        # Clean the words
+        start = time.perf_counter()
+        words = tokenizeLine(line)
+        self.metrics.addTime("tokenize",start)
 
         # Make sure it's not empty
         if len(words) > 0:
+            # Start timing
+            start = time.perf_counter()
+            self.metrics.count("tokensLearned",len(words))
+
+            # Check for approximate learning
+            if self.sketch != None:
+                # Count into the sketch instead
+                self.learnSketchCounts(Counter(zip(words,words[1:])),[words[0]])
+
+                # Record the time
+                self.metrics.addTime("update",start)
+                return
+
             # Establish current word index
             wordIndex = 0
 
@@ -148,247 +935,574 @@ class MERCER:
                 # Iterate
                 wordIndex += 1
 
+            # Record the word that started the sentence
+            self.learnSentenceStart(words[0])
+
+            # Learn the word sequences
+            if self.ngramModel != None and self.order > 1:
+                ngramCounts = Counter()
+                countNGrams(words,self.order,ngramCounts)
+                self.learnNGrams(ngramCounts)
+
+            # Record the time
+            self.metrics.addTime("update",start)
+
+            # Keep the brain within its budget
+            self.checkBrainBudget(len(words))
+
+    # Learns the counts built by 'countLines()' in one batch
+    # wordCounts -> Counter of words
+    # pairCounts -> Counter of (Leading Word, Trailing Word) pairs
+    # sentenceStarts -> List of sentence starting words
+    # ngramCounts -> Counter of word sequence tuples. Only learned when an n-gram model is used
+    def learnCounts(self,wordCounts,pairCounts,sentenceStarts,ngramCounts = None):
+        # Start timing
+        start = time.perf_counter()
+        tokens = sum(wordCounts.values())
+        self.metrics.count("tokensLearned",tokens)
+
+        # Check for approximate learning
+        if self.sketch != None:
+            # Count into the sketch instead
+            self.learnSketchCounts(pairCounts,sentenceStarts)
+
+            # Record the time
+            self.metrics.addTime("update",start)
+            return
+
+        # Add any new words
+        for word in wordCounts:
+            if word not in self.dictionary:
+                # Add the word
+                self.dictionary.addWord(word)
+                self.metrics.count("newWords")
+
+                # Journal the word
+                if self.journal != None:
+                    self.journal.record(ENTRY_WORD,word)
+
+        # Add the pairs to both words
+        for (leadingWord, trailingWord), count in pairCounts.items():
+            # Add the pair
+            self.dictionary.addPair(leadingWord,trailingWord,count)
+
+            # Journal both sides
+            if self.journal != None:
+                self.journal.record(ENTRY_EDGE,leadingWord,trailingWord,TRAILING,count)
+                self.journal.record(ENTRY_EDGE,trailingWord,leadingWord,LEADING,count)
+
+            # Invalidate the leading word's sampling table
+            self.samplingTables.pop(leadingWord,None)
+
+        # Count the new pairs
+        self.countNewEdges()
+
+        # Record the sentence starts
+        for word, count in Counter(sentenceStarts).items():
+            # Add the starts
+            self.dictionary.addStart(word,count)
+
+            # Journal the starts
+            if self.journal != None:
+                self.journal.record(ENTRY_START,word,count)
+
+        # Learn the word sequences
+        if self.ngramModel != None and self.order > 1 and ngramCounts != None:
+            self.learnNGrams(ngramCounts)
+
+        # Record the time
+        self.metrics.addTime("update",start)
+
+        # Keep the brain within its budget
+        self.checkBrainBudget(tokens)
+
+    # Learns word sequences into the n-gram model
+    # ngramCounts -> Counter of word sequence tuples
+    def learnNGrams(self,ngramCounts):
+        # Add each sequence
+        for words, count in ngramCounts.items():
+            # Add the sequence
+            self.ngramModel.addNGram(words,count)
+
+            # Journal the sequence
+            if self.journal != None:
+                self.journal.record(ENTRY_NGRAM,words,count)
+
+            # Invalidate the context's sampling table
+            self.samplingTables.pop(words[:-1],None)
+
+    # Records that the word started a sentence. The word must already be in the dictionary
+    def learnSentenceStart(self,word):
+        # Increase the start count
+        self.dictionary.addStart(word)
+
+        # Journal the start
+        if self.journal != None:
+            self.journal.record(ENTRY_START,word,1)
+
+    # Starts approximate learning
+    # Until 'promoteSketch()', learned word pairs and sentence starts are counted in a count-min sketch instead of the brain, and only the
+    # most common followers of each word are kept as candidates. Memory depends on the sketch size instead of how much is learned.
+    # The n-gram model is not learned into and nothing is journaled until the candidates are promoted. See 'mercerSketch.py' for the error bounds
+    # width -> Number of counters in each row of the sketch
+    # depth -> Number of rows in the sketch
+    # heavyHitters -> Number of candidate followers kept for each word
+    def startApproximateLearning(self,width = SKETCH_WIDTH,depth = SKETCH_DEPTH,heavyHitters = HEAVY_HITTERS_PER_WORD):
+        # Make the sketch
+        self.sketch = SketchCounts(width,depth,heavyHitters)
+
+        # Log
+        epsilon, delta, overcount = self.sketch.sketch.getErrorBounds()
+        self.log("Started approximate learning with a "+str(width)+"x"+str(depth)+" sketch ("+str(self.sketch.sketch.getMemoryBytes()//1048576)+" MB). Estimates are over by at most "+str(epsilon)+" times the pairs learned with "+str(round((1-delta)*100,1))+"% confidence.")
+
+    # Counts word pairs and sentence starts into the approximate learning sketch
+    # pairCounts -> Counter of (Leading Word, Trailing Word) pairs
+    # sentenceStarts -> List or Counter of sentence starting words
+    def learnSketchCounts(self,pairCounts,sentenceStarts):
+        # Count the pairs
+        for (leadingWord, trailingWord), count in pairCounts.items():
+            self.sketch.addPair(leadingWord,trailingWord,count)
+
+        # Count the sentence starts
+        for word, count in Counter(sentenceStarts).items():
+            self.sketch.addStart(word,count)
+
+    # Adds the candidate pairs from approximate learning to the brain with their estimated occurances, then starts a new sketch of the same size
+    # The words of the added pairs get their estimated sentence starts
+    # Returns the number of pairs added
+    # minOccurances -> Fewest estimated occurances a candidate pair needs to be added
+    def promoteSketch(self,minOccurances = 1):
+        # Check if learning approximately
+        sketch = self.sketch
+        if sketch == None:
+            return 0
+
+        # Collect the candidates
+        pairCounts = Counter()
+        words = {}
+        for leadingWord, trailingWord, estimate in sketch.getCandidates(minOccurances):
+            pairCounts[(leadingWord,trailingWord)] = estimate
+            words[leadingWord] = 0
+            words[trailingWord] = 0
+
+        # Estimate the sentence starts of their words
+        sentenceStarts = Counter()
+        for word in words:
+            sentenceStarts[word] = sketch.getStarts(word)
+
+        # Learn them exactly, without counting the words learned again
+        self.sketch = None
+        try:
+            self.learnCounts(words,pairCounts,+sentenceStarts)
+        finally:
+            # Start a new sketch
+            self.sketch = SketchCounts(sketch.sketch.width,sketch.sketch.depth,sketch.heavyHitters,sketch.maxWords)
+
+        # Log
+        epsilon, delta, overcount = sketch.sketch.getErrorBounds()
+        self.log("Promoted "+str(len(pairCounts))+" of "+str(sketch.getCandidateCount())+" candidate pairs. Estimates were at most "+str(round(overcount,1))+" over with "+str(round((1-delta)*100,1))+"% confidence.")
+
+        # Make sure the brain is within its budget
+        self.enforceBrainBudget()
+
+        # Return the pair count
+        return len(pairCounts)
+
+    # Stops approximate learning, promoting what was learned
+    # Returns the number of pairs added
+    # minOccurances -> Fewest estimated occurances a candidate pair needs to be added
+    def stopApproximateLearning(self,minOccurances = 1):
+        # Promote the candidates
+        promoted = self.promoteSketch(minOccurances)
+
+        # Stop
+        self.sketch = None
+        self.log("Stopped approximate learning.")
+
+        # Return the pair count
+        return promoted
+
+    # Counts learned words and checks the brain against its budget every BUDGET_CHECK_INTERVAL of them
+    # words -> Number of words just learned
+    def checkBrainBudget(self,words):
+        # Count the words
+        self.wordsSinceBudgetCheck += words
+
+        # Check if it is time
+        if self.wordsSinceBudgetCheck >= BUDGET_CHECK_INTERVAL:
+            self.wordsSinceBudgetCheck = 0
+            self.enforceBrainBudget()
+
+    # Prunes the brain down to PRUNE_TARGET_RATIO of its budget if it is over its budget
+    # The least seen pairs and words are removed first, so one-off typos and tokens are the first to go
+    # Returns True if the brain was pruned
+    def enforceBrainBudget(self):
+        # Check if there is a budget
+        if self.maxWords <= 0 and self.maxEdges <= 0:
+            return False
+
+        # Check if over it
+        isOverWords = self.maxWords > 0 and len(self.dictionary) > self.maxWords
+        isOverEdges = self.maxEdges > 0 and self.dictionary.getEdgeCount() > self.maxEdges
+        if not (isOverWords or isOverEdges):
+            return False
+
+        # Find how often pairs and words must have been seen to be kept
+        minOccurances = 1
+        if isOverEdges:
+            minOccurances = findMinOccurances(self.dictionary.getEdgeHistogram(),int(self.maxEdges*PRUNE_TARGET_RATIO))
+        minWordOccurances = 1
+        if isOverWords:
+            minWordOccurances = findMinOccurances(self.dictionary.getWordHistogram(),int(self.maxWords*PRUNE_TARGET_RATIO))
+
+        # Prune
+        self.pruneBrain(minOccurances,minWordOccurances)
+
+        # Return success
+        return True
+
+    # Removes rarely seen word pairs and words from the brain and n-gram model
+    # Returns a tuple of (Words Removed, Pairs Removed)
+    # minOccurances -> Pairs, and n-gram sequences, seen fewer times than this are removed
+    # minWordOccurances -> Words seen fewer times than this, counting each time they followed a word or started a sentence, are removed along with their pairs
+    def pruneBrain(self,minOccurances,minWordOccurances = 1):
+        # Start timing
+        start = time.perf_counter()
+
+        # Prune the brain
+        removedWords, removedEdges = self.dictionary.prune(minOccurances,minWordOccurances)
+
+        # Prune the n-gram model to match
+        if self.ngramModel != None:
+            self.ngramModel.prune(minOccurances,self.dictionary.__contains__)
+
+        # Clear the sampling tables and most frequent words built from what was removed
+        self.samplingTables.clear()
+        self.topWordsCache = None
+
+        # Record the time and counts
+        self.metrics.addTime("prune",start)
+        self.metrics.count("wordsPruned",removedWords)
+        self.metrics.count("edgesPruned",removedEdges)
+
+        # Log
+        self.log("Pruned "+str(removedWords)+" words seen under "+str(minWordOccurances)+" times and "+str(removedEdges)+" pairs seen under "+str(minOccurances)+" times.")
+
+        # The journal can only add to the brain, so save the pruned brain and start a new journal
+        if self.journal != None:
+            self.compactBrain()
+
+        # Return what was removed
+        return (removedWords,removedEdges)
+
+    # Adds the pairs the brain has first seen since last asked to the metrics
+    def countNewEdges(self):
+        self.metrics.count("newEdges",self.dictionary.takeNewEdgeCount())
+
     # Learn the word's relationship
     def learnWordRelation(self,leadingWord,word,trailingWord):
-        # Check for leading word to add
-        leadText = None
-        if leadingWord != NONE_TAG:
-            leadText = {"word": leadingWord, "occurances": 1}
-        
-        # Check for trailing word to add
-        trailText = None
-        if trailingWord != NONE_TAG:
-            trailText = {"word": trailingWord, "occurances": 1}
-
         # Look for parent word
-        if word in self.dictionary:
-            # Word found, add data to current knowlege
-            # Check leading text
-            if leadText != None:
-                # Loop through attachment list
-                index = 0
-                found = False
-                for part in self.dictionary[word]["leading"]:
-                    # Find the part
-                    if part["word"] == leadingWord:
-                        # Set found
-                        found = True
-
-                        # Increase common count
-                        self.dictionary[word]["leading"][index]["occurances"] += 1
-
-                    # Iterate
-                    index += 1
+        if word not in self.dictionary:
+            # Word not found, create new entry
+            self.dictionary.addWord(word)
+            self.metrics.count("newWords")
 
-                # Check if word was found
-                if not found:
-                    # Add to dictionary
-                    self.dictionary[word]["leading"].append(leadText)
-
-            # Check trailing text
-            if trailText != None:
-                # Loop through attachment list
-                index = 0
-                found = False
-                for part in self.dictionary[word]["trailing"]:
-                    # Find the part
-                    if part["word"] == trailingWord:
-                        # Set found
-                        found = True
-
-                        # Increase common count
-                        self.dictionary[word]["trailing"][index]["occurances"] += 1
-
-                    # Iterate
-                    index += 1
+            # Journal the word
+            if self.journal != None:
+                self.journal.record(ENTRY_WORD,word)
 
-                # Check if word was found
-                if not found:
-                    # Add to dictionary
-                    self.dictionary[word]["trailing"].append(trailText)
+        # Check for leading word to add
+        if leadingWord != NONE_TAG:
+            # Increase common count
+            self.dictionary.addNeighbour(word,leadingWord,LEADING)
 
-        else:
-            # Word not found, create new entry
-            wordData = None
-            if leadText == None and trailText == None:
-                # No lead or trail text
-                wordData = {
-                    "type": NONE_TAG,
-                    "leading": [],
-                    "trailing": []
-                }
-            elif leadText == None:
-                # No lead text
-                wordData = {
-                    "type": NONE_TAG,
-                    "leading": [],
-                    "trailing": [trailText]
-                }
-            elif trailText == None:
-                # No trail text
-                wordData = {
-                    "type": NONE_TAG,
-                    "leading": [leadText],
-                    "trailing": []
-                }
-            else:
-                # Trail and Lead text are present
-                wordData = {
-                    "type": NONE_TAG,
-                    "leading": [leadText],
-                    "trailing": [trailText]
-                }
+            # Journal the occurance
+            if self.journal != None:
+                self.journal.record(ENTRY_EDGE,word,leadingWord,LEADING,1)
 
-            # Add word to dictionary
-            self.dictionary[word] = wordData
+        # Check for trailing word to add
+        if trailingWord != NONE_TAG:
+            # Increase common count
+            self.dictionary.addNeighbour(word,trailingWord,TRAILING)
+            self.countNewEdges()
 
-    # Writes a specific length text block from dictionary
-    def writeText(self,textLength,sentenceMaxLength):
-        # Log
-        self.log("Writing a "+str(textLength)+"x"+str(sentenceMaxLength)+" text block.")
+            # Journal the occurance
+            if self.journal != None:
+                self.journal.record(ENTRY_EDGE,word,trailingWord,TRAILING,1)
 
-        # Etablish text block
-        textBlock = ""
+            # Invalidate the word's sampling table
+            self.samplingTables.pop(word,None)
 
+    # Generates a specific length text block from dictionary one sentence at a time
+    # textLength -> Number of sentences to generate
+    # sentenceMaxLength -> Max number of words in each sentence
+    def generateText(self,textLength,sentenceMaxLength):
         # Write each sentence
         for sentenceNumber in range(0,textLength):
             # Choose sentence length
             sentenceLength = random.randint(MIN_WORDS_IN_SENTENCE,sentenceMaxLength)
 
-            # Write and save sentence
-            textBlock = (textBlock+(self.createSentence(sentenceLength))+"\n")
+            # Write and send sentence
+            yield self.createSentence(sentenceLength)
+
+    # Generates a specific length text block from dictionary that is the same every time for the same seed
+    # Each sentence gets its own randomizer seeded from the seed and its index, so the output does not depend on how many workers generate it
+    # Workers are forked processes that share the brain. Without fork support, or with an SQLite brain, sentences are generated in this process
+    # textLength -> Number of sentences to generate
+    # sentenceMaxLength -> Max number of words in each sentence
+    # seed -> Any string or number to seed the sentences with
+    # workers -> Number of processes to generate with
+    def generateBatch(self,textLength,sentenceMaxLength,seed,workers = 1):
+        # Check if workers can be used
+        if workers > 1 and textLength > GENERATION_CHUNK_SIZE:
+            # Import the process pools, which are only needed with workers
+            import multiprocessing
+
+            # Check how to generate
+            if "fork" not in multiprocessing.get_all_start_methods():
+                self.log("Processes can not be forked here. Generating with one process.")
+            elif isSQLiteBrain(self.dictionary):
+                self.log("SQLite brains can not be shared with workers. Generating with one process.")
+            else:
+                # Split the sentences into spans
+                spans = [(start,min(start+GENERATION_CHUNK_SIZE,textLength),sentenceMaxLength,seed) for start in range(0,textLength,GENERATION_CHUNK_SIZE)]
+
+                # Share the brain with the workers
+                global batchMercer
+                batchMercer = self
+
+                # Generate the spans in parallel
+                try:
+                    with multiprocessing.get_context("fork").Pool(min(workers,len(spans)),startForkedWorker) as pool:
+                        # Send each span's sentences in order
+                        for sentences in pool.imap(createBatchSentences,spans):
+                            # Count the sentences here since the workers' metrics are not sent back
+                            self.metrics.count("sentencesGenerated",len(sentences))
+                            yield from sentences
+                finally:
+                    # Stop sharing the brain
+                    batchMercer = None
+
+                # Done
+                return
+
+        # Generate each sentence
+        for index in range(0,textLength):
+            yield self.createSeededSentence(index,sentenceMaxLength,seed)
+
+    # Writes a sentence that is the same every time for the same seed and index
+    # index -> The sentence's position in its text block
+    # sentenceMaxLength -> Max number of words in the sentence
+    # seed -> Any string or number the text block is seeded with
+    def createSeededSentence(self,index,sentenceMaxLength,seed):
+        # Seed the sentence's randomizer
+        randomizer = random.Random(str(seed)+":"+str(index))
+
+        # Choose sentence length and write the sentence
+        return self.createSentence(randomizer.randint(MIN_WORDS_IN_SENTENCE,sentenceMaxLength),randomizer)
+
+    # Picks the sentence generator for a text block
+    # Sentences are seeded when a seed is given or multiple workers are used. Workers without a seed use one drawn from 'random'
+    def chooseGenerator(self,textLength,sentenceMaxLength,seed,workers):
+        # Check if seeded
+        if seed != None or workers > 1:
+            # Draw a seed if needed
+            if seed == None:
+                seed = random.getrandbits(64)
+
+            # Generate the seeded batch
+            return self.generateBatch(textLength,sentenceMaxLength,seed,workers)
+
+        # Generate from 'random'
+        return self.generateText(textLength,sentenceMaxLength)
 
-        # Return text block
-        return textBlock
+    # Writes a specific length text block from dictionary
+    # seed -> Optional string or number that makes the text block the same every time it is written with it
+    # workers -> Number of processes to generate with
+    def writeText(self,textLength,sentenceMaxLength,seed = None,workers = 1):
+        # Log
+        self.log("Writing a "+str(textLength)+"x"+str(sentenceMaxLength)+" text block.")
+
+        # Join the sentences into the text block
+        return "".join([sentence+"\n" for sentence in self.chooseGenerator(textLength,sentenceMaxLength,seed,workers)])
 
     # Writes a specific length text block from dictionary to a file. Be sure to include extension in file name
-    def writeTextToFile(self,textLength,sentenceMaxLength,fileName):
+    # Sentences are streamed to the file as they are generated
+    # progressCallback -> Optional function called as 'progressCallback(Sentences Written, Total Sentences)' after every WRITE_FLUSH_INTERVAL sentences and at the end
+    # seed -> Optional string or number that makes the text block the same every time it is written with it
+    # workers -> Number of processes to generate with
+    def writeTextToFile(self,textLength,sentenceMaxLength,fileName,progressCallback = None,seed = None,workers = 1):
+        # Log
+        self.log("Writing a "+str(textLength)+"x"+str(sentenceMaxLength)+" text block to '"+str(fileName)+"'.")
+
         # Open the file
-        with open(fileName,"w") as outFile:
-            outFile.write(self.writeText(textLength,sentenceMaxLength))
+        with open(fileName,"w",buffering = WRITE_BUFFER_SIZE) as outFile:
+            # Write each sentence
+            written = 0
+            for sentence in self.chooseGenerator(textLength,sentenceMaxLength,seed,workers):
+                # Write the sentence
+                outFile.write(sentence+"\n")
+                written += 1
+
+                # Check if it is time to flush
+                if written % WRITE_FLUSH_INTERVAL == 0:
+                    # Flush
+                    outFile.flush()
+
+                    # Report progress
+                    if progressCallback != None:
+                        progressCallback(written,textLength)
+
+            # Report the end
+            if progressCallback != None and written % WRITE_FLUSH_INTERVAL != 0:
+                progressCallback(written,textLength)
 
         # Log
         self.log("Wrote text to '"+str(fileName)+"'.")
 
     # Writes a sentence using Mercer's loaded dictionary
-    def createSentence(self,maxLength):
+    # maxLength -> Max number of words in the sentence
+    # randomizer -> The 'random' module or a 'random.Random' instance to pick words with
+    def createSentence(self,maxLength,randomizer = random):
+        # Start timing
+        start = time.perf_counter()
+
         # Log sentence creation
-        self.log("Creating sentence.")
+        self.log("Creating sentence.",LOG_DEBUG)
 
         # Create sentence variable
         sentence = ""
 
         # Pick seed word
-        seed = list(self.dictionary.keys())[random.randint(0,len(self.dictionary))]
+        seed = self.chooseSeedWord(randomizer)
+
+        # Check if there was anything to pick from
+        if seed == NONE_TAG:
+            # Log empty dictionary
+            self.log("No words are known to start a sentence with.")
+
+            # Return blank
+            return sentence
 
         # Add seed to sentence
         sentence = self.cleanWord(seed)
 
         # Attempt to reach max length of words
         lastWord = seed
+        context = [seed]
         for currentWord in range(0,(maxLength-1)):
             # Attempt for max attempts
             for attempts in range(0,MAX_ATTEMPTS):
                 # Pick word to follow
-                newWord = self.chooseWordToFollow(lastWord)
+                newWord = self.chooseWordToFollow(lastWord,context,randomizer)
 
                 # Check if word was found
                 if newWord != NONE_TAG and newWord != None:
                     # Add to sentence
                     sentence = (sentence+" "+self.cleanWord(newWord))
                     lastWord = newWord
+                    context.append(newWord)
                     
                     # Break out
                     break
 
         # Log finish
-        self.log("Sentence created.")
+        self.log("Sentence created.",LOG_DEBUG)
+
+        # Record the sentence
+        self.metrics.count("sentencesGenerated")
+        self.metrics.addTime("sample",start)
 
         # Return the formated sentence
         return (sentence[0].capitalize()+sentence[1:]+".")
 
+    # Picks the word to start a sentence with
+    # Returns the NONE_TAG if no words are known
+    # randomizer -> The 'random' module or a 'random.Random' instance to pick with
+    def chooseSeedWord(self,randomizer = random):
+        # Check if only sentence starts should be used
+        seed = None
+        if SEED_FROM_SENTENCE_STARTS:
+            # Pick weighted by the times each word started a sentence
+            seed = self.dictionary.chooseStart(randomizer)
+
+        # Check if a seed is still needed
+        if seed == None:
+            # Pick from every known word
+            seed = self.dictionary.chooseWord(randomizer)
+
+        # Check if nothing is known
+        if seed == None:
+            return NONE_TAG
+
+        # Return the seed
+        return seed
+
     # Ensures that a word fits the print standard and corrects capitolization on personal Is
     def cleanWord(self,word):
-        # Prepare clean word
-        cleanWord = ""
-
-        # Remove Unicode characters
-        cleanWord = re.sub(r'[^\x00-\x7f]', r'', word)
-
-        # Remove bad tags
-        cleanWord = cleanWord.replace("\n","")
-        cleanWord = cleanWord.replace("\t","")
-        
-        # Remove bad characters
-        exclusionList = ["(", ")", "[", "]", "{", "}", "\"", "'", "*", "<", ">"]
-        for exChar in exclusionList:
-            cleanWord = cleanWord.replace(exChar,"")
-        cleanWord = cleanWord.replace(".", " ")
-
-        # Check for personal I
-        if cleanWord == "i":
-            cleanWord = "I"
-
-        # Check if word got compounded
-        if len(cleanWord.split(" ")) > 1:
-            # Split the clean word
-            splitWord = cleanWord.split(" ")
-
-            # Clear cleanWord
-            cleanWord = ""
-
-            # Loop through the compounded word
-            for word in splitWord:
-                # Clean the split word
-                cleanWord += (" "+self.cleanWord(word))
-
-        # Send the cleaned one
-        return cleanWord
+        return cleanText(word)
 
     # Attempts to find a word that follows the leading word
-    def chooseWordToFollow(self,leadingWord):
+    # When an n-gram model is used, the longest seen context of up to the n-gram order is followed, backing off to shorter contexts and finally the leading word's neighbours
+    # leadingWord -> The word to follow
+    # context -> Optional list of the sentence's words so far, ending with the leading word
+    # randomizer -> The 'random' module or a 'random.Random' instance to pick with
+    def chooseWordToFollow(self,leadingWord,context = None,randomizer = random):
+        # Count the call
+        self.metrics.count("wordsChosen")
+
+        # Check for a longer context to follow
+        if self.ngramModel != None and context != None:
+            # Try the longest context first
+            for length in range(min(len(context),self.order),1,-1):
+                # Get the cached sampling table
+                key = tuple(context[-length:])
+                table = self.samplingTables.get(key)
+
+                # Check if it needs to be built
+                if table == None:
+                    # Check if the context has been seen
+                    following = self.ngramModel.getFollowing(key)
+                    if len(following) == 0:
+                        # Back off to a shorter context
+                        continue
+
+                    # Build and cache the table
+                    table = self.buildCommonalityTable(following)
+                    self.samplingTables[key] = table
+
+                # Log the context, only building the message when it will be recorded
+                if self.logLevel <= LOG_DEBUG:
+                    self.log("Using "+str(len(table[0]))+"/"+str(table[1])+" options for context '"+" ".join(key)+"'.",LOG_DEBUG)
+
+                # Choose commonality and pick the word
+                return randomizer.choice(randomizer.choice(table[0]))
+
         # Check if word is present in dictionary
         if leadingWord in self.dictionary:
-            # Prep commonality list
-            commonalities = {}
-
-            # Build word options based on commonalities
-            for part in self.dictionary[leadingWord]["trailing"]:
-                # Check if node already present
-                if part["occurances"] not in commonalities:
-                    # Not present, create the list
-                    commonalities[part["occurances"]] = []
-
-                # Add to the commonality list
-                commonalities[part["occurances"]].append(part["word"])
-
-            # Get highest commonality
-            highestCommonality = max(list(commonalities.keys()))
+            # Get the cached sampling table
+            table = self.samplingTables.get(leadingWord)
 
-            # Calculate minimum commonality
-            minCommoness = math.floor(highestCommonality-(highestCommonality*(MAX_COMMONALITY_DIFFERENCE/100)))
+            # Check if it needs to be built
+            if table == None:
+                # Build and cache the table
+                table = self.buildSamplingTable(leadingWord)
+                self.samplingTables[leadingWord] = table
 
-            # Ensure at least one
-            if minCommoness < 1:
-                minCommoness = 1
+            # Unpack the table
+            buckets, totalKeys = table
 
-            # Trim commonalities to only avalible keys
-            validKeys = []
-            for key in list(commonalities.keys()):
-                # Check if key is higher than min
-                if key >= minCommoness:
-                    validKeys.append(key)
-
-            # Log the keys
-            self.log("Using "+str(len(validKeys))+"/"+str(len(list(commonalities.keys())))+" options for word to follow '"+str(leadingWord)+"'.")
+            # Log the keys, only building the message when it will be recorded
+            if self.logLevel <= LOG_DEBUG:
+                self.log("Using "+str(len(buckets))+"/"+str(totalKeys)+" options for word to follow '"+str(leadingWord)+"'.",LOG_DEBUG)
 
             # Return none on Index Errors
             try:
                 # Choose commonality
-                commonKey = random.choice(validKeys)
+                bucket = randomizer.choice(buckets)
 
                 # Pick and return word
-                return commonalities[commonKey][random.randint(0,(len(commonalities[commonKey])-1))]
+                return randomizer.choice(bucket)
             except IndexError as err:
                 # Failed, return None
                 return NONE_TAG
@@ -396,23 +1510,146 @@ class MERCER:
             # Word not present
             return NONE_TAG
 
+    # Builds the sampling table used by 'chooseWordToFollow()' for the leading word
+    # Returns a tuple of (List of valid commonality buckets, Total commonality count) where each bucket is a list of trailing words
+    def buildSamplingTable(self,leadingWord):
+        return self.buildCommonalityTable(self.dictionary.getNeighbours(leadingWord,TRAILING))
+
+    # Groups following words by how often they occured and keeps the groups within MAX_COMMONALITY_DIFFERENCE of the most common
+    # Returns a tuple of (List of valid commonality buckets, Total commonality count) where each bucket is a list of words
+    # following -> Iterable of (Word, Occurances) tuples
+    def buildCommonalityTable(self,following):
+        # Prep commonality list
+        commonalities = {}
+
+        # Build word options based on commonalities
+        for part, occurances in following:
+            # Check if node already present
+            if occurances not in commonalities:
+                # Not present, create the list
+                commonalities[occurances] = []
+
+            # Add to the commonality list
+            commonalities[occurances].append(part)
+
+        # Check if there is anything to follow
+        if len(commonalities) == 0:
+            # Nothing to choose from
+            return ([],0)
+
+        # Get highest commonality
+        highestCommonality = max(list(commonalities.keys()))
+
+        # Calculate minimum commonality
+        minCommoness = math.floor(highestCommonality-(highestCommonality*(MAX_COMMONALITY_DIFFERENCE/100)))
+
+        # Ensure at least one
+        if minCommoness < 1:
+            minCommoness = 1
+
+        # Trim commonalities to only avalible keys
+        buckets = []
+        for key in list(commonalities.keys()):
+            # Check if key is higher than min
+            if key >= minCommoness:
+                buckets.append(commonalities[key])
+
+        # Return the table
+        return (buckets,len(commonalities))
+
     # Connect to Reddit via Reddit API and learn words from the specified subreddit
     # maxItems -> Max items to read from the subreddit's hot list
     # subreddit -> The name of the subreddit to search
     def learnFromSubReddit(self,maxItems,subreddit):
-        # Check if dependencies are loaded
-        if praw != None:
-            # Set name variable
-            subredditName = subreddit
+        return self.learnFromSubReddits(maxItems,[subreddit])
+
+    # Connect to Reddit via Reddit API and learn words from many subreddits at once
+    # Each subreddit is fetched by a thread that adds text blocks to a bounded queue, while this thread learns them in the order they arrive
+    # Returns True if every subreddit was read
+    # maxItems -> Max items to read from each subreddit's hot list
+    # subreddits -> List of the names of the subreddits to search
+    # includeComments -> If the comments on each post should be learned too
+    # workers -> Max number of subreddits to fetch at once
+    # reddit -> Optional object to use in place of 'praw.Reddit'. Shared by every thread. By default each thread connects with its own 'praw.Reddit'
+    def learnFromSubReddits(self,maxItems,subreddits,includeComments = False,workers = INGEST_WORKERS,reddit = None):
+        # Make sure dependencies are loaded
+        if reddit == None and not loadOptionalImport("praw"):
+            # praw not found
+            self.log("'praw' could not be imported. Reddit features are disabled.")
 
-            # Log
-            self.log("Accessing the first "+str(maxItems)+" items on /r/"+subredditName+".")
+            # Return failure
+            return False
+
+        # Log
+        self.log("Accessing the first "+str(maxItems)+" items on "+str(len(subreddits))+" subreddits with "+str(min(workers,len(subreddits)))+" threads.")
+
+        # Prep the queue between the fetching threads and this one
+        blockQueue = queue.Queue(INGEST_QUEUE_SIZE)
+        stopEvent = threading.Event()
+
+        # Start fetching, importing the thread pool only once it is needed
+        from concurrent.futures import ThreadPoolExecutor
+        allRead = True
+        with ThreadPoolExecutor(max(1,min(workers,len(subreddits)))) as executor:
+            # Submit each subreddit
+            futures = [executor.submit(self.fetchSubReddit,reddit,subreddit,maxItems,includeComments,blockQueue,stopEvent) for subreddit in subreddits]
+
+            try:
+                # Learn until every subreddit is finished
+                finished = 0
+                while finished < len(futures):
+                    # Get the next block
+                    block = blockQueue.get()
+
+                    # Check if a subreddit finished
+                    if block == None:
+                        finished += 1
+                    else:
+                        self.learnTextBlock(block)
+            finally:
+                # Release any threads waiting on the queue
+                stopEvent.set()
+
+            # Check the results
+            for future in futures:
+                if not future.result():
+                    allRead = False
+
+        # Flush the journal
+        if self.journal != None:
+            self.journal.flush()
+
+        # Return success
+        return allRead
+
+    # Fetches a subreddit's posts, and optionally their comments, into a queue of text blocks for 'learnFromSubReddits()'
+    # Run by fetching threads. Puts None in the queue when finished, even if fetching failed
+    # Returns True if the subreddit was read
+    # reddit -> Object to use in place of 'praw.Reddit'. None connects with a new 'praw.Reddit'
+    # subredditName -> The name of the subreddit to search
+    # maxItems -> Max items to read from the subreddit's hot list
+    # includeComments -> If the comments on each post should be fetched too
+    # blockQueue -> The queue to put text blocks in
+    # stopEvent -> Event set when ingestion stopped and nothing more should be queued
+    def fetchSubReddit(self,reddit,subredditName,maxItems,includeComments,blockQueue,stopEvent):
+        # Queues a block, waiting while the queue is full unless ingestion stops
+        def queueBlock(block):
+            while not stopEvent.is_set():
+                try:
+                    blockQueue.put(block,timeout = INGEST_PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    pass
+            return False
 
+        # Asking forgiveness is the Python way
+        try:
             # Connect to Reddit
-            reddit = praw.Reddit("mercer")
+            if reddit == None:
+                reddit = praw.Reddit("mercer")
 
             # Connect to subreddit
-            subreddit = reddit.subreddit(subreddit)
+            subreddit = reddit.subreddit(subredditName)
 
             # Loop through fetched submissions
             for post in subreddit.hot(limit=maxItems):
@@ -421,37 +1658,75 @@ class MERCER:
                     # Make sure body isn't empty
                     if post.selftext != None and post.selftext != "":
                         # Log
-                        # self.log("Learning from post '"+post.title+"' on /r/"+subredditName+".")
-                        self.log("Learning ~"+str(len(post.selftext.split(" ")))+" words from '"+post.title+"'.")
+                        self.log("Queueing ~"+str(len(post.selftext.split(" ")))+" words from '"+post.title+"' on /r/"+subredditName+".")
 
-                        # Learn the words
-                        self.learnTextBlock(post.selftext)
+                        # Queue the words
+                        if not queueBlock(post.selftext):
+                            return False
                     else:
                         # Log empty thing
                         self.log("'"+post.title+"' had no body text. Ignoring.")
 
+                    # Check for comments
+                    if includeComments:
+                        # Load the whole comment tree without requesting more
+                        post.comments.replace_more(limit=0)
+
+                        # Queue each comment
+                        for comment in post.comments.list():
+                            if comment.score > 0 and comment.body != None and comment.body != "":
+                                if not queueBlock(comment.body):
+                                    return False
+
             # Return success
             return True
-        else:
-            # praw not imported
-            self.log("'praw' was not imported. Reddit features are disabled.")
+        except Exception as err:
+            # Log the failure
+            self.log("/r/"+subredditName+" could not be read: "+str(err))
 
             # Return failure
             return False
+        finally:
+            # Mark the subreddit as finished
+            queueBlock(None)
+
+    # Gets the web client shared by the web learning features, making it the first time
+    # Returns None if the proper imports are not avalible
+    def getFeedClient(self):
+        # Make sure dependencies are loaded, even for a client that was given to Mercer
+        if not (loadOptionalImport("requests") and loadOptionalImport("mercerFeeds")):
+            return None
+
+        # Check if it needs to be made
+        if self.feedClient == None:
+            # Make the client
+            self.feedClient = mercerFeeds.FeedClient()
+
+        # Return the client
+        return self.feedClient
 
     # Accesses and converts to an element tree a specified RSS Feed (or web page)
+    # Pages are fetched through the cached web client, so unchanged pages are not downloaded again
     # Returns 'None' if the proper imports are not avalible
     def pullRSSFeed(self,link):
         # Check if dependencies are loaded
-        if requests != None and elementTree != None:
+        client = self.getFeedClient()
+        if client != None and loadOptionalImport("elementTree"):
             # Pull XML data
-            data = requests.get(link)
+            try:
+                content = client.fetch(link)[0]
+            except requests.RequestException as err:
+                # Log inability to access
+                self.log("Could not access '"+str(link)+"': "+str(err))
+
+                # Return a failure indicator
+                return None
 
             # Prepare root attempt
             root = None
             try:
                 # Try to parse XML
-                root = elementTree.fromstring(data.content)
+                root = elementTree.fromstring(content)
 
                 # Return XML/HTML/etc data for parsing
                 return root
@@ -463,53 +1738,123 @@ class MERCER:
                 return None
         else:
             # requests or elementTree are not loaded
-            self.log("'requests' was not imported. Web connectivity features unavalible.")
+            self.log("'requests' could not be imported. Web connectivity features unavalible.")
 
             # Return a failure indicator
             return None
 
-    # Pull the BBC News RSS Feed and skim the articles that are found on it.
+    # Pull an RSS or Atom feed and learn the articles that are found on it
+    # Articles are fetched at once through the cached web client. A feed or article that has not changed since it was last read is not learned again.
+    # Each learned article's text and paragraph hashes are kept in the corpus manifest, so an article the server can not validate is skipped if its text is the same,
+    # and only its new paragraphs are learned if it was edited
+    # Returns True if the feed was read
+    # link -> The feed's URL
+    # maxItems -> Max items to learn. A value of -1 indicates no limit beyond that of the feed's content
+    def learnFromFeed(self,link,maxItems = -1):
+        # Check if dependencies are loaded
+        client = self.getFeedClient()
+        if client == None:
+            # requests is not loaded
+            self.log("'requests' could not be imported. Web connectivity features unavalible.")
+
+            # Return failure
+            return False
+
+        # Pull the feed
+        try:
+            content, encoding, changed = client.fetch(link)
+        except requests.RequestException as err:
+            # Log inability to access
+            self.log("Could not access '"+str(link)+"': "+str(err))
+
+            # Return failure
+            return False
+
+        # Check if anything is new
+        if not changed:
+            # Log
+            self.log("'"+str(link)+"' has not changed since it was last read.")
+
+            # Return success
+            return True
+
+        # Read the items
+        items = mercerFeeds.parseFeedItems(content)
+        if maxItems != -1:
+            items = items[:maxItems]
+
+        # Log
+        self.log("Fetching "+str(len(items))+" articles from '"+str(link)+"'.")
+
+        # Fetch the articles at once
+        titles = dict([(itemLink, itemTitle) for itemTitle, itemLink in items])
+        for articleLink, body, encoding, changed in client.fetchMany([itemLink for itemTitle, itemLink in items]):
+            # Check if bad data
+            if body == None:
+                self.log("Could not access '"+articleLink+"'.")
+            elif not changed:
+                self.log("'"+titles[articleLink]+"' has not changed since it was last read.")
+            else:
+                # Extract the article's paragraphs
+                paragraphs = mercerFeeds.extractArticleText(body.decode(encoding or "utf-8",errors = "replace")).split("\n")
+
+                # Check if the text changed since it was learned
+                record = self.manifest.getPageRecord(articleLink)
+                articleHash = hashParagraph(paragraphs)
+                if record != None and record["hash"] == articleHash:
+                    self.log("'"+titles[articleLink]+"' has the same text as when it was learned.")
+                    continue
+
+                # Find the paragraphs that were not learned before
+                oldParagraphs = set()
+                if record != None:
+                    oldParagraphs = set(record["paragraphs"])
+                paragraphHashes = [hashParagraph([paragraph]) for paragraph in paragraphs]
+                newParagraphs = [paragraph for paragraph, paragraphHash in zip(paragraphs,paragraphHashes) if paragraphHash not in oldParagraphs]
+
+                # Log
+                self.log("Learning ~"+str(sum([len(paragraph.split(" ")) for paragraph in newParagraphs]))+" words from '"+titles[articleLink]+"'.")
+
+                # Learn each new paragraph
+                for paragraph in newParagraphs:
+                    self.learnTextBlock(paragraph)
+
+                # Record the article
+                record = {"hash": articleHash, "paragraphs": paragraphHashes}
+                self.manifest.setPageRecord(articleLink,record)
+
+                # Journal the record
+                if self.journal != None:
+                    self.journal.record(ENTRY_PAGE,articleLink,record)
+
+        # Flush the journal
+        if self.journal != None:
+            self.journal.flush()
+
+        # Return success
+        return True
+
+    # Pull the BBC News RSS Feed and learn the articles that are found on it.
     # maxItems -> Max items to skim. A value of -1 indicates no limit beyond that of the RSS feed's content
-    # def learnFromBBCNews(self,maxItems = -1):
-    #     # Connect to RSS Feed
-    #     feed = self.pullRSSFeed("http://feeds.bbci.co.uk/news/rss.xml")
-
-    #     # Check if imports and data are ok
-    #     if feed != None:
-    #         # Loop through returned items
-    #         i = 0
-    #         for item in feed.find("channel").findall("item"):
-    #             # Check if limit met
-    #             if maxItems == -1 or i < maxItems:
-    #                 # Pull title and link
-    #                 itemTitle = item.find("title").text.lstrip("<![CDATA[").rstrip("]]>")
-    #                 itemLink = item.find("guid").text
-    #                 print(itemTitle,itemLink)
-
-    #                 # Attempt to open article
-    #                 # TODO: Try and fix the parsing of the website
-    #                 article = self.pullRSSFeed(itemLink)
-
-    #                 # Check if bad data
-    #                 if article != None:
-    #                     # Log
-    #                     self.log("Learning from '"+itemTitle+"' on BBC.")
-
-    #                     # Loop through paragraph elements in the article
-    #                     for p in article.find("body").find("div[@class='direction']").find("div[@id='orb-modules']").find("div[@id='site-container']").find("div[@id='page']").find("div[@role='main']").find("div[@class='container']").find("div[@class='container--primary-and-secondary-columns']").find("div[@class='column--primary']").find("div[@class='story-body']").find("div[@class='story-body__inner']").findall("p"):
-    #                         print(p.text)
-                    
-    #                 # Iterate
-    #                 i += 1
+    def learnFromBBCNews(self,maxItems = -1):
+        return self.learnFromFeed(BBC_NEWS_FEED,maxItems)
 
     # Sets the type of the specified word within the dictionary
+    # wordType -> A type name from WORD_TYPE_TAGS, in any case, or NONE_TAG. Names are stored as their tag
     def setWordType(self,word,wordType):
         # Check if type is a valid type
         if wordType.lower() in WORD_TYPE_TAGS or wordType == NONE_TAG:
+            # Use the type's tag
+            wordType = WORD_TYPE_TAGS.get(wordType.lower(),wordType)
+
             # Make sure word is in dictionary
             if word in self.dictionary:
                 # Set the type
-                self.dictionary[word]['type'] = wordType
+                self.dictionary.setType(word,wordType)
+
+                # Journal the type
+                if self.journal != None:
+                    self.journal.record(ENTRY_TYPE,word,wordType)
 
                 # Return success
                 return True
@@ -531,6 +1876,7 @@ class MERCER:
     def setDebug(self,isOn):
         # Set debug mode
         self.debugMode = isOn
+        self.logLevel = LOG_DEBUG if isOn else LOG_INFO
 
         # Log
         self.log("Set Debug Mode to "+str(isOn)+".")
@@ -538,7 +1884,22 @@ class MERCER:
     # Logs the dictionary to the console
     def logDictionary(self):
         # Log the dictionary
-        print(self.dictionary)
+        print(self.dictionary.toStored())
+
+    # Sets the budget of the brain and prunes it right away if it is over
+    # maxWords -> Max number of words the brain can hold. 0 is unlimited
+    # maxEdges -> Max number of word pairs the brain can hold. 0 is unlimited
+    def setBrainBudget(self,maxWords,maxEdges):
+        # Set the budget
+        self.maxWords = maxWords
+        self.maxEdges = maxEdges
+
+        # Log
+        self.log("Set Brain Budget to "+str(maxWords)+" words and "+str(maxEdges)+" pairs.")
+
+        # Check it now
+        self.wordsSinceBudgetCheck = 0
+        self.enforceBrainBudget()
 
     # Sets the maximum attempts
     def setMaxGenerationAttempts(self,attempts):
@@ -551,50 +1912,62 @@ class MERCER:
         # Log
         self.log("Set Max Generation Attempts to "+str(attempts)+".")
 
-    # Logs to the console and, if debug is on, to the debug log file
-    def log(self,text):
-        # Build time stamp
-        timeStamp = str(datetime.datetime.now()).split(".")[0]
+    # Sets if sentences should only be seeded with words that have started a sentence
+    def setSeedFromSentenceStarts(self,isOn):
+        # Establish global for change
+        global SEED_FROM_SENTENCE_STARTS
+
+        # Set mode
+        SEED_FROM_SENTENCE_STARTS = isOn
 
-        # Open the log file
-        with open(LOG_FILE,"a") as logFile:
-            logFile.write("("+timeStamp+") "+LOG_TAG+": "+text+"\n")
+        # Log
+        self.log("Set Seed From Sentence Starts to "+str(isOn)+".")
+
+    # Gets if sentences are only seeded with words that have started a sentence
+    def getSeedFromSentenceStarts(self):
+        global SEED_FROM_SENTENCE_STARTS
+        return SEED_FROM_SENTENCE_STARTS
+
+    # Logs to the debug log file and, if debug is on, to the console
+    # The file is written by a background thread. LOG_DEBUG messages are ignored unless debug is on
+    # text -> The message to log
+    # level -> LOG_INFO or LOG_DEBUG
+    def log(self,text,level = LOG_INFO):
+        # Check if the level is recorded
+        if level < self.logLevel:
+            return
+
+        # Queue for the log file
+        self.logger.log(level,text)
 
         # Check if debug mode
         if self.debugMode:
+            # Build time stamp
+            timeStamp = str(datetime.datetime.now()).split(".")[0]
+
             # Print to console
-            print("("+timeStamp+") "+LOG_TAG+": "+text)  
+            print("("+timeStamp+") "+LOG_TAG+": "+text)
 
-    # Attempts to find and activate optional imports
+    # Checks which optional imports are avalible without importing them
+    # They are imported by 'loadOptionalImport()' when a feature first needs them
     def checkOptionalImports(self):
-        # Ensure globals
-        global praw
-        global requests
-        global elementTree
-
-        # Import praw
-        if importlibutil.find_spec("praw") != None:
-            # Import the module
-            praw = importlib.import_module("praw")
-        else:
+        # Check praw
+        if not isOptionalImportAvailable("praw"):
             # Report
-            self.log("'praw' was not imported. Reddit features unavalible.")
+            self.log("'praw' was not found. Reddit features unavalible.")
 
-        # Import requests and elementTree
-        if importlibutil.find_spec("requests") != None and importlibutil.find_spec("xml.etree.ElementTree") != None:
-            # Import the modules
-            requests = importlib.import_module("requests")
-            elementTree = importlib.import_module("xml.etree.ElementTree")
-        else:
+        # Check requests and elementTree
+        if not (isOptionalImportAvailable("requests") and isOptionalImportAvailable("elementTree")):
             # Report
-            self.log("'requests' was not imported. Web connectivity features unavalible.")
+            self.log("'requests' was not found. Web connectivity features unavalible.")
 
-    # Calculates various statistics about the current dictionary possessed by Mercer
+    # Gets various statistics about the current dictionary possessed by Mercer
+    # The statistics are kept up to date by the brain as it learns, so getting them does not walk the dictionary
     # Either handles its own printing, or can be retrieved as a dictionary containing the data
     # Default functionality is to handle its own printing
     def getDictionaryStats(self,shouldPrint=True):
-        # Prep word count
-        wordCount = 0
+        # Get word count
+        wordCount = len(self.dictionary)
 
         # Prep most common type
         typeCounter = {
@@ -604,18 +1977,15 @@ class MERCER:
             NONE_TAG: 0
         }
 
-        # Loop through dictionary
-        for word in self.dictionary:
-            # Get word type
-            if self.dictionary[word]['type'] in typeCounter:
-                # Iterate count
-                typeCounter[self.dictionary[word]['type']] += 1
-            else:
-                # Add to count
-                typeCounter[self.dictionary[word]['type']] = 0
+        # Add the brain's counts, including any types that are not tagged. Types stored by name, as older brains did, are counted under their tag
+        for wordType, count in self.dictionary.getTypeCounts().items():
+            if count > 0:
+                wordType = WORD_TYPE_TAGS.get(wordType.lower(),wordType)
+                typeCounter[wordType] = typeCounter.get(wordType,0)+count
 
-            # Add word count
-            wordCount += 1
+        # Get the pair and learned word totals
+        edgeCount = self.dictionary.getEdgeCount()
+        tokenCount = self.dictionary.getTokenCount()
 
         # Check mode
         if shouldPrint:
@@ -626,6 +1996,10 @@ class MERCER:
             # Print the word count
             print("Total Word Count: "+str(wordCount))
 
+            # Print the pair and learned word totals
+            print("Total Word Pairs: "+str(edgeCount))
+            print("Total Words Learned: "+str(tokenCount))
+
             # Print the data
             for wordType in WORD_TYPE_TAGS:
                 print(wordType.capitalize()+" Count:"+str(typeCounter[WORD_TYPE_TAGS[wordType]]))
@@ -639,16 +2013,131 @@ class MERCER:
             # Return mode
             # Translate data
             for wordType in WORD_TYPE_TAGS:
-                typeCounter[wordType.capitalize()] = typeCounter.pop(WORD_TYPE_TAGS[wordType])
+                count = typeCounter.pop(WORD_TYPE_TAGS[wordType])
+                typeCounter[wordType.capitalize()] = typeCounter.get(wordType.capitalize(),0)+count
 
             # Build Dictionary
             outData = {
                 "totalWords": wordCount,
-                "typeCounts": typeCounter
+                "typeCounts": typeCounter,
+                "totalEdges": edgeCount,
+                "totalTokens": tokenCount
             }
 
             # Return data
             return outData
+
+    # Gets the most often seen words, counting each time a word followed another or started a sentence
+    # Results are cached until something more is learned
+    # Either handles its own printing, or can be retrieved as a list of (Word, Occurances) tuples from most to least seen
+    # Default functionality is to handle its own printing
+    # count -> Max number of words to get
+    def getMostFrequentWords(self,count = TOP_WORDS_COUNT,shouldPrint=True):
+        # Check the cache, which is kept for the brain's current size
+        cacheKey = (len(self.dictionary),self.dictionary.getTokenCount())
+        if self.topWordsCache == None or self.topWordsCache[0] != cacheKey or len(self.topWordsCache[1]) < min(count,len(self.dictionary)):
+            # Find the top words
+            self.topWordsCache = (cacheKey,self.dictionary.getMostFrequentWords(max(count,TOP_WORDS_COUNT)))
+        topWords = self.topWordsCache[1][:count]
+
+        # Check mode
+        if shouldPrint:
+            # Print mode
+            # Print the title
+            print("Most Frequent Words:")
+
+            # Print the words
+            for rank, (word, occurances) in enumerate(topWords):
+                print(str(rank+1)+". "+word+" ("+str(occurances)+")")
+
+            # Return blank
+            return None
+        else:
+            # Return mode
+            return topWords
+
+    # Gets the words that most often followed a word
+    # Either handles its own printing, or can be retrieved as a list of (Word, Occurances) tuples from most to least common. Empty if the word is not known
+    # Default functionality is to handle its own printing
+    # word -> The word to get the followers of
+    # count -> Max number of followers to get
+    def getMostCommonFollowers(self,word,count = TOP_WORDS_COUNT,shouldPrint=True):
+        # Get the top followers
+        followers = []
+        if word in self.dictionary:
+            followers = self.dictionary.getMostCommonNeighbours(word,TRAILING,count)
+
+        # Check mode
+        if shouldPrint:
+            # Print mode
+            # Print the title
+            print("Most Common Followers of '"+str(word)+"':")
+
+            # Print the followers
+            for rank, (follower, occurances) in enumerate(followers):
+                print(str(rank+1)+". "+follower+" ("+str(occurances)+")")
+
+            # Return blank
+            return None
+        else:
+            # Return mode
+            return followers
+
+    # Gets the counters and timers recorded while learning and generating
+    # Either handles its own printing, or can be retrieved as a dictionary containing the data
+    # Default functionality is to handle its own printing
+    def getMetrics(self,shouldPrint=True):
+        # Count the new pairs, writing any an SQLite brain is holding in its batch
+        if isSQLiteBrain(self.dictionary):
+            self.dictionary.writePending()
+        self.countNewEdges()
+
+        # Get the metrics
+        metrics = self.metrics.toDict()
+
+        # Check mode
+        if shouldPrint:
+            # Print mode
+            # Print the title
+            print("Metrics:")
+
+            # Print the counters
+            for name, value in metrics["counters"].items():
+                print(name+": "+str(value))
+
+            # Print the timers
+            for name, timer in metrics["timers"].items():
+                print(name.capitalize()+" Time: "+str(round(timer["seconds"],3))+"s over "+str(timer["calls"])+" calls")
+
+            # Return blank
+            return None
+        else:
+            # Return mode
+            return metrics
+
+    # Zeroes the metrics
+    def resetMetrics(self):
+        # Reset
+        self.metrics.reset()
+
+        # Log
+        self.log("Reset the metrics.")
+
+    # Runs a single operation under a profiler and logs the report
+    # Returns the operation's result
+    # operation -> The function to run, like 'mercerInstance.learnTextFile'
+    # profiler -> PROFILER_CPROFILE for time or PROFILER_TRACEMALLOC for memory
+    # args -> Arguments to run the operation with
+    # kwargs -> Keyword arguments to run the operation with
+    def profileOperation(self,operation,profiler,*args,**kwargs):
+        # Run the operation
+        result, report = profileCall(operation,profiler,*args,**kwargs)
+
+        # Log the report
+        self.log("Profiled '"+str(getattr(operation,"__name__",operation))+"' with "+str(profiler)+":\n"+report)
+
+        # Return the result
+        return result
     
     # Gets the dict of word types
     def getWordTypeTags(self):
@@ -680,6 +2169,9 @@ class MERCER:
             # Set amount
             MAX_COMMONALITY_DIFFERENCE = amount
 
+            # Clear the sampling tables built with the old amount
+            self.samplingTables.clear()
+
             # Log
             self.log("Set Max Commonality Difference to top "+str(amount)+"%.")
         except TypeError as err:
@@ -0,0 +1,294 @@
+# MERCER Benchmarks
+# Measures how fast Mercer learns, generates, loads, and saves, and how much memory each n-gram order uses.
+# Results are saved as JSON so runs can be compared. Runs offline and generates from a fixed seed.
+# Run with: python mercerBenchmark.py [--output File] [--seed Seed] [--corpus File] [--encoding Encoding]
+
+# Imports
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+import platform
+import datetime
+import tempfile
+import tracemalloc
+from importlib import util as importlibutil
+import mercer
+
+# Optional Imports Setup
+resource = None # For peak memory measurements (Installed by default in Python 3 on Unix)
+if importlibutil.find_spec("resource") != None:
+    import resource
+
+# Constants
+BENCHMARK_FILE = "mercerBenchmark.json" # Name of the file results are saved to
+BENCHMARK_CORPUS = os.path.join("learn","PrideAndPrejudice.txt") # Text file learned for the learning, generation, load, and save benchmarks
+CORPUS_DIRECTORY = "learn" # Directory of text files learned for the n-gram order benchmarks
+CORPUS_ENCODING = "cp1252" # Text encoding of the corpora. The bundled corpora are Windows-1252 whatever the locale is
+BENCHMARK_SEED = 1 # Default seed for everything that is generated
+BRAIN_FORMATS = [mercer.BRAIN_FORMAT_JSON, mercer.BRAIN_FORMAT_BINARY, mercer.BRAIN_FORMAT_SQLITE] # Brain formats to measure loading and saving with
+ORDERS = [1, 2, 3, 4] # N-gram orders to measure
+SENTENCE_LENGTH = 12 # Max number of words in each generated sentence
+SENTENCE_SAMPLES = 2000 # Number of sentences timed one at a time
+WRITE_TEXT_SAMPLES = 50 # Number of text blocks timed
+WRITE_TEXT_LENGTH = 100 # Number of sentences in each timed text block
+
+# Functions
+# Gets the peak resident memory of this process in bytes
+# Returns None where it can not be measured
+def getPeakRSS():
+    # Check if it can be measured
+    if resource == None:
+        return None
+
+    # Get the peak. Reported in kilobytes except on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak
+    return peak*1024
+
+# Gets a percentile of a list of measurements with the nearest rank method
+# values -> List of measurements
+# fraction -> Percentile from 0 to 1
+def getPercentile(values,fraction):
+    # Sort the values
+    values = sorted(values)
+
+    # Pick the nearest rank
+    return values[min(len(values)-1,max(0,int(round(fraction*len(values)))-1))]
+
+# Summarizes a list of latencies
+# Returns a dict of the rate and latency percentiles
+# latencies -> List of seconds each item took
+# items -> Number of items made per latency
+def summarizeLatencies(latencies,items = 1):
+    return {
+        "perSecond": (len(latencies)*items)/max(sum(latencies),1e-9),
+        "p50Milliseconds": getPercentile(latencies,0.5)*1000,
+        "p99Milliseconds": getPercentile(latencies,0.99)*1000
+    }
+
+# Times learning the benchmark corpus into a new brain
+# Returns a tuple of (Dict of the measurements, The MERCER that learned it)
+# directory -> Directory to keep the brain in
+# corpus -> Text file to learn
+# encoding -> Text encoding of the corpus
+def benchmarkLearning(directory,corpus,encoding):
+    # Count the words that will be learned
+    with open(corpus,"r",encoding = encoding) as corpusFile:
+        wordCounts = mercer.countLines(corpusFile.readlines())[0]
+    words = sum(wordCounts.values())
+
+    # Time learning
+    mercerInstance = mercer.MERCER(brainFile = os.path.join(directory,mercer.DICTIONARY_FILE))
+    start = time.perf_counter()
+    mercerInstance.learnTextFile(corpus,encoding = encoding)
+    seconds = time.perf_counter()-start
+
+    # Return the measurements
+    return ({
+        "corpus": corpus,
+        "words": words,
+        "uniqueWords": len(wordCounts),
+        "seconds": seconds,
+        "wordsPerSecond": words/max(seconds,1e-9),
+        "peakRSSBytes": getPeakRSS()
+    },mercerInstance)
+
+# Times generating sentences one at a time and as text blocks
+# Returns a dict of the measurements
+# mercerInstance -> The MERCER to generate with
+# seed -> Seed to generate with
+def benchmarkGeneration(mercerInstance,seed):
+    # Time each sentence
+    randomizer = random.Random(seed)
+    sentenceLatencies = []
+    for index in range(0,SENTENCE_SAMPLES):
+        start = time.perf_counter()
+        mercerInstance.createSentence(SENTENCE_LENGTH,randomizer)
+        sentenceLatencies.append(time.perf_counter()-start)
+
+    # Time each text block
+    blockLatencies = []
+    for index in range(0,WRITE_TEXT_SAMPLES):
+        start = time.perf_counter()
+        mercerInstance.writeText(WRITE_TEXT_LENGTH,SENTENCE_LENGTH,str(seed)+":"+str(index))
+        blockLatencies.append(time.perf_counter()-start)
+
+    # Return the measurements
+    return {
+        "createSentence": summarizeLatencies(sentenceLatencies),
+        "writeText": summarizeLatencies(blockLatencies,WRITE_TEXT_LENGTH),
+        "writeTextLength": WRITE_TEXT_LENGTH,
+        "peakRSSBytes": getPeakRSS()
+    }
+
+# Times loading and saving a brain in each brain format
+# Returns a dict of the measurements for each format
+# directory -> Directory to keep the brains in
+# sourceFile -> JSON brain file to convert to each format
+def benchmarkLoadSave(directory,sourceFile):
+    # Measure each format
+    results = {}
+    for brainFormat in BRAIN_FORMATS:
+        # Convert the brain
+        brainFile = os.path.join(directory,"benchmark."+brainFormat)
+        mercer.convertBrainFile(sourceFile,brainFile,brainFormat)
+        megabytes = os.path.getsize(brainFile)/1048576
+
+        # Time loading, which the constructor does once
+        start = time.perf_counter()
+        mercerInstance = mercer.MERCER(brainFormat = brainFormat,brainFile = brainFile)
+        loadSeconds = time.perf_counter()-start
+
+        # Time saving
+        start = time.perf_counter()
+        mercerInstance.exitMercer()
+        saveSeconds = time.perf_counter()-start
+
+        # Record the format
+        results[brainFormat] = {
+            "fileMegabytes": megabytes,
+            "establishBrainSeconds": loadSeconds,
+            "establishBrainMBPerSecond": megabytes/max(loadSeconds,1e-9),
+            "exitMercerSeconds": saveSeconds,
+            "exitMercerMBPerSecond": megabytes/max(saveSeconds,1e-9)
+        }
+
+    # Return the measurements
+    return results
+
+# Measures one n-gram order
+# Returns a dict of the measurements
+# order -> The n-gram order to measure
+# files -> List of text files to learn
+# seed -> Seed to generate with
+# encoding -> Text encoding of the files
+def benchmarkOrder(order,files,seed,encoding):
+    # Work in a temporary directory so no brain files are left behind
+    with tempfile.TemporaryDirectory() as directory:
+        # Trace memory while learning
+        tracemalloc.start()
+
+        # Learn the corpora
+        mercerInstance = mercer.MERCER(brainFile = os.path.join(directory,mercer.DICTIONARY_FILE),order = order)
+        for file in files:
+            mercerInstance.learnTextFile(file,encoding = encoding)
+
+        # Measure the memory held once learned
+        memoryBytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # Count the contexts
+        nodes = 0
+        if mercerInstance.ngramModel != None:
+            nodes = mercerInstance.ngramModel.getNodeCount()
+
+        # Time sentence generation, which samples a word for every word after the first
+        words = 0
+        start = time.perf_counter()
+        for sentence in mercerInstance.generateBatch(SENTENCE_SAMPLES,SENTENCE_LENGTH,seed):
+            words += sentence.count(" ")
+        seconds = time.perf_counter()-start
+
+        # Save the brain
+        mercerInstance.exitMercer()
+
+        # Measure the saved n-gram model
+        ngramFile = mercerInstance.brainFile+mercer.NGRAM_SUFFIX
+        fileBytes = 0
+        if os.path.isfile(ngramFile):
+            fileBytes = os.path.getsize(ngramFile)
+
+    # Return the measurements
+    return {
+        "order": order,
+        "memoryBytes": memoryBytes,
+        "trieNodes": nodes,
+        "modelFileBytes": fileBytes,
+        "sentenceMicroseconds": (seconds/SENTENCE_SAMPLES)*1000000,
+        "wordMicroseconds": (seconds/max(words,1))*1000000
+    }
+
+# Runs every benchmark
+# Returns a dict of all the measurements
+# seed -> Seed to generate with
+# corpus -> Text file to learn for the learning, generation, load, and save benchmarks
+# orders -> If the n-gram order benchmarks should be run
+# encoding -> Text encoding of every corpus read
+def runBenchmarks(seed,corpus,orders = True,encoding = CORPUS_ENCODING):
+    # Describe the run
+    results = {
+        "timestamp": str(datetime.datetime.now()).split(".")[0],
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "encoding": encoding
+    }
+
+    # Work in a temporary directory so no brain files are left behind
+    with tempfile.TemporaryDirectory() as directory:
+        # Learn
+        print("Benchmarking learning '"+corpus+"'.")
+        results["learnTextFile"], mercerInstance = benchmarkLearning(directory,corpus,encoding)
+
+        # Generate
+        print("Benchmarking generation.")
+        results["generation"] = benchmarkGeneration(mercerInstance,seed)
+
+        # Save the learned brain to convert from
+        mercerInstance.exitMercer()
+
+        # Load and save
+        print("Benchmarking loading and saving.")
+        results["brainFormats"] = benchmarkLoadSave(directory,mercerInstance.brainFile)
+
+    # Measure each n-gram order
+    if orders:
+        files = sorted(glob.glob(os.path.join(CORPUS_DIRECTORY,"*.txt")))
+        print("Benchmarking n-gram orders on "+str(len(files))+" files from '"+CORPUS_DIRECTORY+"'.")
+        results["ngramOrders"] = [benchmarkOrder(order,files,seed,encoding) for order in ORDERS]
+
+    # Record the peak memory of the whole run
+    results["peakRSSBytes"] = getPeakRSS()
+
+    # Return the measurements
+    return results
+
+# Runs the benchmarks from the command line and saves the results
+def main():
+    # Read the arguments
+    parser = argparse.ArgumentParser(description = "Benchmark Mercer's learning, generation, loading, and saving.")
+    parser.add_argument("--output",default = BENCHMARK_FILE,help = "File to save the JSON results to")
+    parser.add_argument("--seed",type = int,default = BENCHMARK_SEED,help = "Seed to generate with")
+    parser.add_argument("--corpus",default = BENCHMARK_CORPUS,help = "Text file to learn")
+    parser.add_argument("--encoding",default = CORPUS_ENCODING,help = "Text encoding of the corpora")
+    parser.add_argument("--skip-orders",action = "store_true",help = "Skip the n-gram order benchmarks")
+    arguments = parser.parse_args()
+
+    # Seed anything not given its own randomizer
+    random.seed(arguments.seed)
+
+    # Run
+    results = runBenchmarks(arguments.seed,arguments.corpus,not arguments.skip_orders,arguments.encoding)
+
+    # Save the results
+    with open(arguments.output,"w") as outFile:
+        outFile.write(json.dumps(results,indent = 4))
+
+    # Print the highlights
+    print("Learning: "+str(round(results["learnTextFile"]["wordsPerSecond"]))+" words/s")
+    print("createSentence: "+str(round(results["generation"]["createSentence"]["perSecond"]))+" sentences/s, p99 "+str(round(results["generation"]["createSentence"]["p99Milliseconds"],3))+" ms")
+    print("writeText: "+str(round(results["generation"]["writeText"]["perSecond"]))+" sentences/s")
+    for brainFormat, formatResults in results["brainFormats"].items():
+        print(brainFormat.upper()+" brain: load "+str(round(formatResults["establishBrainMBPerSecond"],1))+" MB/s, save "+str(round(formatResults["exitMercerMBPerSecond"],1))+" MB/s")
+    if results["peakRSSBytes"] != None:
+        print("Peak RSS: "+str(round(results["peakRSSBytes"]/1048576,1))+" MB")
+    print("Saved results to '"+arguments.output+"'.")
+
+# Run the benchmarks
+if __name__ == "__main__":
+    main()
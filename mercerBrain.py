@@ -0,0 +1,701 @@
+# MERCER Brain Storage
+# Compact in-memory storage for the words Mercer has learned and how they relate to each other.
+
+# Imports
+import os
+import sys
+import json
+import mmap
+import struct
+import heapq
+from array import array
+from collections import Counter
+from operator import itemgetter
+from bisect import bisect_left
+
+# Constants
+LEADING = "leading" # Side of a word that its leading words are stored on
+TRAILING = "trailing" # Side of a word that its trailing words are stored on
+SIDES = [LEADING, TRAILING] # Both sides of a word
+SIDE_INDEXES = {LEADING: 0, TRAILING: 1} # Position of each side's edge block within a word's pair of blocks in a binary brain file
+BINARY_MAGIC = b"MRCB" # Marker at the start of every binary brain file
+SQLITE_MAGIC = b"SQLite format 3\x00" # Marker at the start of every SQLite database file. Kept here so a brain file can be checked without importing 'sqlite3'
+BINARY_VERSION = 2 # Version of the binary brain file layout that is written
+READABLE_BINARY_VERSIONS = [1, 2] # Versions of the binary brain file layout that can be read. Version 1 files do not store the statistics, so they are counted from the edges when first needed
+BINARY_HEADER = struct.Struct("<4sIIQQ") # Binary brain file header. Format: Magic, Version, Word Count, Vocabulary Bytes, Type Names Bytes
+BINARY_STATISTICS = struct.Struct("<QQ") # Statistics following the header from version 2 on. Format: Edge Count, Token Count
+EDGE_ITEM_SIZE = array("I").itemsize # Bytes used by each neighbour ID or occurance count in an edge block
+TEMP_FILE_SUFFIX = ".tmp" # Suffix of the temporary file a brain file is written to before it replaces the old one
+
+# Functions
+# Checks if a file is a binary brain file
+# file -> Path to the file to check
+def isBinaryBrainFile(file):
+    # Read the start of the file
+    with open(file,"rb") as brainFile:
+        return brainFile.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+# Checks if a file is an SQLite database
+# file -> Path to the file to check
+def isSQLiteBrainFile(file):
+    # Read the start of the file
+    with open(file,"rb") as brainFile:
+        return brainFile.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+
+# Converts an array read from a binary brain file from little endian to the machine's byte order in place
+def swapFromLittleEndian(values):
+    # Swap if needed
+    if sys.byteorder != "little":
+        values.byteswap()
+
+    # Return the values
+    return values
+
+# Gets the bytes of an array in the little endian order used in binary brain files
+def toLittleEndianBytes(values):
+    # Check if a swap is needed
+    if sys.byteorder != "little":
+        # Swap a copy
+        values = array(values.typecode,values)
+        values.byteswap()
+
+    # Return the bytes
+    return values.tobytes()
+
+# The Fenwick Tree class structure
+# Holds a list of counts so the total of any leading run of them, and the position a running total is reached at, are found in O(log n) steps.
+# Node i (counting from 1) holds the total of the 'i & -i' counts that end at count i.
+class FenwickTree:
+    ## Constructor
+    # counts -> Iterable of the starting counts
+    def __init__(self,counts = ()):
+        # Prep the nodes. Node 0 is unused so the others can be numbered from 1
+        self.nodes = array("Q",[0])
+        self.nodes.extend(array("Q",counts))
+        self.total = sum(self.nodes)
+
+        # Fold each node into the next node that covers it
+        for index in range(1,len(self.nodes)):
+            parent = index+(index & -index)
+            if parent < len(self.nodes):
+                self.nodes[parent] += self.nodes[index]
+
+    ## Container Methods
+    # Gets the number of counts
+    def __len__(self):
+        return len(self.nodes)-1
+
+    ## Functional Methods
+    # Adds a count to the end
+    # count -> The new count
+    def append(self,count = 0):
+        # Add up the nodes the new node covers
+        index = len(self.nodes)
+        node = count
+        child = index-1
+        while child > index-(index & -index):
+            node += self.nodes[child]
+            child -= child & -child
+
+        # Add the node
+        self.nodes.append(node)
+        self.total += count
+
+    # Adds to one of the counts
+    # position -> Position of the count, counting from 0
+    # count -> Amount to add
+    def add(self,position,count):
+        # Update every node that covers the count
+        index = position+1
+        while index < len(self.nodes):
+            self.nodes[index] += count
+            index += index & -index
+
+        # Update the total
+        self.total += count
+
+    # Finds the position of the count that a running total passes a target in
+    # Returns the position, counting from 0
+    # target -> Running total to find, from 0 to one less than the total
+    def find(self,target):
+        # Step down from the largest node, skipping over any whose total does not pass the target
+        index = 0
+        step = 1 << ((len(self.nodes)-1).bit_length()-1)
+        while step > 0:
+            if index+step < len(self.nodes) and self.nodes[index+step] <= target:
+                index += step
+                target -= self.nodes[index]
+            step //= 2
+
+        # Return the position
+        return index
+
+# The Memory Brain class structure
+# Every word is interned to an integer ID. Each word keeps the neighbours on each side as one edge array holding
+# the neighbour IDs, in sorted order, followed by their occurances in the same order. Lookups are binary searches.
+class MemoryBrain:
+    ## Constructor
+    # defaultType -> Type to give newly learned words
+    def __init__(self,defaultType):
+        # Set the default type
+        self.defaultType = defaultType
+
+        # Prep the word tables. Format: [ID : Word] and [Word : ID]
+        self.words = []
+        self.wordIds = {}
+
+        # Prep the per word data, indexed by ID
+        self.types = []
+        self.starts = array("I")
+        self.edges = {LEADING: [], TRAILING: []}
+
+        # Prep the sentence start totals used to pick starts. None until first needed
+        self.startTree = None
+
+        # Prep the statistics kept up to date as the brain changes. The occurances of each word, and their total, are None until first needed after loading a version 1 binary brain or pruning
+        self.edgeCount = 0
+        self.typeCounts = Counter()
+        self.occurances = array("Q")
+        self.tokenCount = 0
+
+        # Prep the number of pairs first seen since 'takeNewEdgeCount()' was last called
+        self.newEdgeCount = 0
+
+        # Prep the binary source. Edges that are None have not been decoded from it yet
+        self.binarySource = None
+        self.edgeOffsets = None
+        self.edgesPosition = 0
+
+    ## Container Methods
+    # Checks if the word is known
+    def __contains__(self,word):
+        return word in self.wordIds
+
+    # Gets the number of known words
+    def __len__(self):
+        return len(self.words)
+
+    # Loops through the known words in the order they were learned
+    def __iter__(self):
+        return iter(self.words)
+
+    ## Functional Methods
+    # Gets the word with the specified ID
+    def getWord(self,wordId):
+        return self.words[wordId]
+
+    # Gets the ID of the word, or None if the word is not known
+    def getId(self,word):
+        return self.wordIds.get(word)
+
+    # Adds the word if it is not known yet
+    # Returns the ID of the word
+    def addWord(self,word):
+        # Check if already known
+        wordId = self.wordIds.get(word)
+        if wordId != None:
+            return wordId
+
+        # Intern the word
+        wordId = len(self.words)
+        self.words.append(word)
+        self.wordIds[word] = wordId
+
+        # Add its data
+        self.types.append(self.defaultType)
+        self.starts.append(0)
+        for side in SIDES:
+            self.edges[side].append(array("I"))
+        if self.startTree != None:
+            self.startTree.append()
+
+        # Count it
+        self.typeCounts[self.defaultType] += 1
+        if self.occurances != None:
+            self.occurances.append(0)
+
+        # Return the new ID
+        return wordId
+
+    # Gets the edge array of one side of a word, decoding it from the binary source the first time it is used
+    def getEdges(self,wordId,side):
+        # Get the edges
+        edges = self.edges[side][wordId]
+
+        # Check if they still need to be decoded
+        if edges == None:
+            # Find the edge block
+            block = (2*wordId)+SIDE_INDEXES[side]
+            start = self.edgeOffsets[block]
+            end = self.edgeOffsets[block+1]
+
+            # Decode and keep it
+            edges = array("I")
+            edges.frombytes(self.binarySource[self.edgesPosition+(start*EDGE_ITEM_SIZE):self.edgesPosition+(end*EDGE_ITEM_SIZE)])
+            swapFromLittleEndian(edges)
+            self.edges[side][wordId] = edges
+
+        # Return the edges
+        return edges
+
+    # Adds occurances of a neighbour to one side of a word. Both words must already be known
+    # wordId -> ID of the word to add to
+    # neighbourId -> ID of the neighbouring word
+    # side -> LEADING or TRAILING
+    # count -> Number of occurances to add
+    def addNeighbourById(self,wordId,neighbourId,side,count = 1):
+        # Count each occurance once, as the word being led
+        if side == LEADING and self.occurances != None:
+            self.occurances[wordId] += count
+            self.tokenCount += count
+
+        # Find where the neighbour is or should be among the IDs
+        edges = self.getEdges(wordId,side)
+        total = len(edges)//2
+        index = bisect_left(edges,neighbourId,0,total)
+
+        # Check if the neighbour is already there
+        if index < total and edges[index] == neighbourId:
+            # Increase common count
+            edges[total+index] += count
+        else:
+            # Insert the occurances then the neighbour in order
+            edges.insert(total+index,count)
+            edges.insert(index,neighbourId)
+
+            # Count the pair once, on its trailing side
+            if side == TRAILING:
+                self.edgeCount += 1
+                self.newEdgeCount += 1
+
+    # Adds occurances of a neighbour to one side of a word, adding either word if they are not known yet
+    def addNeighbour(self,word,neighbour,side,count = 1):
+        self.addNeighbourById(self.addWord(word),self.addWord(neighbour),side,count)
+
+    # Adds occurances of a leading word directly followed by a trailing word to both words, adding either word if they are not known yet
+    def addPair(self,leadingWord,trailingWord,count = 1):
+        # Get the IDs
+        leadingId = self.addWord(leadingWord)
+        trailingId = self.addWord(trailingWord)
+
+        # Add to both sides
+        self.addNeighbourById(leadingId,trailingId,TRAILING,count)
+        self.addNeighbourById(trailingId,leadingId,LEADING,count)
+
+    # Gets the neighbours on one side of a known word
+    # Returns a list of (Neighbour Word, Occurances) tuples
+    def getNeighbours(self,word,side):
+        # Get the edges
+        edges = self.getEdges(self.wordIds[word],side)
+        total = len(edges)//2
+
+        # Translate the neighbours
+        return [(self.words[edges[index]], edges[total+index]) for index in range(total)]
+
+    # Gets the type of a known word
+    def getType(self,word):
+        return self.types[self.wordIds[word]]
+
+    # Sets the type of a known word
+    def setType(self,word,wordType):
+        # Get the ID
+        wordId = self.wordIds[word]
+
+        # Move the word's count to the new type
+        self.typeCounts[self.types[wordId]] -= 1
+        self.typeCounts[wordType] += 1
+
+        # Set the type
+        self.types[wordId] = wordType
+
+    # Gets the number of times a known word has started a sentence
+    def getStarts(self,word):
+        return self.starts[self.wordIds[word]]
+
+    # Adds to the number of times a known word has started a sentence
+    def addStart(self,word,count = 1):
+        # Get the ID
+        wordId = self.wordIds[word]
+
+        # Add the starts
+        self.starts[wordId] += count
+        if self.startTree != None:
+            self.startTree.add(wordId,count)
+
+        # Count each start as an occurance
+        if self.occurances != None:
+            self.occurances[wordId] += count
+            self.tokenCount += count
+
+    # Gets the types of all known words in the order they were learned
+    def getTypes(self):
+        return iter(self.types)
+
+    # Picks a random known word
+    # Returns None if no words are known
+    # randomizer -> The 'random' module or a 'random.Random' instance to pick with
+    def chooseWord(self,randomizer):
+        # Check if empty
+        if len(self.words) == 0:
+            return None
+
+        # Pick from every known word
+        return self.words[randomizer.randrange(len(self.words))]
+
+    # Picks a random word weighted by the times each word has started a sentence
+    # Returns None if no sentences have been learned
+    # randomizer -> The 'random' module or a 'random.Random' instance to pick with
+    def chooseStart(self,randomizer):
+        # Total the start counts the first time they are needed
+        if self.startTree == None:
+            self.startTree = FenwickTree(self.starts)
+
+        # Check if empty
+        if self.startTree.total == 0:
+            return None
+
+        # Pick the word a random running total of starts falls in
+        return self.words[self.startTree.find(randomizer.randrange(self.startTree.total))]
+
+    # Gets the number of leading and trailing word pairs
+    def getEdgeCount(self):
+        return self.edgeCount
+
+    # Gets the number of pairs first seen since the last call, and resets it
+    def takeNewEdgeCount(self):
+        newEdgeCount = self.newEdgeCount
+        self.newEdgeCount = 0
+        return newEdgeCount
+
+    # Gets the number of known words of each type
+    # Returns a Counter of [Type : Number of Words]
+    def getTypeCounts(self):
+        return self.typeCounts
+
+    # Gets the number of words learned in total, counting each time a word followed another or started a sentence
+    def getTokenCount(self):
+        # Make sure the occurances are counted
+        self.getWordOccurances()
+
+        # Return the total
+        return self.tokenCount
+
+    # Gets how often each word has been seen, counting each leading neighbour occurance and each sentence start
+    # Counted from the edges the first time it is needed after loading a version 1 binary brain or pruning, then kept up to date
+    # Returns an array of occurances indexed by word ID
+    def getWordOccurances(self):
+        # Check if they need to be counted
+        if self.occurances == None:
+            # Add up each word's leading occurances
+            occurances = array("Q")
+            for wordId in range(len(self.words)):
+                edges = self.getEdges(wordId,LEADING)
+                occurances.append(self.starts[wordId]+sum(edges[len(edges)//2:]))
+
+            # Keep them
+            self.occurances = occurances
+            self.tokenCount = sum(occurances)
+
+        # Return the occurances
+        return self.occurances
+
+    # Gets the most often seen words, as counted by 'getWordOccurances()'. Words seen equally often are in the order they were learned
+    # Returns a list of (Word, Occurances) tuples from most to least seen
+    # count -> Max number of words to get
+    def getMostFrequentWords(self,count):
+        # Pick the top words with a heap
+        occurances = self.getWordOccurances()
+        return [(self.words[wordId], occurances[wordId]) for wordId in heapq.nlargest(count,range(len(self.words)),key = occurances.__getitem__)]
+
+    # Gets the most common neighbours on one side of a known word. Neighbours seen equally often are in the order their words were learned
+    # Returns a list of (Neighbour Word, Occurances) tuples from most to least common
+    # count -> Max number of neighbours to get
+    def getMostCommonNeighbours(self,word,side,count):
+        return heapq.nlargest(count,self.getNeighbours(word,side),key = itemgetter(1))
+
+    # Gets how many word pairs have been seen each number of times
+    # Returns a Counter of [Occurances : Number of Pairs]
+    def getEdgeHistogram(self):
+        # Count the trailing side of every pair
+        histogram = Counter()
+        for wordId in range(len(self.words)):
+            edges = self.getEdges(wordId,TRAILING)
+            histogram.update(edges[len(edges)//2:])
+
+        # Return the histogram
+        return histogram
+
+    # Gets how many words have been seen each number of times, as counted by 'getWordOccurances()'
+    # Returns a Counter of [Occurances : Number of Words]
+    def getWordHistogram(self):
+        return Counter(self.getWordOccurances())
+
+    # Removes rarely seen word pairs and words
+    # The remaining words are renumbered in the order they were learned so IDs stay contiguous
+    # Returns a tuple of (Words Removed, Pairs Removed)
+    # minOccurances -> Pairs seen fewer times than this are removed from both of their words
+    # minWordOccurances -> Words seen fewer times than this, as counted by 'getWordOccurances()', are removed along with all of their pairs
+    def prune(self,minOccurances,minWordOccurances):
+        # Decode every edge so they can be rebuilt
+        self.releaseBinarySource()
+
+        # Pick the words to keep and number them. Removed words are numbered -1
+        keptIds = [wordId for wordId, count in enumerate(self.getWordOccurances()) if count >= minWordOccurances]
+        newIds = [-1]*len(self.words)
+        for newId, oldId in enumerate(keptIds):
+            newIds[oldId] = newId
+
+        # Rebuild the edges of the kept words. Renumbering keeps the order, so the neighbour IDs stay sorted
+        edges = {LEADING: [], TRAILING: []}
+        edgeCount = 0
+        for oldId in keptIds:
+            for side in SIDES:
+                # Find the neighbours to keep
+                oldEdges = self.edges[side][oldId]
+                total = len(oldEdges)//2
+                keptIndexes = [index for index in range(total) if oldEdges[total+index] >= minOccurances and newIds[oldEdges[index]] != -1]
+
+                # Add the renumbered neighbours then their occurances
+                newEdges = array("I",[newIds[oldEdges[index]] for index in keptIndexes])
+                newEdges.extend([oldEdges[total+index] for index in keptIndexes])
+                edges[side].append(newEdges)
+
+            # Count the kept pairs
+            edgeCount += len(edges[TRAILING][-1])//2
+
+        # Count what was removed
+        removedWords = len(self.words)-len(keptIds)
+        removedEdges = self.edgeCount-edgeCount
+
+        # Replace the word tables and per word data
+        self.words = [self.words[wordId] for wordId in keptIds]
+        self.wordIds = {word: wordId for wordId, word in enumerate(self.words)}
+        self.types = [self.types[wordId] for wordId in keptIds]
+        self.starts = array("I",[self.starts[wordId] for wordId in keptIds])
+        self.edges = edges
+        self.edgeCount = edgeCount
+
+        # Recount the statistics
+        self.typeCounts = Counter(self.types)
+        self.occurances = None
+        self.tokenCount = None
+
+        # Total the start counts again when next needed
+        self.startTree = None
+
+        # Return what was removed
+        return (removedWords,removedEdges)
+
+    ## Conversion Methods
+    # Adds the contents of a stored dictionary, as used by the dictionary file, to the brain
+    # storedDictionary -> Dict of [Word : {"type", "leading", "trailing", Optional "starts"}] where each side is a list of {"word", "occurances"} parts
+    def loadStored(self,storedDictionary):
+        # Add all words first so IDs follow the stored order
+        for word in storedDictionary:
+            self.addWord(word)
+
+        # Loop through stored words
+        for word in storedDictionary:
+            # Get the word's data
+            wordData = storedDictionary[word]
+            wordId = self.wordIds[word]
+
+            # Set the type and start count
+            self.setType(word,wordData["type"])
+            if wordData.get("starts",0) > 0:
+                self.addStart(word,wordData["starts"])
+
+            # Fill both neighbour sides
+            for side in SIDES:
+                for part in wordData[side]:
+                    self.addNeighbourById(wordId,self.addWord(part["word"]),side,part["occurances"])
+
+    # Converts the brain to the stored dictionary format used by the dictionary file
+    def toStored(self):
+        # Prep the stored dictionary
+        storedDictionary = {}
+
+        # Loop through known words
+        for wordId, word in enumerate(self.words):
+            # Build the stored word entry
+            wordData = {"type": self.types[wordId]}
+            for side in SIDES:
+                wordData[side] = [{"word": neighbour, "occurances": count} for neighbour, count in self.getNeighbours(word,side)]
+
+            # Only store sentence start counts when present to match older dictionary files
+            if self.starts[wordId] > 0:
+                wordData["starts"] = self.starts[wordId]
+
+            # Add the entry
+            storedDictionary[word] = wordData
+
+        # Return the stored dictionary
+        return storedDictionary
+
+    # Replaces the brain's contents with a binary brain file
+    # Only the vocabulary, per word data, and statistics are read up front. Each edge block is decoded from the memory mapped file when first used
+    # file -> Path to the binary brain file
+    def loadBinary(self,file):
+        # Map the file
+        with open(file,"rb") as brainFile:
+            source = mmap.mmap(brainFile.fileno(),0,access=mmap.ACCESS_READ)
+
+        # Read the header
+        magic, version, wordCount, vocabSize, typeNamesSize = BINARY_HEADER.unpack_from(source,0)
+        if magic != BINARY_MAGIC or version not in READABLE_BINARY_VERSIONS:
+            # Not a readable brain
+            source.close()
+            raise ValueError("'"+str(file)+"' is not a version "+" or ".join([str(readable) for readable in READABLE_BINARY_VERSIONS])+" binary brain file.")
+        position = BINARY_HEADER.size
+
+        # Read the statistics
+        if version >= 2:
+            edgeCount, tokenCount = BINARY_STATISTICS.unpack_from(source,position)
+            position += BINARY_STATISTICS.size
+
+        # Read the vocabulary
+        self.words = json.loads(source[position:position+vocabSize].decode("utf-8"))
+        self.wordIds = {word: wordId for wordId, word in enumerate(self.words)}
+        position += vocabSize
+
+        # Read the type names
+        typeNames = json.loads(source[position:position+typeNamesSize].decode("utf-8"))
+        position += typeNamesSize
+
+        # Read the types
+        types = array("H")
+        types.frombytes(source[position:position+(wordCount*types.itemsize)])
+        self.types = [typeNames[typeIndex] for typeIndex in swapFromLittleEndian(types)]
+        self.typeCounts = Counter(self.types)
+        position += wordCount*types.itemsize
+
+        # Read the sentence start counts
+        self.starts = array("I")
+        self.starts.frombytes(source[position:position+(wordCount*self.starts.itemsize)])
+        swapFromLittleEndian(self.starts)
+        position += wordCount*self.starts.itemsize
+
+        # Read the occurances of each word
+        if version >= 2:
+            self.occurances = array("Q")
+            self.occurances.frombytes(source[position:position+(wordCount*self.occurances.itemsize)])
+            swapFromLittleEndian(self.occurances)
+            position += wordCount*self.occurances.itemsize
+
+        # Attach the edge blocks without decoding them
+        self.attachBinarySource(source,position,wordCount)
+        for side in SIDES:
+            self.edges[side] = [None]*wordCount
+
+        # Check if the statistics were stored
+        if version >= 2:
+            # Use them
+            self.edgeCount = edgeCount
+            self.tokenCount = tokenCount
+        else:
+            # Count the pairs from the lengths of the trailing edge blocks
+            self.edgeCount = sum([self.edgeOffsets[block+1]-self.edgeOffsets[block] for block in range(SIDE_INDEXES[TRAILING],2*wordCount,2)])//2
+
+            # Count the occurances when first needed, since they need every leading edge block decoded
+            self.occurances = None
+            self.tokenCount = None
+
+        # Total the start counts when first needed
+        self.startTree = None
+
+    # Points undecoded edges at a mapped binary brain file
+    # source -> The mapped file
+    # position -> Byte position of the edge offsets within the file
+    # wordCount -> Number of words stored in the file
+    def attachBinarySource(self,source,position,wordCount):
+        # Read the edge offsets
+        self.edgeOffsets = array("Q")
+        self.edgeOffsets.frombytes(source[position:position+(((2*wordCount)+1)*self.edgeOffsets.itemsize)])
+        swapFromLittleEndian(self.edgeOffsets)
+
+        # Set the source
+        self.binarySource = source
+        self.edgesPosition = position+(len(self.edgeOffsets)*self.edgeOffsets.itemsize)
+
+    # Decodes any remaining edges and releases the binary source
+    def releaseBinarySource(self):
+        # Check if there is a source
+        if self.binarySource != None:
+            # Decode the remaining edges
+            for wordId in range(len(self.edgeOffsets)//2):
+                for side in SIDES:
+                    self.getEdges(wordId,side)
+
+            # Release the source
+            self.binarySource.close()
+            self.binarySource = None
+            self.edgeOffsets = None
+
+    # Writes the brain to a binary brain file
+    # Edge blocks that were never decoded are copied straight from the current binary source
+    # file -> Path to the binary brain file to write
+    def saveBinary(self,file):
+        # Build the vocabulary and type tables
+        wordCount = len(self.words)
+        vocab = json.dumps(self.words).encode("utf-8")
+        typeNames = sorted(set(self.types))
+        typeIndexes = {typeName: typeIndex for typeIndex, typeName in enumerate(typeNames)}
+        typeNamesData = json.dumps(typeNames).encode("utf-8")
+        types = array("H",[typeIndexes[wordType] for wordType in self.types])
+
+        # Make sure the occurances are counted so they can be stored
+        occurances = self.getWordOccurances()
+
+        # Build the edge offsets
+        edgeOffsets = array("Q",[0])
+        for wordId in range(wordCount):
+            for side in SIDES:
+                # Get the length of the edge block
+                edges = self.edges[side][wordId]
+                if edges != None:
+                    length = len(edges)
+                else:
+                    block = (2*wordId)+SIDE_INDEXES[side]
+                    length = self.edgeOffsets[block+1]-self.edgeOffsets[block]
+
+                # Add the offset
+                edgeOffsets.append(edgeOffsets[-1]+length)
+
+        # Write to a temporary file first so a failed save leaves the old file intact
+        tempFile = file+TEMP_FILE_SUFFIX
+        with open(tempFile,"wb") as brainFile:
+            # Write the header and tables
+            brainFile.write(BINARY_HEADER.pack(BINARY_MAGIC,BINARY_VERSION,wordCount,len(vocab),len(typeNamesData)))
+            brainFile.write(BINARY_STATISTICS.pack(self.edgeCount,self.tokenCount))
+            brainFile.write(vocab)
+            brainFile.write(typeNamesData)
+            brainFile.write(toLittleEndianBytes(types))
+            brainFile.write(toLittleEndianBytes(self.starts))
+            brainFile.write(toLittleEndianBytes(occurances))
+            offsetsPosition = brainFile.tell()
+            brainFile.write(toLittleEndianBytes(edgeOffsets))
+
+            # Write the edge blocks
+            for wordId in range(wordCount):
+                for side in SIDES:
+                    edges = self.edges[side][wordId]
+                    if edges != None:
+                        # Write the decoded block
+                        brainFile.write(toLittleEndianBytes(edges))
+                    else:
+                        # Copy the raw block
+                        block = (2*wordId)+SIDE_INDEXES[side]
+                        brainFile.write(self.binarySource[self.edgesPosition+(self.edgeOffsets[block]*EDGE_ITEM_SIZE):self.edgesPosition+(self.edgeOffsets[block+1]*EDGE_ITEM_SIZE)])
+
+        # Release the old source so the file can be replaced on every platform
+        if self.binarySource != None:
+            self.binarySource.close()
+
+        # Replace the file
+        os.replace(tempFile,file)
+
+        # Point any undecoded edges at the new file, which holds the same blocks
+        if self.binarySource != None:
+            with open(file,"rb") as brainFile:
+                source = mmap.mmap(brainFile.fileno(),0,access=mmap.ACCESS_READ)
+            self.attachBinarySource(source,offsetsPosition,wordCount)
@@ -0,0 +1,174 @@
+# MERCER Corpus Manifest
+# Records what has been learned from each text file so files are only learned again when they change, and then only what changed.
+
+# Imports
+import os
+import io
+import json
+import hashlib
+from mercerBrain import TEMP_FILE_SUFFIX
+
+# Constants
+MANIFEST_SUFFIX = ".manifest" # Suffix added to the brain file's name for its corpus manifest
+HASH_CHUNK_SIZE = 1048576 # Number of bytes read at a time when hashing a file
+PARAGRAPH_HASH_SIZE = 8 # Number of bytes in each paragraph's hash
+
+# Functions
+# Hashes a file
+# Returns a tuple of (File Size, File Hash, Hash of the first 'prefixSize' bytes or None if the file is not that long)
+# file -> Path to the file to hash
+# prefixSize -> Optional number of bytes at the start of the file to also hash on their own
+def hashFile(file,prefixSize = None):
+    # Prep the hashes
+    fileHash = hashlib.sha256()
+    prefixHash = None
+
+    # Read chunk by chunk
+    with open(file,"rb") as fileRead:
+        size = 0
+        while True:
+            # Stop the chunk at the end of the prefix
+            readSize = HASH_CHUNK_SIZE
+            if prefixHash == None and prefixSize != None and prefixSize-size < readSize:
+                readSize = prefixSize-size
+
+            # Read the chunk
+            chunk = fileRead.read(readSize)
+            fileHash.update(chunk)
+            size += len(chunk)
+
+            # Check if the prefix was reached
+            if prefixHash == None and prefixSize != None and size == prefixSize:
+                prefixHash = fileHash.hexdigest()
+
+            # Check if done
+            if len(chunk) == 0 and readSize > 0:
+                break
+
+    # Return the hashes
+    return (size,fileHash.hexdigest(),prefixHash)
+
+# Hashes a paragraph's text
+# lines -> List of the paragraph's lines
+def hashParagraph(lines):
+    return hashlib.blake2b("\n".join(lines).encode("utf-8"),digest_size = PARAGRAPH_HASH_SIZE).hexdigest()
+
+# Reads a text file's paragraphs, which are separated by blank lines
+# Yields a list of lines, without their new lines, for each paragraph
+# file -> Path to the file to read
+# start -> Byte to start reading from
+# encoding -> Text encoding of the file. None uses the locale's default
+def readParagraphs(file,start = 0,encoding = None):
+    # Open the file as bytes to start part way, then decode the same way 'open()' would
+    with open(file,"rb") as fileRead:
+        fileRead.seek(start)
+
+        # Collect lines until a blank one
+        paragraph = []
+        for line in io.TextIOWrapper(fileRead,encoding = encoding):
+            line = line.strip("\n")
+            if line.strip() == "":
+                if len(paragraph) > 0:
+                    yield paragraph
+                    paragraph = []
+            else:
+                paragraph.append(line)
+
+        # Send the last paragraph
+        if len(paragraph) > 0:
+            yield paragraph
+
+# Checks if a file ends with a new line
+# file -> Path to the file to check
+def endsWithNewline(file):
+    with open(file,"rb") as fileRead:
+        # Check the last byte
+        if os.fstat(fileRead.fileno()).st_size == 0:
+            return False
+        fileRead.seek(-1,os.SEEK_END)
+        return fileRead.read(1) == b"\n"
+
+# Reads a corpus manifest file
+# Returns the CorpusManifest
+# file -> Path to the manifest file
+def readManifestFile(file):
+    # Prep the manifest
+    manifest = CorpusManifest()
+
+    # Read the JSON data
+    with open(file,"r",encoding = "utf-8") as manifestFile:
+        manifest.loadStored(json.loads(manifestFile.read()))
+
+    # Return the manifest
+    return manifest
+
+# Writes a corpus manifest to a file
+# Written to a temporary file first so a failed save leaves the old file intact
+# manifest -> The CorpusManifest to write
+# file -> Path to the manifest file
+def writeManifestFile(manifest,file):
+    # Write the JSON data
+    with open(file+TEMP_FILE_SUFFIX,"w",encoding = "utf-8") as manifestFile:
+        manifestFile.write(json.dumps(manifest.toStored()))
+
+    # Replace the file
+    os.replace(file+TEMP_FILE_SUFFIX,file)
+
+# The Corpus Manifest class structure
+# Keeps a record for each learned file. Format: [Absolute Path : {"size": Bytes Learned, "hash": SHA-256 of the Bytes Learned, "endsWithNewline": If the last line learned was whole, "paragraphs": List of Paragraph Hashes}]
+# and for each learned web page. Format: [URL : {"hash": Hash of the Text Learned, "paragraphs": List of Paragraph Hashes}]
+class CorpusManifest:
+    ## Constructor
+    def __init__(self):
+        # Prep the records
+        self.files = {}
+        self.pages = {}
+
+    ## Functional Methods
+    # Gets the record of a learned file
+    # Returns None if the file has not been learned
+    # file -> Path to the file
+    def getRecord(self,file):
+        return self.files.get(os.path.abspath(file))
+
+    # Sets the record of a learned file
+    # file -> Path to the file
+    # record -> The file's record
+    def setRecord(self,file,record):
+        self.files[os.path.abspath(file)] = record
+
+    # Gets the record of a learned web page
+    # Returns None if the page has not been learned
+    # url -> The page's URL
+    def getPageRecord(self,url):
+        return self.pages.get(url)
+
+    # Sets the record of a learned web page
+    # url -> The page's URL
+    # record -> The page's record
+    def setPageRecord(self,url,record):
+        self.pages[url] = record
+
+    # Checks if nothing has been recorded
+    def isEmpty(self):
+        return len(self.files) == 0 and len(self.pages) == 0
+
+    # Gets the hash of every paragraph learned from any file
+    def getAllParagraphs(self):
+        # Collect the hashes
+        paragraphs = set()
+        for record in self.files.values():
+            paragraphs.update(record["paragraphs"])
+
+        # Return the hashes
+        return paragraphs
+
+    # Loads the records from the stored format
+    # stored -> Dict in the format made by 'toStored()'
+    def loadStored(self,stored):
+        self.files = stored["files"]
+        self.pages = stored.get("pages",{})
+
+    # Converts the records to the stored format
+    def toStored(self):
+        return {"files": self.files, "pages": self.pages}
@@ -0,0 +1,233 @@
+# MERCER Feed Ingestion
+# Fetches RSS feeds and the articles they link to through one pooled session, caching every response on disk so unchanged pages are not downloaded again.
+# Needs 'requests' (pip install requests [or] pipenv install requests)
+
+# Imports
+import os
+import json
+import hashlib
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+import xml.etree.ElementTree as elementTree
+import requests
+from requests.adapters import HTTPAdapter
+from mercerBrain import TEMP_FILE_SUFFIX
+
+# Constants
+FEED_CACHE_DIRECTORY = "feedCache" # Directory that fetched pages are cached in
+REQUEST_TIMEOUT = 10 # Seconds to wait to connect to, or hear back from, a web server
+FEED_WORKERS = 8 # Max number of pages fetched at once
+USER_AGENT = "MercerAssistant" # User agent sent with every request
+SKIPPED_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "figure", "svg"] # Tags whose text is never part of an article
+PARAGRAPH_TAGS = ["p"] # Tags whose text is extracted from articles
+ATOM_NAMESPACE = "{http://www.w3.org/2005/Atom}" # Namespace of Atom feed tags
+
+# Functions
+# Extracts the paragraph text of an HTML article
+# Returns the paragraphs separated by new lines
+# html -> The article's HTML as a string
+def extractArticleText(html):
+    # Parse the article
+    extractor = ParagraphExtractor()
+    extractor.feed(html)
+    extractor.close()
+
+    # Join the paragraphs
+    return "\n".join(extractor.paragraphs)
+
+# Reads the items of an RSS or Atom feed
+# Returns a list of (Title, Link) tuples. Empty if the feed could not be parsed
+# content -> The feed's XML as bytes
+def parseFeedItems(content):
+    # Parse the XML
+    try:
+        root = elementTree.fromstring(content)
+    except elementTree.ParseError as err:
+        return []
+
+    # Read RSS items
+    items = []
+    for item in root.iter("item"):
+        # Prefer the link, then the guid
+        link = item.findtext("link") or item.findtext("guid")
+        if link != None:
+            items.append(((item.findtext("title") or "").strip(),link.strip()))
+
+    # Read Atom entries
+    for entry in root.iter(ATOM_NAMESPACE+"entry"):
+        linkElement = entry.find(ATOM_NAMESPACE+"link")
+        if linkElement != None and linkElement.get("href") != None:
+            items.append(((entry.findtext(ATOM_NAMESPACE+"title") or "").strip(),linkElement.get("href")))
+
+    # Return the items
+    return items
+
+# The Paragraph Extractor class structure
+# Collects the text inside paragraph tags, skipping anything inside tags that are never part of an article
+class ParagraphExtractor(HTMLParser):
+    ## Constructor
+    def __init__(self):
+        # Prep the parser
+        super().__init__(convert_charrefs = True)
+
+        # Prep the paragraphs
+        self.paragraphs = []
+        self.currentParts = None
+        self.skipDepth = 0
+
+    ## Functional Methods
+    # Tracks entering skipped tags and paragraphs
+    def handle_starttag(self,tag,attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipDepth += 1
+        elif tag in PARAGRAPH_TAGS and self.skipDepth == 0:
+            self.finishParagraph()
+            self.currentParts = []
+
+    # Tracks leaving skipped tags and paragraphs
+    def handle_endtag(self,tag):
+        if tag in SKIPPED_TAGS:
+            self.skipDepth = max(0,self.skipDepth-1)
+        elif tag in PARAGRAPH_TAGS:
+            self.finishParagraph()
+
+    # Collects text inside a paragraph
+    def handle_data(self,data):
+        if self.currentParts != None and self.skipDepth == 0:
+            self.currentParts.append(data)
+
+    # Adds the current paragraph if it has any text
+    def finishParagraph(self):
+        if self.currentParts != None:
+            # Collapse the whitespace
+            paragraph = " ".join("".join(self.currentParts).split())
+            if paragraph != "":
+                self.paragraphs.append(paragraph)
+        self.currentParts = None
+
+    # Finishes an unclosed paragraph
+    def close(self):
+        super().close()
+        self.finishParagraph()
+
+# The Feed Cache class structure
+# Keeps each fetched page's body and validators on disk, keyed by a hash of its URL
+class FeedCache:
+    ## Constructor
+    # directory -> Directory to keep the cache in
+    def __init__(self,directory):
+        # Set the directory
+        self.directory = directory
+
+        # Make sure it exists
+        os.makedirs(directory,exist_ok = True)
+
+    ## Functional Methods
+    # Gets the path of a URL's cache files without an extension
+    def getPath(self,url):
+        return os.path.join(self.directory,hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    # Gets a cached page
+    # Returns a tuple of (Dict of ETag, Last-Modified, and Encoding, Body bytes), or None if the page is not cached
+    def get(self,url):
+        # Check if cached
+        path = self.getPath(url)
+        if not (os.path.isfile(path+".json") and os.path.isfile(path+".body")):
+            return None
+
+        # Read the page
+        with open(path+".json","r",encoding = "utf-8") as metaFile, open(path+".body","rb") as bodyFile:
+            return (json.loads(metaFile.read()),bodyFile.read())
+
+    # Caches a page. The body is written before the validators so validators are never saved without their body
+    # url -> The page's URL
+    # meta -> Dict of ETag, Last-Modified, and Encoding
+    # body -> The page's body bytes
+    def put(self,url,meta,body):
+        # Write the body
+        path = self.getPath(url)
+        with open(path+".body"+TEMP_FILE_SUFFIX,"wb") as bodyFile:
+            bodyFile.write(body)
+        os.replace(path+".body"+TEMP_FILE_SUFFIX,path+".body")
+
+        # Write the validators
+        meta["url"] = url
+        with open(path+".json"+TEMP_FILE_SUFFIX,"w",encoding = "utf-8") as metaFile:
+            metaFile.write(json.dumps(meta))
+        os.replace(path+".json"+TEMP_FILE_SUFFIX,path+".json")
+
+# The Feed Client class structure
+# Fetches pages through one session whose connections are reused, sending the cached ETag and Last-Modified so unchanged pages come back as 304 Not Modified
+class FeedClient:
+    ## Constructor
+    # cacheDirectory -> Directory to cache pages in
+    # workers -> Max number of pages fetched at once. Also the number of connections kept open to each host
+    # timeout -> Seconds to wait to connect to, or hear back from, a web server
+    def __init__(self,cacheDirectory = FEED_CACHE_DIRECTORY,workers = FEED_WORKERS,timeout = REQUEST_TIMEOUT):
+        # Set the options
+        self.workers = workers
+        self.timeout = timeout
+
+        # Prep the cache
+        self.cache = FeedCache(cacheDirectory)
+
+        # Prep the session with a connection pool large enough for every worker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = workers,pool_maxsize = workers)
+        self.session.mount("http://",adapter)
+        self.session.mount("https://",adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+
+    ## Functional Methods
+    # Fetches a page, using the cached copy if the server says it has not changed
+    # Returns a tuple of (Body bytes, Encoding or None, If the page changed since it was cached). Raises 'requests' exceptions on failure
+    # url -> The page's URL
+    def fetch(self,url):
+        # Check the cache
+        cached = self.cache.get(url)
+
+        # Send the validators
+        headers = {}
+        if cached != None:
+            if cached[0].get("etag") != None:
+                headers["If-None-Match"] = cached[0]["etag"]
+            if cached[0].get("lastModified") != None:
+                headers["If-Modified-Since"] = cached[0]["lastModified"]
+
+        # Request the page
+        response = self.session.get(url,headers = headers,timeout = self.timeout)
+
+        # Check if unchanged
+        if response.status_code == 304 and cached != None:
+            return (cached[1],cached[0].get("encoding"),False)
+
+        # Make sure it worked
+        response.raise_for_status()
+
+        # Cache the page if it can be validated later
+        etag = response.headers.get("ETag")
+        lastModified = response.headers.get("Last-Modified")
+        if etag != None or lastModified != None:
+            self.cache.put(url,{"etag": etag, "lastModified": lastModified, "encoding": response.encoding},response.content)
+
+        # Send the page
+        return (response.content,response.encoding,True)
+
+    # Fetches many pages at once
+    # Returns a list of (URL, Body bytes, Encoding or None, If the page changed) tuples in the same order. Pages that failed have a body of None
+    # urls -> List of page URLs
+    def fetchMany(self,urls):
+        # Fetches a page, catching failures
+        def fetchSafely(url):
+            try:
+                return (url,)+self.fetch(url)
+            except requests.RequestException as err:
+                return (url,None,None,False)
+
+        # Fetch with the workers
+        with ThreadPoolExecutor(max(1,min(self.workers,len(urls)))) as executor:
+            return list(executor.map(fetchSafely,urls))
+
+    # Closes the session's connections
+    def close(self):
+        self.session.close()
@@ -0,0 +1,148 @@
+# MERCER Learning Journal
+# Append-only record of what Mercer learns so learning survives crashes without rewriting the whole brain file.
+
+# Imports
+import os
+import json
+import time
+from mercerBrain import TEMP_FILE_SUFFIX
+
+# Constants
+JOURNAL_SUFFIX = ".journal" # Suffix added to the brain file's name for its journal
+COMPACTING_SUFFIX = ".compacting" # Suffix added to the journal's name while it is being folded into the brain file
+JOURNAL_FLUSH_INTERVAL = 2 # Max seconds that recorded learning can wait before being flushed to the journal file
+ENTRY_WORD = "w" # Journal entry for a new word. Format: [Kind, Word]
+ENTRY_EDGE = "e" # Journal entry for added neighbour occurances. Format: [Kind, Word, Neighbour, Side, Count]
+ENTRY_START = "s" # Journal entry for added sentence starts. Format: [Kind, Word, Count]
+ENTRY_TYPE = "t" # Journal entry for a changed word type. Format: [Kind, Word, Type]
+ENTRY_NGRAM = "n" # Journal entry for added word sequence occurances in the n-gram model. Format: [Kind, List of Words, Count]
+ENTRY_FILE = "f" # Journal entry for a learned file's corpus manifest record. Format: [Kind, Absolute Path, Record]
+ENTRY_PAGE = "p" # Journal entry for a learned web page's corpus manifest record. Format: [Kind, URL, Record]
+
+# Functions
+# Finishes or rolls back a compaction that was interrupted by a crash
+# A compaction creates the brain's temporary file, renames the journal to its compacting name, writes each side file to its temporary file,
+# replaces the brain, moves the side files' temporary files into place, then deletes the compacting journal
+# brainFile -> Path to the brain file
+# sideFiles -> Paths of the files saved beside the brain file, like its n-gram model and corpus manifest
+def recoverCompaction(brainFile,sideFiles = ()):
+    # Get the paths
+    journalFile = brainFile+JOURNAL_SUFFIX
+    compactingFile = journalFile+COMPACTING_SUFFIX
+    tempFile = brainFile+TEMP_FILE_SUFFIX
+
+    # Check what was left behind
+    if os.path.isfile(compactingFile):
+        if os.path.isfile(tempFile):
+            # The brain was not replaced, so the compacting journal still needs to be replayed
+            if os.path.isfile(journalFile):
+                # Put the compacting entries before any newer ones
+                with open(compactingFile,"ab") as compacting, open(journalFile,"rb") as journal:
+                    compacting.write(journal.read())
+            os.replace(compactingFile,journalFile)
+        else:
+            # The brain was replaced, so the side files were fully written. Move them into place
+            for sideFile in sideFiles:
+                if os.path.isfile(sideFile+TEMP_FILE_SUFFIX):
+                    os.replace(sideFile+TEMP_FILE_SUFFIX,sideFile)
+
+            # The compacting journal is already in the brain and side files
+            os.remove(compactingFile)
+
+    # Remove any partly written brain or side files
+    for partFile in [tempFile]+[sideFile+TEMP_FILE_SUFFIX for sideFile in sideFiles]:
+        if os.path.isfile(partFile):
+            os.remove(partFile)
+
+# Applies a journal file to a brain
+# Returns the number of bytes of whole entries that were applied. Anything after that is a partly written entry from a crash
+# file -> Path to the journal file
+# brain -> The MemoryBrain to apply the entries to
+# model -> The NGramModel to apply n-gram entries to. None skips them
+# manifest -> The CorpusManifest to apply file entries to. None skips them
+def replayJournal(file,brain,model = None,manifest = None):
+    # Prep the applied byte count
+    appliedBytes = 0
+
+    # Read entry by entry
+    with open(file,"rb") as journalFile:
+        for line in journalFile:
+            # Stop at a partly written entry
+            try:
+                if not line.endswith(b"\n"):
+                    break
+                entry = json.loads(line.decode("utf-8"))
+            except ValueError as err:
+                break
+
+            # Apply the entry
+            kind = entry[0]
+            if kind == ENTRY_EDGE:
+                brain.addNeighbour(entry[1],entry[2],entry[3],entry[4])
+            elif kind == ENTRY_WORD:
+                brain.addWord(entry[1])
+            elif kind == ENTRY_START:
+                brain.addStart(entry[1],entry[2])
+            elif kind == ENTRY_TYPE:
+                brain.setType(entry[1],entry[2])
+            elif kind == ENTRY_NGRAM:
+                if model != None:
+                    model.addNGram(entry[1],entry[2])
+            elif kind == ENTRY_FILE:
+                if manifest != None:
+                    manifest.setRecord(entry[1],entry[2])
+            elif kind == ENTRY_PAGE:
+                if manifest != None:
+                    manifest.setPageRecord(entry[1],entry[2])
+
+            # Count the entry
+            appliedBytes += len(line)
+
+    # Return the applied byte count
+    return appliedBytes
+
+# The Learning Journal class structure
+class LearningJournal:
+    ## Constructor
+    # file -> Path to the journal file
+    # validBytes -> Number of bytes at the start of an existing journal to keep. Anything after is discarded. None keeps everything
+    def __init__(self,file,validBytes = None):
+        # Set the file
+        self.file = file
+
+        # Discard any partly written entry
+        if validBytes != None and os.path.isfile(file) and os.path.getsize(file) > validBytes:
+            os.truncate(file,validBytes)
+
+        # Open for appending
+        self.journalFile = open(file,"a",encoding = "utf-8")
+        self.lastFlush = time.monotonic()
+
+    ## Functional Methods
+    # Records an entry. Entries are flushed to disk at least every JOURNAL_FLUSH_INTERVAL seconds while recording
+    # entry -> The entry's kind and values, as described by the ENTRY constants
+    def record(self,*entry):
+        # Write the entry
+        self.journalFile.write(json.dumps(entry)+"\n")
+
+        # Check if it is time to flush
+        if time.monotonic()-self.lastFlush > JOURNAL_FLUSH_INTERVAL:
+            self.flush()
+
+    # Flushes recorded entries to disk
+    def flush(self):
+        # Flush the file
+        self.journalFile.flush()
+        os.fsync(self.journalFile.fileno())
+
+        # Reset the timer
+        self.lastFlush = time.monotonic()
+
+    # Gets the size of the journal in bytes
+    def getSize(self):
+        return self.journalFile.tell()
+
+    # Flushes and closes the journal
+    def close(self):
+        self.flush()
+        self.journalFile.close()
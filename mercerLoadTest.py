@@ -0,0 +1,134 @@
+# MERCER Load Test
+# Sends many requests to a running Mercer server at once and measures how many it answers each second and how long the slowest take.
+# Run with: python mercerLoadTest.py [--url URL] [--requests Requests] [--concurrency Connections]
+
+# Imports
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+from mercerBenchmark import getPercentile
+
+# Constants
+LOAD_TEST_URL = "http://127.0.0.1:8035/sentence?maxLength=12" # URL requested by default
+LOAD_TEST_REQUESTS = 2000 # Total number of requests sent by default
+LOAD_TEST_CONCURRENCY = 32 # Number of connections sending requests at once by default
+LOAD_TEST_WARMUP = 50 # Requests sent before measuring so connections and workers are ready
+
+# Functions
+# Sends requests over one kept alive connection until there are none left to send
+# Returns a tuple of (List of seconds each request took, Dict of the count of each status)
+# host -> The server's address
+# port -> The server's port
+# target -> The path and query to request
+# remaining -> List holding the number of requests left to send, shared by every connection
+async def runConnection(host,port,target,remaining):
+    # Prep the results
+    latencies = []
+    statuses = {}
+
+    # Connect
+    reader, writer = await asyncio.open_connection(host,port)
+    request = ("GET "+target+" HTTP/1.1\r\nHost: "+host+"\r\nConnection: keep-alive\r\n\r\n").encode("latin-1")
+
+    # Send requests until none are left
+    try:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+
+            # Send the request
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+
+            # Read the status and headers
+            status = int((await reader.readline()).split()[1])
+            bodyBytes = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n",b"\n",b""):
+                    break
+                name, separator, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    bodyBytes = int(value)
+
+            # Read the body
+            await reader.readexactly(bodyBytes)
+            latencies.append(time.perf_counter()-start)
+            statuses[status] = statuses.get(status,0)+1
+    finally:
+        # Disconnect
+        writer.close()
+
+    # Send the results
+    return (latencies,statuses)
+
+# Runs a load test
+# Returns a dict of the measurements
+# url -> The URL to request
+# requests -> Total number of requests to send
+# concurrency -> Number of connections sending requests at once
+async def runLoadTest(url,requests,concurrency):
+    # Split the URL
+    parts = urlsplit(url)
+    target = parts.path+("?"+parts.query if parts.query != "" else "")
+
+    # Warm up
+    await asyncio.gather(*[runConnection(parts.hostname,parts.port or 80,target,[LOAD_TEST_WARMUP//concurrency+1]) for index in range(0,concurrency)])
+
+    # Send the requests
+    remaining = [requests]
+    start = time.perf_counter()
+    results = await asyncio.gather(*[runConnection(parts.hostname,parts.port or 80,target,remaining) for index in range(0,concurrency)])
+    seconds = time.perf_counter()-start
+
+    # Combine the connections' results
+    latencies = []
+    statuses = {}
+    for connectionLatencies, connectionStatuses in results:
+        latencies.extend(connectionLatencies)
+        for status, count in connectionStatuses.items():
+            statuses[status] = statuses.get(status,0)+count
+
+    # Return the measurements
+    return {
+        "url": url,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "requestsPerSecond": len(latencies)/max(seconds,1e-9),
+        "p50Milliseconds": getPercentile(latencies,0.5)*1000,
+        "p90Milliseconds": getPercentile(latencies,0.9)*1000,
+        "p99Milliseconds": getPercentile(latencies,0.99)*1000,
+        "maxMilliseconds": max(latencies)*1000,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())}
+    }
+
+# Runs the load test from the command line
+def main():
+    # Read the arguments
+    parser = argparse.ArgumentParser(description = "Load test a running Mercer server.")
+    parser.add_argument("--url",default = LOAD_TEST_URL,help = "URL to request")
+    parser.add_argument("--requests",type = int,default = LOAD_TEST_REQUESTS,help = "Total number of requests to send")
+    parser.add_argument("--concurrency",type = int,default = LOAD_TEST_CONCURRENCY,help = "Number of connections sending requests at once")
+    parser.add_argument("--output",default = None,help = "Optional file to save the JSON results to")
+    arguments = parser.parse_args()
+
+    # Run
+    results = asyncio.run(runLoadTest(arguments.url,arguments.requests,max(1,arguments.concurrency)))
+
+    # Save the results
+    if arguments.output != None:
+        with open(arguments.output,"w") as outFile:
+            outFile.write(json.dumps(results,indent = 4))
+
+    # Print the results
+    print(str(results["requests"])+" requests over "+str(results["concurrency"])+" connections in "+str(round(results["seconds"],2))+" s")
+    print("Throughput: "+str(round(results["requestsPerSecond"]))+" requests/s")
+    print("Latency: p50 "+str(round(results["p50Milliseconds"],2))+" ms, p90 "+str(round(results["p90Milliseconds"],2))+" ms, p99 "+str(round(results["p99Milliseconds"],2))+" ms, max "+str(round(results["maxMilliseconds"],2))+" ms")
+    print("Statuses: "+", ".join([status+" x"+str(count) for status, count in results["statuses"].items()]))
+
+# Run the load test
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# MERCER Metrics
+# Cheap counters and timers for Mercer's learning and generation, and a profiler for looking closer at a single operation.
+
+# Imports
+import io
+import time
+
+# Constants
+COUNTERS = [ # Names of the counted events
+    "tokensLearned", # Words read from learned text
+    "newWords", # Words added to the dictionary
+    "newEdges", # Word pairs seen for the first time
+    "sentencesGenerated", # Sentences written
+    "wordsChosen", # Calls to 'MERCER.chooseWordToFollow()'. Calls made by generation worker processes are not counted
+    "wordsPruned", # Words removed to keep the brain within its budget
+    "edgesPruned" # Word pairs removed to keep the brain within its budget
+]
+TIMERS = [ # Names of the timed work
+    "tokenize", # Splitting and cleaning learned text into words, and counting it in batches
+    "update", # Adding counted words and pairs to the brain
+    "sample", # Writing sentences. Not timed for sentences written by generation worker processes
+    "persist", # Writing the brain file
+    "prune" # Removing rare words and pairs to keep the brain within its budget
+]
+PROFILER_CPROFILE = "cprofile" # Profiler that reports where time was spent
+PROFILER_TRACEMALLOC = "tracemalloc" # Profiler that reports where memory was allocated
+PROFILE_REPORT_LINES = 25 # Number of entries included in a profile report
+
+# Functions
+# Runs a function under a profiler
+# The profilers are only imported here so they do not slow down importing Mercer
+# Returns a tuple of (The function's result, Text report from the profiler)
+# function -> The function to run
+# profiler -> PROFILER_CPROFILE or PROFILER_TRACEMALLOC
+# args -> Arguments to run the function with
+# kwargs -> Keyword arguments to run the function with
+def profileCall(function,profiler,*args,**kwargs):
+    # Check the profiler
+    if profiler == PROFILER_TRACEMALLOC:
+        # Import the profiler
+        import tracemalloc
+
+        # Trace the allocations, unless something else already is
+        alreadyTracing = tracemalloc.is_tracing()
+        if not alreadyTracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+
+        # Run the function
+        try:
+            result = function(*args,**kwargs)
+            after = tracemalloc.take_snapshot()
+        finally:
+            if not alreadyTracing:
+                tracemalloc.stop()
+
+        # Report the largest changes
+        report = "\n".join([str(stat) for stat in after.compare_to(before,"lineno")[:PROFILE_REPORT_LINES]])
+    else:
+        # Import the profiler
+        import cProfile
+        import pstats
+
+        # Run the function under cProfile
+        profile = cProfile.Profile()
+        result = profile.runcall(function,*args,**kwargs)
+
+        # Report the most time consuming calls
+        reportText = io.StringIO()
+        pstats.Stats(profile,stream = reportText).sort_stats("cumulative").print_stats(PROFILE_REPORT_LINES)
+        report = reportText.getvalue()
+
+    # Send the result and report
+    return (result,report)
+
+# The Mercer Metrics class structure
+# Counters and timers are plain dicts updated in place so they stay cheap enough to leave on
+class MercerMetrics:
+    ## Constructor
+    def __init__(self):
+        # Prep the counters and timers
+        self.reset()
+
+    ## Functional Methods
+    # Zeroes every counter and timer
+    def reset(self):
+        self.counters = dict.fromkeys(COUNTERS,0)
+        self.timers = dict.fromkeys(TIMERS,0.0)
+        self.timerCalls = dict.fromkeys(TIMERS,0)
+
+    # Adds to a counter
+    # name -> Name of the counter from COUNTERS
+    # amount -> Amount to add
+    def count(self,name,amount = 1):
+        self.counters[name] += amount
+
+    # Adds the time since a start time to a timer
+    # name -> Name of the timer from TIMERS
+    # start -> Start time from 'time.perf_counter()'
+    def addTime(self,name,start):
+        self.timers[name] += time.perf_counter()-start
+        self.timerCalls[name] += 1
+
+    # Converts the metrics to a dict
+    # Returns a dict of the counters and of each timer's total seconds and number of timed calls
+    def toDict(self):
+        return {
+            "counters": dict(self.counters),
+            "timers": {name: {"seconds": self.timers[name], "calls": self.timerCalls[name]} for name in TIMERS}
+        }
@@ -0,0 +1,185 @@
+# MERCER N-Gram Model
+# Remembers which words follow sequences of more than one word so sentences can be generated from longer contexts than a word's immediate neighbours.
+
+# Imports
+import os
+import sys
+import json
+from mercerBrain import TEMP_FILE_SUFFIX
+
+# Constants
+NGRAM_SUFFIX = ".ngram" # Suffix added to the brain file's name for its n-gram model file
+
+# Functions
+# Counts every sequence of 2 to 'order'+1 words in a sentence. Each is a context of up to 'order' words and the word that followed it
+# words -> List of the sentence's cleaned words
+# order -> Longest context to count
+# ngramCounts -> Counter of word sequence tuples to add to
+def countNGrams(words,order,ngramCounts):
+    # Loop through the starting words
+    wordCount = len(words)
+    for start in range(0,wordCount-1):
+        # Count each sequence starting at the word
+        ngramCounts.update([tuple(words[start:end]) for end in range(start+2,min(start+order+1,wordCount)+1)])
+
+# Reads an n-gram model file
+# Returns an NGramModel that learns contexts of up to 'order' words
+# file -> Path to the n-gram model file
+# order -> Longest context the model should learn. None keeps the order the model was saved with
+def readNGramFile(file,order = None):
+    # Read the JSON data
+    with open(file,"r",encoding = "utf-8") as modelFile:
+        stored = json.loads(modelFile.read())
+
+    # Prep the model
+    model = NGramModel(stored["order"] if order == None else order)
+    model.loadStored(stored)
+
+    # Return the model
+    return model
+
+# Writes an n-gram model to a file
+# Written to a temporary file first so a failed save leaves the old file intact
+# model -> The NGramModel to write
+# file -> Path to the n-gram model file
+def writeNGramFile(model,file):
+    # Write the JSON data
+    with open(file+TEMP_FILE_SUFFIX,"w",encoding = "utf-8") as modelFile:
+        modelFile.write(json.dumps(model.toStored()))
+
+    # Replace the file
+    os.replace(file+TEMP_FILE_SUFFIX,file)
+
+# The N-Gram Model class structure
+# Word sequences are stored in a trie so sequences that start the same way share their leading nodes.
+# Each node is the occurance count of the sequence leading to it, or once it has followers, a list of [Count, Dict of Following Word : Node].
+# Sampling a context walks from the root through each word of the context and picks from the node's followers.
+class NGramModel:
+    ## Constructor
+    # order -> Longest context of words to learn. Sequences of up to 'order'+1 words are stored. 1 is the same as the brain's neighbours
+    def __init__(self,order):
+        # Set the order
+        self.order = order
+
+        # Prep the trie
+        self.root = {}
+
+    ## Functional Methods
+    # Adds occurances of a word sequence, creating any nodes along the way
+    # words -> Tuple of the words in the sequence
+    # count -> Number of occurances to add
+    def addNGram(self,words,count = 1):
+        # Walk to the node of the context
+        children = self.root
+        for word in words[:-1]:
+            # Make sure the node exists and can hold followers. New words are interned so each is only held in memory once
+            node = children.get(word)
+            if node == None:
+                node = [0,{}]
+                children[sys.intern(word)] = node
+            elif isinstance(node,int):
+                node = [node,{}]
+                children[word] = node
+
+            # Step in
+            children = node[1]
+
+        # Add to the following word's count
+        word = words[-1]
+        node = children.get(word)
+        if node == None:
+            children[sys.intern(word)] = count
+        elif isinstance(node,int):
+            children[word] = node+count
+        else:
+            node[0] += count
+
+    # Gets the words that have followed a context
+    # Returns a list of (Word, Occurances) tuples. Empty if the context has not been seen
+    # context -> Tuple of the words leading up to the word to follow
+    def getFollowing(self,context):
+        # Walk to the node of the context
+        children = self.root
+        for word in context:
+            # Check if the context continues
+            node = children.get(word)
+            if node == None or isinstance(node,int):
+                return []
+
+            # Step in
+            children = node[1]
+
+        # Send the followers and their counts
+        return [(word, (node if isinstance(node,int) else node[0])) for word, node in children.items()]
+
+    # Removes rarely seen sequences and any sequence that has a word that is no longer known
+    # minOccurances -> Sequences seen fewer times than this are removed along with every longer sequence they start
+    # isKnown -> Function that checks if a word is still known
+    def prune(self,minOccurances,isKnown):
+        self.pruneChildren(self.root,minOccurances,isKnown,True)
+
+    # Prunes the followers of one node, and everything below them, for 'prune()'
+    # Returns True if any followers are left
+    # children -> The node's Dict of Following Word : Node
+    # isRoot -> If the followers are the root's, which are single words that are not counted on their own
+    def pruneChildren(self,children,minOccurances,isKnown,isRoot):
+        # Check each follower
+        for word in list(children):
+            # Get the count
+            node = children[word]
+            count = node if isinstance(node,int) else node[0]
+
+            # Check if it should be removed
+            if not isKnown(word) or (not isRoot and count < minOccurances):
+                del children[word]
+            elif not isinstance(node,int) and not self.pruneChildren(node[1],minOccurances,isKnown,False):
+                # Nothing follows it anymore
+                if isRoot:
+                    del children[word]
+                else:
+                    children[word] = count
+
+        # Return if any are left
+        return len(children) > 0
+
+    # Counts the nodes in the trie
+    def getNodeCount(self):
+        # Walk every level
+        count = 0
+        level = [self.root]
+        while len(level) > 0:
+            # Count the level and collect the next one
+            nextLevel = []
+            for children in level:
+                count += len(children)
+                nextLevel.extend([node[1] for node in children.values() if not isinstance(node,int)])
+            level = nextLevel
+
+        # Return the count
+        return count
+
+    # Loads the trie from the stored format
+    # Words are interned the same way 'addNGram()' does
+    # stored -> Dict in the format made by 'toStored()'
+    def loadStored(self,stored):
+        # Rebuild the trie level by level
+        self.root = {}
+        level = [(stored["trie"],self.root)]
+        while len(level) > 0:
+            # Copy each node of the level
+            nextLevel = []
+            for storedChildren, children in level:
+                for word, storedNode in storedChildren.items():
+                    # Check if the node has followers
+                    word = sys.intern(word)
+                    if isinstance(storedNode,int):
+                        children[word] = storedNode
+                    else:
+                        children[word] = [storedNode[0],{}]
+                        nextLevel.append((storedNode[1],children[word][1]))
+            level = nextLevel
+
+    # Converts the trie to the stored format
+    # Returns a dict of the model's order and its trie
+    def toStored(self):
+        return {"order": self.order, "trie": self.root}
@@ -0,0 +1,562 @@
+# MERCER SQLite Brain Storage
+# Stores the words Mercer has learned in an SQLite database so the brain does not need to fit in memory.
+
+# Imports
+import sqlite3
+from collections import OrderedDict, Counter
+from mercerBrain import LEADING, TRAILING, SIDES, SIDE_INDEXES, FenwickTree
+
+# Constants
+EDGE_BATCH_SIZE = 50000 # Number of pending neighbour or sentence start changes to collect before they are written in one batch
+NEIGHBOUR_CACHE_SIZE = 4096 # Number of word sides whose neighbours are kept in memory
+WORD_CACHE_SIZE = 65536 # Number of word IDs that are kept in memory
+SCHEMA = [ # Statements that create the brain's tables
+    "CREATE TABLE IF NOT EXISTS words (id INTEGER PRIMARY KEY, word TEXT NOT NULL UNIQUE, type TEXT NOT NULL, starts INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS edges (word INTEGER NOT NULL, side INTEGER NOT NULL, neighbour INTEGER NOT NULL, occurances INTEGER NOT NULL, PRIMARY KEY (word, side, neighbour)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS typeCounts (type TEXT PRIMARY KEY, words INTEGER NOT NULL)"
+]
+STATISTICS = ["wordCount", "edgeCount", "tokenCount"] # Statistics kept in the 'meta' table, named after the attributes that hold them
+WORD_OCCURANCES_QUERY = "SELECT words.id AS id, words.starts + COALESCE(SUM(edges.occurances), 0) AS total FROM words LEFT JOIN edges ON edges.word = words.id AND edges.side = ? GROUP BY words.id" # Counts how often each word has been seen, from its leading neighbour occurances and sentence starts
+
+# The LRU Cache class structure
+# A dict that only keeps its most recently used entries
+class LRUCache:
+    ## Constructor
+    # maxSize -> Max number of entries to keep
+    def __init__(self,maxSize):
+        # Set the size
+        self.maxSize = maxSize
+
+        # Prep the entries
+        self.entries = OrderedDict()
+
+    ## Functional Methods
+    # Gets an entry, marking it as recently used
+    # Returns the default if the key is not present
+    def get(self,key,default = None):
+        # Check if present
+        if key not in self.entries:
+            return default
+
+        # Mark as used and return
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    # Sets an entry, dropping the least recently used entry if full
+    def __setitem__(self,key,value):
+        # Set the entry
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+        # Drop the oldest if full
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last = False)
+
+    # Removes an entry and returns it, or the default if not present
+    def pop(self,key,default = None):
+        return self.entries.pop(key,default)
+
+    # Removes every entry
+    def clear(self):
+        self.entries.clear()
+
+# The SQLite Brain class structure
+# Provides the same methods as 'MemoryBrain'. Words are stored with integer IDs in the 'words' table
+# and neighbours in the 'edges' table, keyed by (word, side, neighbour). New words, neighbour changes, and sentence start
+# changes are collected and written in batches. Reads of a word's neighbours go through a small LRU cache.
+# The statistics are kept in the 'meta' and 'typeCounts' tables so opening the brain does not scan the others.
+class SQLiteBrain:
+    ## Constructor
+    # file -> Path to the SQLite database file. It is created if it does not exist
+    # defaultType -> Type to give newly learned words
+    def __init__(self,file,defaultType):
+        # Set the default type and file
+        self.defaultType = defaultType
+        self.file = file
+
+        # Connect to the database
+        self.connection = sqlite3.connect(file)
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+        # Remove the table older brains kept one row per sentence start in. The starts are counted per word in 'words'
+        self.connection.execute("DROP TABLE IF EXISTS startSeeds")
+        self.connection.commit()
+
+        # Prep the sentence start totals used to pick starts. None until first needed
+        self.startTree = None
+
+        # Get the table size and statistics, which are then kept up to date as the brain changes
+        self.readStatistics()
+
+        # Prep the caches. Formats: [Word : ID] and [(ID, Side) : List of (Neighbour Word, Occurances)]
+        self.wordIds = LRUCache(WORD_CACHE_SIZE)
+        self.neighbours = LRUCache(NEIGHBOUR_CACHE_SIZE)
+
+        # Prep the pending changes. Formats: [Word : [ID, Type]], [(ID, Side Index, Neighbour ID) : Occurances], and [ID : Starts]
+        self.pendingWords = {}
+        self.pendingEdges = {}
+        self.pendingStarts = {}
+
+        # Prep the number of pairs first seen since 'takeNewEdgeCount()' was last called. Pairs are found to be new when their batch is written
+        self.newEdgeCount = 0
+
+    ## Container Methods
+    # Checks if the word is known
+    def __contains__(self,word):
+        return self.getId(word) != None
+
+    # Gets the number of known words
+    def __len__(self):
+        return self.wordCount
+
+    # Loops through the known words in the order they were learned
+    def __iter__(self):
+        self.writePending()
+        return (row[0] for row in self.connection.execute("SELECT word FROM words ORDER BY id"))
+
+    ## Functional Methods
+    # Reads the table size and statistics saved in the 'meta' and 'typeCounts' tables
+    # Brains saved before the statistics were kept are counted once from the tables, then saved
+    def readStatistics(self):
+        # Read the saved statistics
+        saved = dict(self.connection.execute("SELECT name, value FROM meta").fetchall())
+
+        # Check if they were all saved
+        if all([name in saved for name in STATISTICS]):
+            # Use them
+            self.wordCount = saved["wordCount"]
+            self.edgeCount = saved["edgeCount"]
+            self.tokenCount = saved["tokenCount"]
+            self.typeCounts = Counter(dict(self.connection.execute("SELECT type, words FROM typeCounts").fetchall()))
+        else:
+            # Count and save them
+            self.countStatistics()
+            self.writeStatistics()
+            self.connection.commit()
+
+    # Counts the table size, pairs, words of each type, and words learned in total from the tables
+    def countStatistics(self):
+        self.wordCount = self.connection.execute("SELECT COUNT(*) FROM words").fetchone()[0]
+        self.edgeCount = self.connection.execute("SELECT COUNT(*) FROM edges WHERE side = ?",(SIDE_INDEXES[TRAILING],)).fetchone()[0]
+        self.typeCounts = Counter(dict(self.connection.execute("SELECT type, COUNT(*) FROM words GROUP BY type").fetchall()))
+        self.tokenCount = self.connection.execute("SELECT (SELECT COALESCE(SUM(starts), 0) FROM words) + (SELECT COALESCE(SUM(occurances), 0) FROM edges WHERE side = ?)",(SIDE_INDEXES[LEADING],)).fetchone()[0]
+
+    # Gets the word with the specified ID
+    def getWord(self,wordId):
+        self.writePending()
+        return self.connection.execute("SELECT word FROM words WHERE id = ?",(wordId,)).fetchone()[0]
+
+    # Gets the ID of the word, or None if the word is not known
+    def getId(self,word):
+        # Check the cache
+        wordId = self.wordIds.get(word)
+        if wordId != None:
+            return wordId
+
+        # Check the words waiting to be written
+        pending = self.pendingWords.get(word)
+        if pending != None:
+            return pending[0]
+
+        # Look it up
+        row = self.connection.execute("SELECT id FROM words WHERE word = ?",(word,)).fetchone()
+        if row == None:
+            return None
+
+        # Cache and return it
+        self.wordIds[word] = row[0]
+        return row[0]
+
+    # Adds the word if it is not known yet
+    # Returns the ID of the word
+    def addWord(self,word):
+        # Check if already known
+        wordId = self.getId(word)
+        if wordId != None:
+            return wordId
+
+        # Add the word with the next ID to the pending changes
+        wordId = self.wordCount
+        self.pendingWords[word] = [wordId,self.defaultType]
+        self.wordCount += 1
+        self.typeCounts[self.defaultType] += 1
+        if self.startTree != None:
+            self.startTree.append()
+
+        # Write the batch if full
+        if len(self.pendingWords) >= EDGE_BATCH_SIZE:
+            self.commit()
+
+        # Return it
+        return wordId
+
+    # Adds occurances of a neighbour to one side of a word. Both words must already be known
+    # The change is written with the next batch, which is when a new pair is counted
+    # wordId -> ID of the word to add to
+    # neighbourId -> ID of the neighbouring word
+    # side -> LEADING or TRAILING
+    # count -> Number of occurances to add
+    def addNeighbourById(self,wordId,neighbourId,side,count = 1):
+        # Add to the pending changes
+        key = (wordId,SIDE_INDEXES[side],neighbourId)
+        self.pendingEdges[key] = self.pendingEdges.get(key,0)+count
+
+        # Count each occurance once, as the word being led
+        if side == LEADING:
+            self.tokenCount += count
+
+        # Drop the cached neighbours
+        self.neighbours.pop((wordId,side))
+
+        # Write the batch if full
+        if len(self.pendingEdges) >= EDGE_BATCH_SIZE:
+            self.commit()
+
+    # Adds occurances of a neighbour to one side of a word, adding either word if they are not known yet
+    def addNeighbour(self,word,neighbour,side,count = 1):
+        self.addNeighbourById(self.addWord(word),self.addWord(neighbour),side,count)
+
+    # Adds occurances of a leading word directly followed by a trailing word to both words, adding either word if they are not known yet
+    def addPair(self,leadingWord,trailingWord,count = 1):
+        # Get the IDs
+        leadingId = self.addWord(leadingWord)
+        trailingId = self.addWord(trailingWord)
+
+        # Add to both sides
+        self.addNeighbourById(leadingId,trailingId,TRAILING,count)
+        self.addNeighbourById(trailingId,leadingId,LEADING,count)
+
+    # Writes the pending changes in one batch and commits
+    def commit(self):
+        # Insert the pending words
+        if len(self.pendingWords) > 0:
+            self.connection.executemany("INSERT INTO words (id, word, type) VALUES (?, ?, ?)",[(wordId, word, wordType) for word, (wordId, wordType) in self.pendingWords.items()])
+            self.pendingWords = {}
+
+        # Write the pending neighbour changes
+        if len(self.pendingEdges) > 0:
+            # Add to the neighbours already written
+            self.connection.executemany(
+                "UPDATE edges SET occurances = occurances + ? WHERE word = ? AND side = ? AND neighbour = ?",
+                [(count, wordId, sideIndex, neighbourId) for (wordId, sideIndex, neighbourId), count in self.pendingEdges.items()]
+            )
+
+            # Insert the rest, one side at a time. The trailing rows inserted are the new pairs
+            for side in [TRAILING, LEADING]:
+                changes = self.connection.total_changes
+                self.connection.executemany(
+                    "INSERT INTO edges (word, side, neighbour, occurances) VALUES (?, ?, ?, ?) ON CONFLICT (word, side, neighbour) DO NOTHING",
+                    [(wordId, sideIndex, neighbourId, count) for (wordId, sideIndex, neighbourId), count in self.pendingEdges.items() if sideIndex == SIDE_INDEXES[side]]
+                )
+                if side == TRAILING:
+                    self.edgeCount += self.connection.total_changes-changes
+                    self.newEdgeCount += self.connection.total_changes-changes
+            self.pendingEdges = {}
+
+        # Add the pending sentence starts
+        if len(self.pendingStarts) > 0:
+            self.connection.executemany("UPDATE words SET starts = starts + ? WHERE id = ?",[(count, wordId) for wordId, count in self.pendingStarts.items()])
+            self.pendingStarts = {}
+
+        # Save the statistics with the changes they count
+        self.writeStatistics()
+
+        # Commit
+        self.connection.commit()
+
+    # Writes the table size and statistics to the 'meta' and 'typeCounts' tables. They are committed with the changes they count
+    def writeStatistics(self):
+        self.connection.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",[(name, getattr(self,name)) for name in STATISTICS])
+        self.connection.execute("DELETE FROM typeCounts")
+        self.connection.executemany("INSERT INTO typeCounts (type, words) VALUES (?, ?)",[(wordType, count) for wordType, count in self.typeCounts.items() if count > 0])
+
+    # Writes any pending changes so they can be read
+    def writePending(self):
+        if len(self.pendingWords) > 0 or len(self.pendingEdges) > 0 or len(self.pendingStarts) > 0:
+            self.commit()
+
+    # Gets the neighbours on one side of a known word
+    # Returns a list of (Neighbour Word, Occurances) tuples
+    def getNeighbours(self,word,side):
+        # Make sure pending changes can be read
+        self.writePending()
+
+        # Check the cache
+        wordId = self.getId(word)
+        neighbours = self.neighbours.get((wordId,side))
+        if neighbours != None:
+            return neighbours
+
+        # Read them
+        neighbours = self.connection.execute(
+            "SELECT words.word, edges.occurances FROM edges JOIN words ON words.id = edges.neighbour WHERE edges.word = ? AND edges.side = ? ORDER BY edges.neighbour",
+            (wordId,SIDE_INDEXES[side])
+        ).fetchall()
+
+        # Cache and return them
+        self.neighbours[(wordId,side)] = neighbours
+        return neighbours
+
+    # Gets the type of a known word
+    def getType(self,word):
+        # Check the words waiting to be written
+        pending = self.pendingWords.get(word)
+        if pending != None:
+            return pending[1]
+
+        # Read the type
+        return self.connection.execute("SELECT type FROM words WHERE word = ?",(word,)).fetchone()[0]
+
+    # Sets the type of a known word
+    def setType(self,word,wordType):
+        # Move the word's count to the new type
+        self.typeCounts[self.getType(word)] -= 1
+        self.typeCounts[wordType] += 1
+
+        # Set the type, in the pending changes if the word is waiting to be written
+        pending = self.pendingWords.get(word)
+        if pending != None:
+            pending[1] = wordType
+        else:
+            self.connection.execute("UPDATE words SET type = ? WHERE word = ?",(wordType,word))
+
+    # Gets the number of times a known word has started a sentence
+    def getStarts(self,word):
+        # Make sure pending changes can be read
+        self.writePending()
+
+        # Read the starts
+        return self.connection.execute("SELECT starts FROM words WHERE word = ?",(word,)).fetchone()[0]
+
+    # Adds to the number of times a known word has started a sentence
+    def addStart(self,word,count = 1):
+        # Add to the pending changes
+        wordId = self.getId(word)
+        self.pendingStarts[wordId] = self.pendingStarts.get(wordId,0)+count
+        if self.startTree != None:
+            self.startTree.add(wordId,count)
+
+        # Count each start as an occurance
+        self.tokenCount += count
+
+        # Write the batch if full
+        if len(self.pendingStarts) >= EDGE_BATCH_SIZE:
+            self.commit()
+
+    # Gets the types of all known words in the order they were learned
+    def getTypes(self):
+        self.writePending()
+        return (row[0] for row in self.connection.execute("SELECT type FROM words ORDER BY id"))
+
+    # Picks a random known word
+    # Returns None if no words are known
+    # randomizer -> The 'random' module or a 'random.Random' instance to pick with
+    def chooseWord(self,randomizer):
+        # Check if empty
+        if self.wordCount == 0:
+            return None
+
+        # Pick from every known word
+        return self.getWord(randomizer.randrange(self.wordCount))
+
+    # Picks a random word weighted by the times each word has started a sentence
+    # Returns None if no sentences have been learned
+    # randomizer -> The 'random' module or a 'random.Random' instance to pick with
+    def chooseStart(self,randomizer):
+        # Total the start counts the first time they are needed
+        if self.startTree == None:
+            self.writePending()
+            self.startTree = FenwickTree(row[0] for row in self.connection.execute("SELECT starts FROM words ORDER BY id"))
+
+        # Check if empty
+        if self.startTree.total == 0:
+            return None
+
+        # Pick the word a random running total of starts falls in
+        return self.getWord(self.startTree.find(randomizer.randrange(self.startTree.total)))
+
+    # Gets the number of leading and trailing word pairs
+    def getEdgeCount(self):
+        # Make sure pending pairs are counted
+        self.writePending()
+
+        # Return the count
+        return self.edgeCount
+
+    # Gets the number of pairs first seen since the last call, and resets it. Pairs still pending are counted once their batch is written
+    def takeNewEdgeCount(self):
+        newEdgeCount = self.newEdgeCount
+        self.newEdgeCount = 0
+        return newEdgeCount
+
+    # Gets the number of known words of each type
+    # Returns a Counter of [Type : Number of Words]
+    def getTypeCounts(self):
+        return self.typeCounts
+
+    # Gets the number of words learned in total, counting each time a word followed another or started a sentence
+    def getTokenCount(self):
+        return self.tokenCount
+
+    # Gets the most often seen words, counting each leading neighbour occurance and each sentence start. Words seen equally often are in the order they were learned
+    # Returns a list of (Word, Occurances) tuples from most to least seen
+    # count -> Max number of words to get
+    def getMostFrequentWords(self,count):
+        # Make sure pending changes are counted
+        self.writePending()
+
+        # Let SQLite keep the top words as it counts
+        return self.connection.execute(
+            "SELECT words.word, totals.total FROM ("+WORD_OCCURANCES_QUERY+") AS totals JOIN words ON words.id = totals.id ORDER BY totals.total DESC, totals.id LIMIT ?",
+            (SIDE_INDEXES[LEADING],count)
+        ).fetchall()
+
+    # Gets the most common neighbours on one side of a known word. Neighbours seen equally often are in the order their words were learned
+    # Returns a list of (Neighbour Word, Occurances) tuples from most to least common
+    # count -> Max number of neighbours to get
+    def getMostCommonNeighbours(self,word,side,count):
+        # Make sure pending changes can be read
+        self.writePending()
+
+        # Read the top neighbours
+        return self.connection.execute(
+            "SELECT words.word, edges.occurances FROM edges JOIN words ON words.id = edges.neighbour WHERE edges.word = ? AND edges.side = ? ORDER BY edges.occurances DESC, edges.neighbour LIMIT ?",
+            (self.getId(word),SIDE_INDEXES[side],count)
+        ).fetchall()
+
+    # Gets how many word pairs have been seen each number of times
+    # Returns a Counter of [Occurances : Number of Pairs]
+    def getEdgeHistogram(self):
+        # Make sure pending changes are counted
+        self.writePending()
+
+        # Count the trailing side of every pair
+        return Counter(dict(self.connection.execute("SELECT occurances, COUNT(*) FROM edges WHERE side = ? GROUP BY occurances",(SIDE_INDEXES[TRAILING],)).fetchall()))
+
+    # Gets how many words have been seen each number of times, counting each leading neighbour occurance and each sentence start
+    # Returns a Counter of [Occurances : Number of Words]
+    def getWordHistogram(self):
+        # Make sure pending changes are counted
+        self.writePending()
+
+        # Count each word's occurances, then the words with each count
+        return Counter(dict(self.connection.execute(
+            "SELECT total, COUNT(*) FROM ("+WORD_OCCURANCES_QUERY+") GROUP BY total",
+            (SIDE_INDEXES[LEADING],)
+        ).fetchall()))
+
+    # Removes rarely seen word pairs and words
+    # The remaining words are renumbered in the order they were learned so IDs stay contiguous. The tables are rebuilt under their old names
+    # Returns a tuple of (Words Removed, Pairs Removed)
+    # minOccurances -> Pairs seen fewer times than this are removed from both of their words
+    # minWordOccurances -> Words seen fewer times than this, counting each leading neighbour occurance and each sentence start, are removed along with all of their pairs
+    def prune(self,minOccurances,minWordOccurances):
+        # Make sure pending changes are included
+        self.writePending()
+
+        # Get the sizes before
+        edgeCount = self.edgeCount
+        wordCount = self.wordCount
+
+        # Number the words to keep in order
+        self.connection.execute("CREATE TEMP TABLE pruneIds (old INTEGER PRIMARY KEY, new INTEGER NOT NULL)")
+        keptIds = self.connection.execute("SELECT id FROM ("+WORD_OCCURANCES_QUERY+") WHERE total >= ? ORDER BY id",(SIDE_INDEXES[LEADING],minWordOccurances)).fetchall()
+        self.connection.executemany("INSERT INTO pruneIds (old, new) VALUES (?, ?)",[(row[0], newId) for newId, row in enumerate(keptIds)])
+
+        # Set aside the old tables and create new ones
+        for table in ["words", "edges"]:
+            self.connection.execute("ALTER TABLE "+table+" RENAME TO pruned"+table[0].upper()+table[1:])
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+        # Copy the kept words and the pairs between them, renumbered
+        self.connection.execute("INSERT INTO words (id, word, type, starts) SELECT pruneIds.new, prunedWords.word, prunedWords.type, prunedWords.starts FROM prunedWords JOIN pruneIds ON pruneIds.old = prunedWords.id")
+        self.connection.execute(
+            "INSERT INTO edges (word, side, neighbour, occurances) SELECT wordIds.new, prunedEdges.side, neighbourIds.new, prunedEdges.occurances FROM prunedEdges JOIN pruneIds AS wordIds ON wordIds.old = prunedEdges.word JOIN pruneIds AS neighbourIds ON neighbourIds.old = prunedEdges.neighbour WHERE prunedEdges.occurances >= ?",
+            (minOccurances,)
+        )
+
+        # Remove the old tables
+        for table in ["prunedWords", "prunedEdges", "pruneIds"]:
+            self.connection.execute("DROP TABLE "+table)
+
+        # Recount the sizes and statistics, then write everything
+        self.countStatistics()
+        self.writeStatistics()
+        self.connection.commit()
+
+        # Reset the caches
+        self.startTree = None
+        self.wordIds.clear()
+        self.neighbours.clear()
+
+        # Return what was removed
+        return (wordCount-self.wordCount,edgeCount-self.edgeCount)
+
+    # Closes the database
+    # save -> If the pending changes should be written. If not, they and any other uncommitted changes are rolled back. Batches already written stay
+    def close(self,save = True):
+        # Check if saving
+        if save:
+            # Write and commit the pending changes
+            self.commit()
+        else:
+            # Drop the pending changes and roll back the rest
+            self.pendingWords = {}
+            self.pendingEdges = {}
+            self.pendingStarts = {}
+            self.connection.rollback()
+
+        # Close the connection
+        self.connection.close()
+
+    ## Conversion Methods
+    # Adds the contents of a stored dictionary, as used by the dictionary file, to the brain
+    # storedDictionary -> Dict of [Word : {"type", "leading", "trailing", Optional "starts"}] where each side is a list of {"word", "occurances"} parts
+    def loadStored(self,storedDictionary):
+        # Add all words first so IDs follow the stored order
+        for word in storedDictionary:
+            self.addWord(word)
+
+        # Loop through stored words
+        for word in storedDictionary:
+            # Set the type and start count
+            wordData = storedDictionary[word]
+            self.setType(word,wordData["type"])
+            if wordData.get("starts",0) > 0:
+                self.addStart(word,wordData["starts"])
+
+            # Fill both neighbour sides
+            for side in SIDES:
+                for part in wordData[side]:
+                    self.addNeighbour(word,part["word"],side,part["occurances"])
+
+        # Write everything
+        self.commit()
+
+    # Converts the brain to the stored dictionary format used by the dictionary file
+    def toStored(self):
+        # Make sure pending changes can be read
+        self.writePending()
+
+        # Prep the stored dictionary
+        storedDictionary = {}
+
+        # Loop through known words
+        for word, wordType, starts in self.connection.execute("SELECT word, type, starts FROM words ORDER BY id").fetchall():
+            # Build the stored word entry
+            wordData = {"type": wordType}
+            for side in SIDES:
+                wordData[side] = [{"word": neighbour, "occurances": count} for neighbour, count in self.getNeighbours(word,side)]
+
+            # Only store sentence start counts when present to match older dictionary files
+            if starts > 0:
+                wordData["starts"] = starts
+
+            # Add the entry
+            storedDictionary[word] = wordData
+
+        # Return the stored dictionary
+        return storedDictionary
@@ -0,0 +1,298 @@
+# MERCER Generation Server
+# Serves generated text over HTTP from one brain that stays loaded. Built on asyncio with only the standard library.
+# Run with: python mercerServer.py [--port Port] [--brain-file File] [--brain-format Format] [--workers Workers]
+# Endpoints (GET, JSON responses):
+#   /sentence?maxLength=7&seed=Seed -> {"sentence": Sentence}
+#   /text?lines=10&maxLength=7&seed=Seed -> {"lines": List of Sentences}
+#   /stats -> {"dictionary": Dictionary Statistics, "metrics": Metrics of the worker that answered}
+#   /health -> {"status": "ok"}
+
+# Imports
+import os
+import json
+import random
+import asyncio
+import argparse
+import multiprocessing
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import mercer
+
+# Constants
+SERVER_HOST = "127.0.0.1" # Address the server listens on
+SERVER_PORT = 8035 # Port the server listens on
+SERVER_WORKERS = os.cpu_count() or 1 # Number of worker processes generating text
+SERVER_MAX_PENDING = 256 # Max requests being generated or waiting for a worker at once. Requests past this are turned away with 503
+REQUEST_TIMEOUT = 10 # Seconds a request can wait for its text before it is answered with 504
+KEEP_ALIVE_TIMEOUT = 15 # Seconds an idle connection is kept open for its next request
+MAX_HEADER_LINES = 100 # Max number of header lines in a request
+MAX_BODY_BYTES = 65536 # Max request body that is read and ignored
+MAX_TEXT_LINES = 1000 # Max lines that can be asked for in one '/text' request
+MAX_SENTENCE_LENGTH = 100 # Max words that can be asked for in one sentence
+DEFAULT_SENTENCE_LENGTH = 7 # Words in a sentence when the request does not say
+STATUS_REASONS = { # Reason phrases of the statuses the server sends. Format: [Status : Reason]
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout"
+}
+
+# Globals
+serverMercer = None # The MERCER requests are served from. Shared with forked worker processes
+
+# Worker Functions
+# These run in a worker process or the worker thread and use 'serverMercer'
+
+# Starts Mercer in the worker thread. Used when the brain can not be shared with forked processes
+# options -> Tuple of the arguments to construct MERCER with
+def startServerMercer(options):
+    global serverMercer
+    serverMercer = mercer.MERCER(*options)
+
+# Stops Mercer in the worker thread without saving, since serving does not change the brain
+def stopServerMercer():
+    serverMercer.exitMercer(False)
+
+# Writes a sentence
+# maxLength -> Max number of words in the sentence
+# seed -> Optional seed that makes the sentence the same every time
+def createSentenceJob(maxLength,seed):
+    # Check if seeded
+    randomizer = random
+    if seed != None:
+        randomizer = random.Random(seed)
+
+    # Write the sentence
+    return {"sentence": serverMercer.createSentence(maxLength,randomizer)}
+
+# Writes lines of text
+# lines -> Number of lines
+# maxLength -> Max number of words in each line
+# seed -> Optional seed that makes the lines the same every time
+def writeTextJob(lines,maxLength,seed):
+    return {"lines": [sentence for sentence in serverMercer.chooseGenerator(lines,maxLength,seed,1)]}
+
+# Gets the dictionary statistics and metrics
+def getStatsJob():
+    return {"dictionary": serverMercer.getDictionaryStats(False), "metrics": serverMercer.getMetrics(False)}
+
+# The Mercer Server class structure
+class MercerServer:
+    ## Constructor
+    # Loads the brain once. If processes can be forked and the brain is not SQLite, worker processes are forked that share the loaded brain.
+    # Otherwise one worker thread owns the brain, since an SQLite connection can only be used by the thread that made it
+    # debug -> If debug mode should start enabled
+    # brainFormat -> BRAIN_FORMAT_JSON, BRAIN_FORMAT_BINARY, or BRAIN_FORMAT_SQLITE
+    # brainFile -> Path to the brain file. Defaults to the dictionary file for the brain format
+    # order -> N-gram order to generate with
+    # workers -> Number of worker processes
+    # timeout -> Seconds a request can wait for its text
+    # maxPending -> Max requests being generated or waiting for a worker at once
+    def __init__(self, debug = False, brainFormat = mercer.BRAIN_FORMAT_JSON, brainFile = None, order = mercer.NGRAM_ORDER, workers = SERVER_WORKERS, timeout = REQUEST_TIMEOUT, maxPending = SERVER_MAX_PENDING):
+        # Indicate global
+        global serverMercer
+
+        # Set the options
+        self.timeout = timeout
+        self.maxPending = maxPending
+        self.pending = 0
+
+        # Check how to run the workers
+        options = (debug,brainFormat,brainFile,False,order)
+        self.usesProcesses = brainFormat != mercer.BRAIN_FORMAT_SQLITE and "fork" in multiprocessing.get_all_start_methods()
+        if self.usesProcesses:
+            # Load the brain here to be shared by the forked workers
+            serverMercer = mercer.MERCER(*options)
+            self.executor = ProcessPoolExecutor(max(1,workers),multiprocessing.get_context("fork"),mercer.startForkedWorker)
+        else:
+            # Load the brain in the worker thread
+            self.executor = ThreadPoolExecutor(1)
+            self.executor.submit(startServerMercer,options).result()
+
+    ## Functional Methods
+    # Runs a job on the workers, waiting no longer than the timeout
+    # A request that times out does not stop its job, so the job keeps its slot in the limit until it finishes
+    # Returns a tuple of (Status, Response Dict)
+    # job -> The worker function to run
+    # args -> Arguments to run the job with
+    async def runJob(self,job,*args):
+        # Turn away requests past the limit
+        if self.pending >= self.maxPending:
+            return (503,{"error": "Too many requests are waiting."})
+
+        # Start the job, holding a slot until it finishes
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.executor,job,*args)
+        except Exception as err:
+            return (500,{"error": str(err)})
+        self.pending += 1
+        future.add_done_callback(self.finishJob)
+
+        # Wait for the job without cancelling it on a timeout
+        try:
+            return (200,await asyncio.wait_for(asyncio.shield(future),self.timeout))
+        except asyncio.TimeoutError as err:
+            return (504,{"error": "The request timed out."})
+        except Exception as err:
+            return (500,{"error": str(err)})
+
+    # Frees the slot of a finished job
+    # future -> The job's future
+    def finishJob(self,future):
+        # Free the slot
+        self.pending -= 1
+
+        # Mark any failure as seen, since a request that timed out no longer waits for it
+        if not future.cancelled():
+            future.exception()
+
+    # Answers a request
+    # Returns a tuple of (Status, Response Dict)
+    # method -> The request's method
+    # target -> The request's path and query
+    async def route(self,method,target):
+        # Check the method
+        if method != "GET":
+            return (405,{"error": "Only GET is supported."})
+
+        # Split the target
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+
+        # Read the common parameters
+        try:
+            maxLength = int(query.get("maxLength",[DEFAULT_SENTENCE_LENGTH])[0])
+            lines = int(query.get("lines",[1])[0])
+        except ValueError as err:
+            return (400,{"error": "'maxLength' and 'lines' must be whole numbers."})
+        seed = query.get("seed",[None])[0]
+
+        # Check the bounds
+        if maxLength < 1 or maxLength > MAX_SENTENCE_LENGTH or lines < 1 or lines > MAX_TEXT_LINES:
+            return (400,{"error": "'maxLength' must be 1 to "+str(MAX_SENTENCE_LENGTH)+" and 'lines' must be 1 to "+str(MAX_TEXT_LINES)+"."})
+
+        # Because Python Switch statements don't exist
+        if url.path == "/sentence":
+            return await self.runJob(createSentenceJob,maxLength,seed)
+        elif url.path == "/text":
+            return await self.runJob(writeTextJob,lines,max(maxLength,mercer.MIN_WORDS_IN_SENTENCE),seed)
+        elif url.path == "/stats":
+            return await self.runJob(getStatsJob)
+        elif url.path == "/health":
+            return (200,{"status": "ok"})
+        else:
+            return (404,{"error": "'"+url.path+"' does not exist."})
+
+    # Serves the requests of one connection, keeping it open between requests
+    # reader -> The connection's asyncio.StreamReader
+    # writer -> The connection's asyncio.StreamWriter
+    async def handleConnection(self,reader,writer):
+        try:
+            while True:
+                # Read the request line
+                try:
+                    requestLine = await asyncio.wait_for(reader.readline(),KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError as err:
+                    break
+                if requestLine == b"":
+                    break
+                parts = requestLine.decode("latin-1").split()
+
+                # Read the headers
+                headers = {}
+                for lineNumber in range(0,MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n",b"\n",b""):
+                        break
+                    name, separator, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                # Skip any body
+                bodyBytes = int(headers.get("content-length","0") or 0)
+                if bodyBytes > 0:
+                    await reader.readexactly(min(bodyBytes,MAX_BODY_BYTES))
+
+                # Answer the request
+                if len(parts) != 3:
+                    status, response = (400,{"error": "Malformed request line."})
+                else:
+                    status, response = await self.route(parts[0],parts[1])
+
+                # Check if the connection should stay open
+                keepAlive = len(parts) == 3 and parts[2] == "HTTP/1.1" and headers.get("connection","").lower() != "close" and bodyBytes <= MAX_BODY_BYTES
+
+                # Send the response
+                body = json.dumps(response).encode("utf-8")
+                writer.write((
+                    "HTTP/1.1 "+str(status)+" "+STATUS_REASONS[status]+"\r\n"+
+                    "Content-Type: application/json\r\n"+
+                    "Content-Length: "+str(len(body))+"\r\n"+
+                    "Connection: "+("keep-alive" if keepAlive else "close")+"\r\n\r\n"
+                ).encode("latin-1")+body)
+                await writer.drain()
+
+                # Check if done
+                if not keepAlive:
+                    break
+        except (ConnectionError,asyncio.IncompleteReadError,ValueError) as err:
+            # The client left or sent nonsense
+            pass
+        finally:
+            # Close the connection
+            writer.close()
+
+    # Serves requests until cancelled
+    # host -> Address to listen on
+    # port -> Port to listen on
+    async def serve(self,host = SERVER_HOST,port = SERVER_PORT):
+        # Start listening
+        server = await asyncio.start_server(self.handleConnection,host,port)
+
+        # Log
+        print("Mercer is serving on http://"+host+":"+str(server.sockets[0].getsockname()[1])+"/.")
+
+        # Serve
+        async with server:
+            await server.serve_forever()
+
+    # Stops the workers and Mercer
+    def close(self):
+        # Check how the workers were run
+        if self.usesProcesses:
+            self.executor.shutdown()
+            serverMercer.exitMercer(False)
+        else:
+            self.executor.submit(stopServerMercer).result()
+            self.executor.shutdown()
+
+# Runs the server from the command line
+def main():
+    # Read the arguments
+    parser = argparse.ArgumentParser(description = "Serve text generated by Mercer over HTTP.")
+    parser.add_argument("--host",default = SERVER_HOST,help = "Address to listen on")
+    parser.add_argument("--port",type = int,default = SERVER_PORT,help = "Port to listen on")
+    parser.add_argument("--brain-file",default = None,help = "Path to the brain file. Defaults to the dictionary file for the brain format")
+    parser.add_argument("--brain-format",default = mercer.BRAIN_FORMAT_JSON,choices = [mercer.BRAIN_FORMAT_JSON,mercer.BRAIN_FORMAT_BINARY,mercer.BRAIN_FORMAT_SQLITE],help = "Format the brain is saved in")
+    parser.add_argument("--order",type = int,default = mercer.NGRAM_ORDER,help = "Number of previous words generation is conditioned on")
+    parser.add_argument("--workers",type = int,default = SERVER_WORKERS,help = "Number of worker processes")
+    parser.add_argument("--timeout",type = float,default = REQUEST_TIMEOUT,help = "Seconds a request can wait for its text")
+    parser.add_argument("--debug",action = "store_true",help = "Start in Debug Mode")
+    arguments = parser.parse_args()
+
+    # Start the server
+    server = MercerServer(arguments.debug,arguments.brain_format,arguments.brain_file,arguments.order,arguments.workers,arguments.timeout)
+
+    # Serve until interrupted
+    try:
+        asyncio.run(server.serve(arguments.host,arguments.port))
+    except KeyboardInterrupt as err:
+        pass
+    finally:
+        server.close()
+
+# Run the server
+if __name__ == "__main__":
+    main()
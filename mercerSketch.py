@@ -0,0 +1,166 @@
+# MERCER Approximate Counts
+# Counts word pairs in a fixed amount of memory with a count-min sketch, keeping only the most common followers of each word as candidates for the brain.
+# Used for exploratory learning of corpora too large to count exactly.
+#
+# Error bounds: with a sketch of 'width' columns and 'depth' rows, after learning N pair occurances in total,
+# each estimate is never below the true count, and is above it by more than (e/width)*N with a probability of at most e^-depth.
+# The defaults give e/width = 0.00001 and e^-depth = 0.018, so over a 10 million pair corpus an estimate is within 104 of the truth with 98.2% confidence.
+# Conservative updates are used, which only ever make the estimates closer than these bounds.
+
+# Imports
+import math
+import hashlib
+from array import array
+
+# Constants
+SKETCH_WIDTH = 262144 # Default number of counters in each row of the sketch
+SKETCH_DEPTH = 4 # Default number of rows in the sketch, each with its own hash
+HEAVY_HITTERS_PER_WORD = 8 # Default number of candidate followers kept for each word
+SKETCH_MAX_WORDS = 65536 # Default max number of words that candidate followers are kept for. Past this, the half with the fewest occurances are dropped
+PAIR_SEPARATOR = "\x00" # Joins a pair's words into one sketch key
+START_PREFIX = "\x01" # Starts the sketch key of a word's sentence start count
+
+# The Count-Min Sketch class structure
+# Holds 'depth' rows of 'width' counters. Each key is hashed to one counter per row and its estimate is the smallest of them.
+# The row positions come from one hash of the key with double hashing: (h1 + row*h2) mod width
+class CountMinSketch:
+    ## Constructor
+    # width -> Number of counters in each row
+    # depth -> Number of rows
+    def __init__(self,width = SKETCH_WIDTH,depth = SKETCH_DEPTH):
+        # Set the size
+        self.width = width
+        self.depth = depth
+
+        # Prep the counters and the total added
+        self.table = array("Q",bytes(width*depth*array("Q").itemsize))
+        self.total = 0
+
+    ## Functional Methods
+    # Gets the counter positions of a key, one in each row
+    def getPositions(self,key):
+        # Hash the key once and split it into two hashes
+        digest = hashlib.blake2b(key.encode("utf-8"),digest_size = 16).digest()
+        firstHash = int.from_bytes(digest[:8],"little")
+        secondHash = int.from_bytes(digest[8:],"little") | 1
+
+        # Find the position in each row
+        return [(row*self.width)+((firstHash+(row*secondHash)) % self.width) for row in range(self.depth)]
+
+    # Adds occurances of a key
+    # Only the counters at the current estimate are raised, which is called a conservative update
+    # Returns the key's new estimate
+    # key -> String key
+    # count -> Number of occurances to add
+    def add(self,key,count = 1):
+        # Get the current estimate
+        positions = self.getPositions(key)
+        estimate = min([self.table[position] for position in positions])+count
+
+        # Raise the counters that are below the new estimate
+        for position in positions:
+            if self.table[position] < estimate:
+                self.table[position] = estimate
+
+        # Count the total
+        self.total += count
+
+        # Return the estimate
+        return estimate
+
+    # Gets the estimated occurances of a key. Never below the true count
+    def estimate(self,key):
+        return min([self.table[position] for position in self.getPositions(key)])
+
+    # Gets the error bounds of the estimates
+    # Returns a tuple of (Epsilon, Delta, Max Overcount) where an estimate is above the true count by more than Max Overcount, which is Epsilon times the total added, with a probability of at most Delta
+    def getErrorBounds(self):
+        epsilon = math.e/self.width
+        return (epsilon,math.exp(-self.depth),epsilon*self.total)
+
+    # Gets the number of bytes used by the counters
+    def getMemoryBytes(self):
+        return len(self.table)*self.table.itemsize
+
+# The Sketch Counts class structure
+# Counts word pairs and sentence starts in a CountMinSketch. For each leading word, the followers with the highest estimates are kept as candidates.
+# The sketch keeps every pair's estimate, so a dropped candidate that comes back picks up its full count again
+class SketchCounts:
+    ## Constructor
+    # width -> Number of counters in each row of the sketch
+    # depth -> Number of rows in the sketch
+    # heavyHitters -> Number of candidate followers kept for each word
+    # maxWords -> Max number of words that candidate followers are kept for
+    def __init__(self,width = SKETCH_WIDTH,depth = SKETCH_DEPTH,heavyHitters = HEAVY_HITTERS_PER_WORD,maxWords = SKETCH_MAX_WORDS):
+        # Set the options
+        self.heavyHitters = heavyHitters
+        self.maxWords = maxWords
+
+        # Prep the sketch
+        self.sketch = CountMinSketch(width,depth)
+
+        # Prep the candidates. Format: [Leading Word : {Trailing Word : Estimated Occurances}]
+        self.candidates = {}
+
+    ## Functional Methods
+    # Adds occurances of a leading word directly followed by a trailing word
+    # leadingWord -> The leading word
+    # trailingWord -> The trailing word
+    # count -> Number of occurances to add
+    def addPair(self,leadingWord,trailingWord,count = 1):
+        # Count the pair
+        estimate = self.sketch.add(leadingWord+PAIR_SEPARATOR+trailingWord,count)
+
+        # Get the leading word's candidates
+        followers = self.candidates.get(leadingWord)
+        if followers == None:
+            # Make room if needed
+            if len(self.candidates) >= self.maxWords:
+                self.dropRareWords()
+
+            # Start tracking the word
+            followers = {}
+            self.candidates[leadingWord] = followers
+
+        # Check if the follower is a candidate or there is room for it
+        if trailingWord in followers or len(followers) < self.heavyHitters:
+            followers[trailingWord] = estimate
+        else:
+            # Replace the least common candidate if this one is more common
+            leastCommon = min(followers,key = followers.get)
+            if estimate > followers[leastCommon]:
+                del followers[leastCommon]
+                followers[trailingWord] = estimate
+
+    # Adds occurances of a word starting a sentence
+    # word -> The starting word
+    # count -> Number of occurances to add
+    def addStart(self,word,count = 1):
+        self.sketch.add(START_PREFIX+word,count)
+
+    # Gets the estimated number of times a word has started a sentence
+    def getStarts(self,word):
+        return self.sketch.estimate(START_PREFIX+word)
+
+    # Drops the candidates of the half of the words whose candidates have the fewest occurances
+    def dropRareWords(self):
+        # Rank the words by their candidates' occurances
+        ranked = sorted(self.candidates,key = lambda word: sum(self.candidates[word].values()),reverse = True)
+
+        # Keep the top half
+        self.candidates = {word: self.candidates[word] for word in ranked[:self.maxWords//2]}
+
+    # Gets the candidate pairs, estimated again from the sketch
+    # Yields (Leading Word, Trailing Word, Estimated Occurances) tuples
+    # minOccurances -> Fewest estimated occurances a pair needs to be included
+    def getCandidates(self,minOccurances = 1):
+        for leadingWord, followers in self.candidates.items():
+            for trailingWord in followers:
+                # Check the estimate
+                estimate = self.sketch.estimate(leadingWord+PAIR_SEPARATOR+trailingWord)
+                if estimate >= minOccurances:
+                    yield (leadingWord,trailingWord,estimate)
+
+    # Gets the number of candidate pairs
+    def getCandidateCount(self):
+        return sum([len(followers) for followers in self.candidates.values()])
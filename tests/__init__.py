@@ -0,0 +1,3 @@
+# MERCER Tests
+# Offline tests that stand in for the web services Mercer learns from.
+# Run from the repository's root with: python -m unittest discover tests
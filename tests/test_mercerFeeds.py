@@ -0,0 +1,271 @@
+# MERCER Feed Ingestion Tests
+# Drives 'FeedClient' and 'MERCER.learnFromFeed()' against a local HTTP server standing in for a news site so nothing is fetched from the web.
+
+# Imports
+import os
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import mercer
+from mercerBrain import TRAILING
+
+# Optional Imports Setup
+mercerFeeds = None # Needs 'requests'
+if mercer.isOptionalImportAvailable("requests"):
+    import mercerFeeds
+
+# Keep the debug log out of the working directory
+mercer.LOG_FILE = os.devnull
+
+# Functions
+# Builds an article page from its paragraphs
+def buildArticle(paragraphs):
+    return ("<html><body><nav><p>menu link</p></nav>"+"".join(["<p>"+paragraph+"</p>" for paragraph in paragraphs])+"</body></html>").encode("utf-8")
+
+# Builds an RSS feed linking to pages on the stand-in server
+# baseUrl -> The server's URL
+# paths -> List of the article paths
+def buildFeed(baseUrl,paths):
+    return ("<rss><channel>"+"".join(["<item><title>"+path+"</title><link>"+baseUrl+path+"</link></item>" for path in paths])+"</channel></rss>").encode("utf-8")
+
+# The Stand-In Handler class structure
+# Answers from the server's pages, honouring If-None-Match and If-Modified-Since with 304 Not Modified
+class StandInHandler(BaseHTTPRequestHandler):
+    # Answers a GET request
+    def do_GET(self):
+        # Find the page
+        page = self.server.pages.get(self.path)
+        if page == None:
+            self.server.statuses.append((self.path,404))
+            self.send_error(404)
+            return
+
+        # Check the validators
+        if (page.get("etag") != None and self.headers.get("If-None-Match") == page["etag"]) or (page.get("lastModified") != None and self.headers.get("If-Modified-Since") == page["lastModified"]):
+            self.server.statuses.append((self.path,304))
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        # Send the page
+        self.server.statuses.append((self.path,200))
+        self.send_response(200)
+        self.send_header("Content-Type",page.get("contentType","text/html; charset=utf-8"))
+        self.send_header("Content-Length",str(len(page["body"])))
+        if page.get("etag") != None:
+            self.send_header("ETag",page["etag"])
+        if page.get("lastModified") != None:
+            self.send_header("Last-Modified",page["lastModified"])
+        self.end_headers()
+        self.wfile.write(page["body"])
+
+    # Keeps request logs out of the test output
+    def log_message(self,format,*args):
+        pass
+
+# The Feed Test Case class structure
+# Starts the stand-in server and a feed client caching into a temporary directory
+@unittest.skipIf(mercerFeeds == None,"'requests' is not installed.")
+class FeedTestCase(unittest.TestCase):
+    ## Setup
+    # Starts the server and client
+    def setUp(self):
+        # Prep the temporary directory
+        self.directory = tempfile.TemporaryDirectory()
+
+        # Start the server
+        self.server = ThreadingHTTPServer(("127.0.0.1",0),StandInHandler)
+        self.server.pages = {}
+        self.server.statuses = []
+        self.baseUrl = "http://127.0.0.1:"+str(self.server.server_address[1])
+        self.serverThread = threading.Thread(target = self.server.serve_forever,daemon = True)
+        self.serverThread.start()
+
+        # Prep the client
+        self.client = mercerFeeds.FeedClient(os.path.join(self.directory.name,"cache"),timeout = 5)
+
+    # Stops the client and server
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    ## Helpers
+    # Gets the statuses the server sent for a path, in order
+    def getStatuses(self,path):
+        return [status for statusPath, status in self.server.statuses if statusPath == path]
+
+# The Feed Client Test class structure
+class FeedClientTest(FeedTestCase):
+    ## Tests
+    # Sends the cached ETag and uses the cached body when the server answers 304
+    def testNotModifiedByETag(self):
+        # Serve a page with an ETag
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"]), "etag": "\"v1\""}
+
+        # Fetch it twice
+        firstBody, firstEncoding, firstChanged = self.client.fetch(self.baseUrl+"/article")
+        secondBody, secondEncoding, secondChanged = self.client.fetch(self.baseUrl+"/article")
+
+        # Check the second came from the cache
+        self.assertEqual(self.getStatuses("/article"),[200,304])
+        self.assertTrue(firstChanged)
+        self.assertFalse(secondChanged)
+        self.assertEqual(secondBody,firstBody)
+        self.assertEqual(secondEncoding,firstEncoding)
+
+    # Sends the cached Last-Modified and uses the cached body when the server answers 304
+    def testNotModifiedByLastModified(self):
+        # Serve a page with a Last-Modified
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"]), "lastModified": "Mon, 05 Oct 2026 10:00:00 GMT"}
+
+        # Fetch it twice
+        self.client.fetch(self.baseUrl+"/article")
+        body, encoding, changed = self.client.fetch(self.baseUrl+"/article")
+
+        # Check the second came from the cache
+        self.assertEqual(self.getStatuses("/article"),[200,304])
+        self.assertFalse(changed)
+        self.assertEqual(body,buildArticle(["alpha beta"]))
+
+    # Fetches the new body when the page changed
+    def testChangedBody(self):
+        # Serve a page, then change it
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"]), "etag": "\"v1\""}
+        self.client.fetch(self.baseUrl+"/article")
+        self.server.pages["/article"] = {"body": buildArticle(["gamma delta"]), "etag": "\"v2\""}
+        body, encoding, changed = self.client.fetch(self.baseUrl+"/article")
+
+        # Check the new body was sent
+        self.assertEqual(self.getStatuses("/article"),[200,200])
+        self.assertTrue(changed)
+        self.assertEqual(body,buildArticle(["gamma delta"]))
+
+    # Reports a page without validators as changed every time, since the server can not be asked
+    def testNoValidators(self):
+        # Serve a page without validators
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"])}
+
+        # Fetch it twice
+        self.assertTrue(self.client.fetch(self.baseUrl+"/article")[2])
+        self.assertTrue(self.client.fetch(self.baseUrl+"/article")[2])
+        self.assertEqual(self.getStatuses("/article"),[200,200])
+
+# The Learn From Feed Test class structure
+class LearnFromFeedTest(FeedTestCase):
+    ## Setup
+    # Starts Mercer with a new brain in the temporary directory, using the test's client
+    def setUp(self):
+        super().setUp()
+        self.startMercer()
+
+    # Stops Mercer
+    def tearDown(self):
+        self.mercer.exitMercer(False)
+        super().tearDown()
+
+    ## Helpers
+    # Starts Mercer with the brain in the temporary directory
+    def startMercer(self):
+        self.mercer = mercer.MERCER(brainFile = os.path.join(self.directory.name,mercer.DICTIONARY_FILE),journal = True)
+        self.mercer.feedClient = self.client
+
+    # Serves a feed of the paths
+    def serveFeed(self,paths):
+        self.server.pages["/feed"] = {"body": buildFeed(self.baseUrl,paths), "contentType": "application/rss+xml"}
+
+    # Gets the number of times a leading word was directly followed by a trailing word
+    def getPairCount(self,leadingWord,trailingWord):
+        # Check if known
+        if leadingWord not in self.mercer.dictionary:
+            return 0
+
+        # Find the pair
+        return dict(self.mercer.dictionary.getNeighbours(leadingWord,TRAILING)).get(trailingWord,0)
+
+    ## Tests
+    # Learns each article once, and not again while the server answers 304
+    def testNotModifiedArticle(self):
+        # Serve a feed with one validated article
+        self.serveFeed(["/article"])
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"]), "etag": "\"v1\""}
+
+        # Poll twice
+        self.assertTrue(self.mercer.learnFromFeed(self.baseUrl+"/feed"))
+        self.assertTrue(self.mercer.learnFromFeed(self.baseUrl+"/feed"))
+
+        # Check it was learned once
+        self.assertEqual(self.getStatuses("/article"),[200,304])
+        self.assertEqual(self.getPairCount("alpha","beta"),1)
+        self.assertEqual(self.getPairCount("menu","link"),0)
+
+    # Does not learn an article without validators again when its text is unchanged
+    def testUnchangedArticleWithoutValidators(self):
+        # Serve a feed with one article the server can not validate
+        self.serveFeed(["/article"])
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta","gamma delta"])}
+
+        # Poll three times
+        for poll in range(0,3):
+            self.assertTrue(self.mercer.learnFromFeed(self.baseUrl+"/feed"))
+
+        # Check it was downloaded every time but learned once
+        self.assertEqual(self.getStatuses("/article"),[200,200,200])
+        self.assertEqual(self.getPairCount("alpha","beta"),1)
+        self.assertEqual(self.getPairCount("gamma","delta"),1)
+
+    # Does not learn an article again when only its validators changed
+    def testUnchangedTextWithNewETag(self):
+        # Serve an article, then the same text with a new ETag
+        self.serveFeed(["/article"])
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"]), "etag": "\"v1\""}
+        self.mercer.learnFromFeed(self.baseUrl+"/feed")
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"]), "etag": "\"v2\""}
+        self.mercer.learnFromFeed(self.baseUrl+"/feed")
+
+        # Check it was learned once
+        self.assertEqual(self.getStatuses("/article"),[200,200])
+        self.assertEqual(self.getPairCount("alpha","beta"),1)
+
+    # Only learns the new paragraphs of an article whose text changed
+    def testChangedArticle(self):
+        # Serve an article, then add a paragraph to it
+        self.serveFeed(["/article"])
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"])}
+        self.mercer.learnFromFeed(self.baseUrl+"/feed")
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta","epsilon zeta"])}
+        self.mercer.learnFromFeed(self.baseUrl+"/feed")
+
+        # Check each paragraph was learned once
+        self.assertEqual(self.getPairCount("alpha","beta"),1)
+        self.assertEqual(self.getPairCount("epsilon","zeta"),1)
+
+    # Remembers the learned articles across restarts through the journaled corpus manifest
+    def testArticlesRememberedAfterRestart(self):
+        # Serve a feed with one article the server can not validate, and learn it
+        self.serveFeed(["/article"])
+        self.server.pages["/article"] = {"body": buildArticle(["alpha beta"])}
+        self.mercer.learnFromFeed(self.baseUrl+"/feed")
+
+        # Restart without saving, so the record only survives in the journal, and poll again
+        self.mercer.exitMercer(False)
+        self.startMercer()
+        self.mercer.learnFromFeed(self.baseUrl+"/feed")
+
+        # Check it was learned once
+        self.assertEqual(self.getPairCount("alpha","beta"),1)
+
+        # Restart after saving the brain and manifest, and poll again
+        self.mercer.compactBrain()
+        self.mercer.exitMercer(False)
+        self.startMercer()
+        self.mercer.learnFromFeed(self.baseUrl+"/feed")
+
+        # Check it was still learned once
+        self.assertEqual(self.getPairCount("alpha","beta"),1)
+
+# Run the tests
+if __name__ == "__main__":
+    unittest.main()
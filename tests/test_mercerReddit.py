@@ -0,0 +1,248 @@
+# MERCER Reddit Ingestion Tests
+# Drives 'MERCER.learnFromSubReddits()' with a stub in place of 'praw.Reddit' so nothing is fetched from the web.
+
+# Imports
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import mercer
+from mercerBrain import TRAILING
+
+# Keep the debug log out of the working directory
+mercer.LOG_FILE = os.devnull
+
+# Constants
+TEST_TIMEOUT = 10 # Max seconds an ingestion can take before it is treated as hung
+
+# The Stub Comment class structure
+class StubComment:
+    ## Constructor
+    def __init__(self,body,score = 1):
+        self.body = body
+        self.score = score
+
+# The Stub Comment Forest class structure
+# Stands in for a post's 'praw' CommentForest
+class StubCommentForest:
+    ## Constructor
+    def __init__(self,comments):
+        self.comments = comments
+        self.replaceMoreLimits = []
+
+    ## Functional Methods
+    # Records the limit the comment tree was loaded with
+    def replace_more(self,limit = 32):
+        self.replaceMoreLimits.append(limit)
+
+    # Gets every comment
+    def list(self):
+        return list(self.comments)
+
+# The Stub Post class structure
+class StubPost:
+    ## Constructor
+    def __init__(self,title,selftext,score = 1,comments = ()):
+        self.title = title
+        self.selftext = selftext
+        self.score = score
+        self.comments = StubCommentForest(comments)
+
+# The Stub Subreddit class structure
+# Yields its posts from 'hot()', optionally raising part way through
+class StubSubreddit:
+    ## Constructor
+    # posts -> List of StubPosts
+    # failAfter -> Number of posts to yield before raising. None never raises
+    def __init__(self,posts,failAfter = None):
+        self.posts = posts
+        self.failAfter = failAfter
+        self.yielded = 0
+
+    ## Functional Methods
+    # Yields up to 'limit' posts
+    def hot(self,limit = None):
+        for post in self.posts[:limit]:
+            # Check if it should fail
+            if self.failAfter != None and self.yielded >= self.failAfter:
+                raise RuntimeError("Stub subreddit failed.")
+
+            # Send the post
+            self.yielded += 1
+            yield post
+
+# The Stub Reddit class structure
+# Stands in for 'praw.Reddit'. Subreddits that are not known raise like a missing subreddit would
+class StubReddit:
+    ## Constructor
+    # subreddits -> Dict of [Name : StubSubreddit]
+    def __init__(self,subreddits):
+        self.subreddits = subreddits
+
+    ## Functional Methods
+    # Gets a subreddit
+    def subreddit(self,name):
+        if name not in self.subreddits:
+            raise LookupError("/r/"+name+" does not exist.")
+        return self.subreddits[name]
+
+# Runs a function on another thread, failing the test if it does not finish in time
+# Returns a tuple of (The function's result, The exception it raised or None)
+def runWithTimeout(testCase,function,*args,**kwargs):
+    # Prep the outcome
+    outcome = {"result": None, "error": None}
+
+    # Runs the function and records what happened
+    def run():
+        try:
+            outcome["result"] = function(*args,**kwargs)
+        except Exception as err:
+            outcome["error"] = err
+
+    # Run it
+    thread = threading.Thread(target = run,daemon = True)
+    thread.start()
+    thread.join(TEST_TIMEOUT)
+    testCase.assertFalse(thread.is_alive(),"Ingestion did not finish within "+str(TEST_TIMEOUT)+" seconds.")
+
+    # Return the outcome
+    return (outcome["result"],outcome["error"])
+
+# The Learn From Subreddits Test class structure
+class LearnFromSubRedditsTest(unittest.TestCase):
+    ## Setup
+    # Starts Mercer with a new brain in a temporary directory
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.mercer = mercer.MERCER(brainFile = os.path.join(self.directory.name,mercer.DICTIONARY_FILE))
+
+    # Stops Mercer and removes the brain
+    def tearDown(self):
+        self.mercer.exitMercer(False)
+        self.directory.cleanup()
+
+    ## Helpers
+    # Gets the number of times a leading word was directly followed by a trailing word
+    def getPairCount(self,leadingWord,trailingWord):
+        # Check if known
+        if leadingWord not in self.mercer.dictionary:
+            return 0
+
+        # Find the pair
+        return dict(self.mercer.dictionary.getNeighbours(leadingWord,TRAILING)).get(trailingWord,0)
+
+    ## Tests
+    # Learns the submissions and comments of every subreddit, skipping anything without a positive score or a body
+    def testLearnsSubmissionsAndComments(self):
+        # Build the subreddits
+        firstPost = StubPost("First","alpha beta",comments = [StubComment("gamma delta"),StubComment("delta epsilon",score = 0)])
+        reddit = StubReddit({
+            "one": StubSubreddit([firstPost,StubPost("Downvoted","zeta eta",score = -1,comments = [StubComment("eta theta")])]),
+            "two": StubSubreddit([StubPost("Second","alpha beta"),StubPost("Empty","",comments = [StubComment("gamma delta")])])
+        })
+
+        # Learn
+        result, error = runWithTimeout(self,self.mercer.learnFromSubReddits,10,["one","two"],includeComments = True,reddit = reddit)
+        self.assertIsNone(error)
+        self.assertTrue(result)
+
+        # Check the submissions
+        self.assertEqual(self.getPairCount("alpha","beta"),2)
+        self.assertEqual(self.getPairCount("zeta","eta"),0)
+
+        # Check the comments, including those of a post with no body
+        self.assertEqual(self.getPairCount("gamma","delta"),2)
+        self.assertEqual(self.getPairCount("delta","epsilon"),0)
+        self.assertEqual(self.getPairCount("eta","theta"),0)
+        self.assertEqual(firstPost.comments.replaceMoreLimits,[0])
+
+    # Only learns submissions when comments are not included, and respects the item limit
+    def testSkipsCommentsAndRespectsLimit(self):
+        # Build the subreddit
+        reddit = StubReddit({"one": StubSubreddit([StubPost("First","alpha beta",comments = [StubComment("gamma delta")]),StubPost("Second","iota kappa")])})
+
+        # Learn only the first post
+        result, error = runWithTimeout(self,self.mercer.learnFromSubReddits,1,["one"],reddit = reddit)
+        self.assertIsNone(error)
+        self.assertTrue(result)
+
+        # Check what was learned
+        self.assertEqual(self.getPairCount("alpha","beta"),1)
+        self.assertEqual(self.getPairCount("gamma","delta"),0)
+        self.assertEqual(self.getPairCount("iota","kappa"),0)
+
+    # Reports a subreddit that raises while still learning the others
+    def testSubredditThatRaises(self):
+        # Build a missing subreddit, one that fails part way, and one that works
+        reddit = StubReddit({
+            "partial": StubSubreddit([StubPost("First","lambda mu"),StubPost("Second","nu xi")],failAfter = 1),
+            "working": StubSubreddit([StubPost("First","alpha beta")])
+        })
+
+        # Learn
+        result, error = runWithTimeout(self,self.mercer.learnFromSubReddits,10,["missing","partial","working"],reddit = reddit)
+        self.assertIsNone(error)
+        self.assertFalse(result)
+
+        # Check what was learned before and around the failures
+        self.assertEqual(self.getPairCount("alpha","beta"),1)
+        self.assertEqual(self.getPairCount("lambda","mu"),1)
+        self.assertEqual(self.getPairCount("nu","xi"),0)
+
+    # Stops the fetching threads instead of hanging when learning a block raises
+    def testLearnerExceptionDoesNotHang(self):
+        # Build subreddits with far more posts than the queue holds
+        subreddits = {name: StubSubreddit([StubPost(str(index),"alpha beta") for index in range(500)]) for name in ["one","two"]}
+        reddit = StubReddit(subreddits)
+
+        # Fail on the third block
+        learned = []
+        def failingLearner(block):
+            learned.append(block)
+            if len(learned) == 3:
+                raise ValueError("Stub learner failed.")
+
+        # Learn with a small queue and short waits
+        with mock.patch.object(mercer,"INGEST_QUEUE_SIZE",2), mock.patch.object(mercer,"INGEST_PUT_TIMEOUT",0.05), mock.patch.object(self.mercer,"learnTextBlock",failingLearner):
+            result, error = runWithTimeout(self,self.mercer.learnFromSubReddits,500,list(subreddits),reddit = reddit)
+
+        # Check the failure was raised and fetching stopped early
+        self.assertIsInstance(error,ValueError)
+        self.assertEqual(len(learned),3)
+        for subreddit in subreddits.values():
+            self.assertLess(subreddit.yielded,500)
+
+    # Keeps fetching threads no more than the queue's size ahead of a slow learner
+    def testBoundedQueueBackpressure(self):
+        # Build a subreddit that counts the posts it has handed out
+        subreddit = StubSubreddit([StubPost(str(index),"alpha beta") for index in range(40)])
+        reddit = StubReddit({"one": subreddit})
+        queueSize = 3
+
+        # Learn slowly, recording how far ahead the fetcher got
+        realLearner = self.mercer.learnTextBlock
+        lead = []
+        def slowLearner(block):
+            lead.append(subreddit.yielded-(len(lead)+1))
+            time.sleep(0.005)
+            realLearner(block)
+
+        # Learn with a small queue
+        with mock.patch.object(mercer,"INGEST_QUEUE_SIZE",queueSize), mock.patch.object(self.mercer,"learnTextBlock",slowLearner):
+            result, error = runWithTimeout(self,self.mercer.learnFromSubReddits,40,["one"],reddit = reddit)
+        self.assertIsNone(error)
+        self.assertTrue(result)
+
+        # Check everything was learned
+        self.assertEqual(len(lead),40)
+        self.assertEqual(self.getPairCount("alpha","beta"),40)
+
+        # Check the fetcher waited on the full queue. Besides the queued blocks, it can only hold the one it is putting
+        self.assertLessEqual(max(lead),queueSize+1)
+        self.assertGreater(max(lead),0)
+
+# Run the tests
+if __name__ == "__main__":
+    unittest.main()